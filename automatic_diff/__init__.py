@@ -1,2 +1,4 @@
 # pylint: disable=missing-docstring
-from . import dual_number, functions, grad_descent, gradients, learning_rates, linear_regression
+from . import (
+    cache, callbacks, dual_number, functions, grad_descent, gradients, lbfgs, learning_rates,
+    linear_regression, profiler, reverse, sparse, trace)
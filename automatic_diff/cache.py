@@ -0,0 +1,175 @@
+'''
+Memoization of objective and gradient evaluations.
+
+A `ResultCache` keeps the results of evaluating functions, keyed on the
+function itself together with the bytes, shape and dtype of the input, so
+evaluating the same function at the same point again is served from the
+cache.  Pass one as `cache=` to `gradients.gradient` or to an optimizer's
+`fit`, or wrap an objective with `ResultCache.wrap`.
+
+Functions are keyed on identity (bound methods on their instance), not on
+the data they read: a function whose result changes without its input
+changing, e.g. a Model whose records are modified in place, must be
+invalidated with `ResultCache.invalidate`.
+'''
+import functools
+import numbers
+from collections import OrderedDict
+import numpy as np
+from automatic_diff.dual_number import get_dtype
+
+
+class CacheError(Exception):
+    '''Error handling for result caches'''
+    pass
+
+
+def _freeze(value):
+    '''`value` with its arrays made read-only, as they are shared by every hit'''
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+def _nbytes(value):
+    '''Bytes held by the arrays and numbers of `value`'''
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    return 8
+
+
+class ResultCache:
+    '''
+    Least recently used cache of function results
+
+    Parameters
+    ----------
+    max_bytes: int
+        Maximum size of the inputs and results kept.  The least recently used
+        results are dropped when a new one would exceed it, and a result
+        larger than `max_bytes` on its own is not kept.
+
+    Attributes
+    ----------
+    hits, misses, evictions: int
+        Lookups served from the cache, lookups that evaluated the function,
+        and results dropped to make room, since creation or `reset_stats`
+    nbytes: int
+        Current size of the inputs and results kept
+    '''
+    def __init__(self, max_bytes=64 * 2**20):
+        if max_bytes < 0:
+            raise CacheError("max_bytes must be non-negative but got {}".format(max_bytes))
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._results = OrderedDict()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._results)
+
+    def reset_stats(self):
+        '''Zeroes `hits`, `misses` and `evictions`'''
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        '''dict of `hits`, `misses`, `evictions`, `entries` and `nbytes`'''
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self), 'nbytes': self.nbytes}
+
+    @staticmethod
+    def _key(func, x, kind):
+        # inputs are keyed as `gradients.gradient` evaluates them, integers in the default dtype
+        x = np.asarray(x)
+        if x.dtype.kind != 'f':
+            x = x.astype(get_dtype())
+        return (kind, func, x.shape, x.dtype.str, x.tobytes())
+
+    def get(self, func, x, compute, kind="value"):
+        '''
+        Parameters
+        ----------
+        func: function
+            Function the result is of, which is part of the key
+        x: np.array
+            Input the result is of, keyed on its bytes, shape and dtype, with
+            integers and bools converted to the default dtype
+        compute: function
+            Called without arguments to evaluate the result if it is not kept
+        kind: hashable
+            Distinguishes different results of the same function and input,
+            e.g. its value from its gradient
+
+        Returns
+        -------
+        Result of `compute()`, now or when first evaluated.  Its arrays are read-only.
+        '''
+        key = self._key(func, x, kind)
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key][0]
+        self.misses += 1
+        value = _freeze(compute())
+        nbytes = len(key[-1]) + _nbytes(value)
+        if nbytes <= self.max_bytes:
+            while self.nbytes + nbytes > self.max_bytes:
+                _, (_, dropped) = self._results.popitem(last=False)
+                self.nbytes -= dropped
+                self.evictions += 1
+            self._results[key] = (value, nbytes)
+            self.nbytes += nbytes
+        return value
+
+    def wrap(self, func):
+        '''
+        Memoized `func` for real-valued arguments, as called by `lbfgs` line
+        searches.  Calls with dual-number arguments, as by `gradients.gradient`,
+        are passed through to `func`.
+        '''
+        @functools.wraps(func)
+        def cached(*args):
+            if not all(isinstance(arg, (numbers.Real, np.ndarray)) for arg in args):
+                return func(*args)
+            try:
+                x = np.asarray(args)
+            except ValueError:
+                return func(*args)
+            if x.dtype.kind not in 'biuf':
+                return func(*args)
+            return self.get(func, x, lambda: func(*args))
+        return cached
+
+    def invalidate(self, func=None, x=None):
+        '''
+        Drops the results of `func`, only those at input `x` if given, or every
+        result if `func` is None.  `x` is keyed as in `get`, so `[1, 2]` matches
+        the results of `gradients.gradient([1, 2], func, cache=...)`.
+
+        Returns
+        -------
+        int:
+            Number of results dropped
+        '''
+        if func is None:
+            dropped = list(self._results)
+        elif x is None:
+            dropped = [key for key in self._results if key[1] == func]
+        else:
+            key = self._key(func, x, None)[1:]
+            dropped = [each for each in self._results if each[1:] == key]
+        for key in dropped:
+            self.nbytes -= self._results.pop(key)[1]
+        return len(dropped)
+
+    def clear(self):
+        '''Drops every result'''
+        self.invalidate()
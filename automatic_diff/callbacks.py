@@ -0,0 +1,240 @@
+'''
+Hooks into `GradientDescent.fit`: a recorder of per-iteration statistics,
+stopping rules and checkpoints to resume a fit from
+'''
+import json
+import os
+import pickle
+import time
+import numpy as np
+
+
+class Callback:
+    '''
+    Base class for callbacks passed to `GradientDescent.fit`
+
+    Each method is given the running optimizer, whose attributes such as
+    `num_iter`, `y`, `dual_x`, `lr` and the timings of the last iteration
+    may be read, and does nothing by default.
+    '''
+    def on_fit_begin(self, grad_descent):
+        '''Called once the buffers of the fit are allocated, before the first iteration'''
+
+    def on_iteration_end(self, grad_descent):
+        '''
+        Called after every iteration
+
+        Returns
+        -------
+        bool:
+            True to stop the fit after this iteration
+        '''
+        return False
+
+    def on_fit_end(self, grad_descent):
+        '''Called after the last iteration'''
+
+
+class FunctionCallback(Callback):
+    '''
+    Callback calling `function(grad_descent)` after every iteration
+
+    Parameters
+    ----------
+    function: function
+        Returns a true value to stop the fit
+    '''
+    def __init__(self, function):
+        self.function = function
+
+    def on_iteration_end(self, grad_descent):
+        return bool(self.function(grad_descent))
+
+
+class Recorder(Callback):
+    '''
+    Records statistics of every iteration into a structured array
+
+    The array is allocated once at the start of the fit, with room for
+    `capacity` iterations, or else for the fit's `max_iters` up to
+    `max_initial_capacity`, and doubled if more iterations are run.
+    Recording an iteration only writes one row.  For a population of points,
+    `objective` is the best value and `lr` the mean learning rate.
+    `func_evals` and `grad_evals` are the optimizer's running counts of
+    `num_func_evals` and `num_grad_evals`.  Only line searches evaluate the
+    objective without its gradient, so `func_evals` stays 0 for plain
+    gradient descent, whose every evaluation counts in `grad_evals`.
+
+    Parameters
+    ----------
+    capacity: int or None
+        Number of iterations to allocate room for
+    '''
+    # rows allocated up front for a fit's `max_iters`, which may be far more than it runs
+    max_initial_capacity = 1024
+    fields = ('iteration', 'elapsed_seconds', 'seconds', 'grad_seconds', 'update_seconds',
+              'objective', 'step_size', 'lr', 'func_evals', 'grad_evals')
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.num_records = 0
+        self._records = self._allocate(0)
+        self._start = None
+
+    def _allocate(self, size):
+        return np.full(size, np.nan, dtype=[(field, float) for field in self.fields])
+
+    @property
+    def history(self):
+        '''Structured array of one row per iteration recorded, with a column per field'''
+        return self._records[:self.num_records]
+
+    def on_fit_begin(self, grad_descent):
+        capacity = self.capacity or min(grad_descent.max_iters or self.max_initial_capacity,
+                                        self.max_initial_capacity)
+        self._records = self._allocate(capacity)
+        self.num_records = 0
+        self._start = time.perf_counter()
+
+    def on_iteration_end(self, grad_descent):
+        if self.num_records == len(self._records):
+            self._records = np.concatenate(
+                [self._records, self._allocate(max(len(self._records), 1))])
+        self._records[self.num_records] = (
+            grad_descent.num_iter,
+            time.perf_counter() - self._start,
+            grad_descent.iter_seconds,
+            grad_descent.grad_seconds,
+            grad_descent.update_seconds,
+            np.nanmin(grad_descent.y),
+            grad_descent.dual_x.size_dx,
+            np.mean(grad_descent.lr.lr),
+            grad_descent.num_func_evals,
+            grad_descent.num_grad_evals,
+        )
+        self.num_records += 1
+        return False
+
+    def to_dict(self):
+        '''Dict of a list of values per field'''
+        history = self.history
+        return {field: history[field].tolist() for field in self.fields}
+
+    def to_json(self, path):
+        '''Writes `to_dict` as JSON to the file at `path`'''
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file)
+
+    def to_csv(self, path):
+        '''Writes the history as CSV to the file at `path`, with a header line of field names'''
+        np.savetxt(path, self.history, delimiter=',', header=','.join(self.fields),
+                   comments='', fmt='%.17g')
+
+
+class EarlyStopping(Callback):
+    '''
+    Stops a fit on any of several rules, on top of `tol` and `max_iters`
+
+    The objective has plateaued when it has not improved on its best value
+    by more than `atol + rtol * abs(best)` for `patience` iterations in a row.
+    For a population of points, the rules apply to the best objective value
+    and to the largest gradient norm.  `stop_reason` is the rule that stopped
+    the last fit: "objective", "gradient" or "time", or None.
+
+    Parameters
+    ----------
+    atol: float or None
+        Absolute improvement of the objective below which it counts as plateaued
+    rtol: float or None
+        Improvement relative to the best objective value below which it counts as plateaued
+    patience: int
+        Number of iterations in a row the objective may plateau before stopping
+    gtol: float or None
+        Stops once the norm of the gradient is at most `gtol`
+    max_seconds: float or None
+        Stops once the fit has run for `max_seconds` of wall-clock time
+    '''
+    def __init__(self, atol=None, rtol=None, patience=1, gtol=None, max_seconds=None):
+        self.atol = atol
+        self.rtol = rtol
+        self.patience = patience
+        self.gtol = gtol
+        self.max_seconds = max_seconds
+        self.stop_reason = None
+        self.best = np.inf
+        self.num_plateaued = 0
+        self._start = None
+
+    def on_fit_begin(self, grad_descent):
+        self.stop_reason = None
+        self.best = np.inf
+        self.num_plateaued = 0
+        self._start = time.perf_counter()
+
+    def on_iteration_end(self, grad_descent):
+        if self.atol is not None or self.rtol is not None:
+            value = np.nanmin(grad_descent.y)
+            if np.isfinite(self.best):
+                threshold = (self.atol or 0.) + (self.rtol or 0.) * abs(self.best)
+                if self.best - value > threshold:
+                    self.num_plateaued = 0
+                else:
+                    self.num_plateaued += 1
+                if self.num_plateaued >= self.patience:
+                    self.stop_reason = "objective"
+            # the first finite value is the best so far, with nothing to improve on
+            self.best = min(self.best, value)
+        if self.gtol is not None:
+            grad = np.atleast_1d(grad_descent.grad)
+            if np.max(np.linalg.norm(grad, axis=-1)) <= self.gtol:
+                self.stop_reason = "gradient"
+        if self.max_seconds is not None \
+                and time.perf_counter() - self._start >= self.max_seconds:
+            self.stop_reason = "time"
+        return self.stop_reason is not None
+
+
+class Checkpoint(Callback):
+    '''
+    Saves the state of a fit to disk, to be resumed by passing `path` to `fit` as `resume`
+
+    The file is pickled `GradientDescent.get_state`, and is replaced as a
+    whole, so an interrupted save leaves the previous checkpoint intact.
+
+    Parameters
+    ----------
+    path: str
+        File to save to
+    every: int
+        Number of iterations between saves.  The last iteration is always saved.
+    '''
+    def __init__(self, path, every=1):
+        self.path = path
+        self.every = every
+
+    def save(self, grad_descent):
+        '''Saves the current state of `grad_descent`'''
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump(grad_descent.get_state(), file)
+        os.replace(temp_path, self.path)
+
+    def on_iteration_end(self, grad_descent):
+        if grad_descent.num_iter % self.every == 0:
+            self.save(grad_descent)
+        return False
+
+    def on_fit_end(self, grad_descent):
+        if grad_descent.num_iter % self.every != 0:
+            self.save(grad_descent)
+
+
+def load_checkpoint(path):
+    '''
+    Returns
+    -------
+    dict:
+        State saved by `Checkpoint` at `path`, see `GradientDescent.get_state`
+    '''
+    with open(path, 'rb') as file:
+        return pickle.load(file)
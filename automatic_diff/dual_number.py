@@ -4,6 +4,9 @@ Dual Numbers provide (x, dx) tuples with algebraic structure, so that
 and
 (x, dx) * (y, dy) = (x*y, x*dy + y*dx)
 '''
+import math
+import operator
+import string
 import numpy as np
 
 
@@ -12,18 +15,165 @@ class DualNumberError(Exception):
     pass
 
 
+_OPERATORS = {
+    np.add: operator.add,
+    np.subtract: operator.sub,
+    np.multiply: operator.mul,
+    np.true_divide: operator.truediv,
+}
+
+
+def _into(target, writable, ufunc, *operands):
+    '''
+    `ufunc(*operands)`, written into the array `target` when `writable` and the
+    result fits its shape and dtype.  Otherwise a new result is returned.
+    '''
+    if writable and isinstance(target, np.ndarray) and target.flags.writeable:
+        try:
+            fits = (np.broadcast_shapes(*[np.shape(op) for op in operands]) == target.shape
+                    and np.can_cast(np.result_type(*operands), target.dtype, 'same_kind'))
+        except (TypeError, ValueError):
+            fits = False
+        if fits:
+            return ufunc(*operands, out=target)
+    return _OPERATORS[ufunc](*operands)
+
+
+# floating point dtype of values and tangents created from Python numbers,
+# integer arrays and seeds, see `set_dtype`
+_DTYPE = np.dtype(np.float64)
+
+
+def get_dtype():
+    '''Default floating point dtype, see `set_dtype`'''
+    return _DTYPE
+
+
+def set_dtype(dtype):
+    '''
+    Sets the default floating point dtype
+
+    DualNumbers built from anything but floating point arrays, seeds of
+    tangents, and the buffers of optimizers get this dtype, unless a function
+    is given a `dtype` of its own.  Floating point arrays keep their dtype, and
+    operations between values of one dtype stay in it, so e.g. np.float32
+    halves the memory of values and tangents.
+
+    Parameters
+    ----------
+    dtype: np.dtype or str
+        A floating point dtype, np.float64 initially
+
+    Returns
+    -------
+    np.dtype:
+        The previous default
+    '''
+    global _DTYPE # pylint: disable=global-statement
+    previous, _DTYPE = _DTYPE, resolve_dtype(dtype)
+    return previous
+
+
+def resolve_dtype(dtype=None):
+    '''`dtype` as a np.dtype, or the default dtype if None'''
+    if dtype is None:
+        return _DTYPE
+    dtype = np.dtype(dtype)
+    if dtype.kind != 'f':
+        raise DualNumberError("dtype must be a floating point dtype but got {}".format(dtype))
+    return dtype
+
+
+def _as_array(value):
+    '''
+    Copy of `value` as an array.  Values that are not already floating point
+    arrays, such as Python numbers, lists and integer arrays, get the default dtype.
+    '''
+    array = np.asarray(value)
+    if array.dtype.kind in 'biu' or (
+            array.dtype.kind == 'f' and not isinstance(value, (np.ndarray, np.generic))):
+        return array.astype(_DTYPE)
+    return np.array(array)
+
+
+def primal(value):
+    '''Innermost value of a, possibly nested, DualNumber'''
+    while isinstance(value, DualNumber):
+        value = value.x
+    return value
+
+
+# derivative of f(x), as a function of x and y = f(x); constants are Python floats,
+# which keep the dtype of float32 arrays where NumPy scalars would upcast them
+_UNARY_DERIVATIVES = {
+    np.exp: lambda x, y: y,
+    np.exp2: lambda x, y: y * math.log(2),
+    np.expm1: lambda x, y: y + 1,
+    np.log: lambda x, y: 1 / x,
+    np.log2: lambda x, y: 1 / (x * math.log(2)),
+    np.log10: lambda x, y: 1 / (x * math.log(10)),
+    np.log1p: lambda x, y: 1 / (1 + x),
+    np.sqrt: lambda x, y: 0.5 / y,
+    np.cbrt: lambda x, y: 1 / (3 * y**2),
+    np.square: lambda x, y: 2 * x,
+    np.reciprocal: lambda x, y: -y**2,
+    np.absolute: lambda x, y: np.sign(primal(x)),
+    np.sin: lambda x, y: np.cos(x),
+    np.cos: lambda x, y: -np.sin(x),
+    np.tan: lambda x, y: 1 + y**2,
+    np.arcsin: lambda x, y: 1 / np.sqrt(1 - x**2),
+    np.arccos: lambda x, y: -1 / np.sqrt(1 - x**2),
+    np.arctan: lambda x, y: 1 / (1 + x**2),
+    np.sinh: lambda x, y: np.cosh(x),
+    np.cosh: lambda x, y: np.sinh(x),
+    np.tanh: lambda x, y: 1 - y**2,
+    np.arcsinh: lambda x, y: 1 / np.sqrt(x**2 + 1),
+    np.arccosh: lambda x, y: 1 / np.sqrt(x**2 - 1),
+    np.arctanh: lambda x, y: 1 / (1 - x**2),
+    np.deg2rad: lambda x, y: np.pi / 180,
+    np.radians: lambda x, y: np.pi / 180,
+    np.rad2deg: lambda x, y: 180 / np.pi,
+    np.degrees: lambda x, y: 180 / np.pi,
+}
+
+# partial derivatives of f(a, b) wrt a and b, as functions of a, b and y = f(a, b)
+_BINARY_DERIVATIVES = {
+    np.power: (lambda a, b, y: b * a**(b - 1), lambda a, b, y: y * np.log(a)),
+    np.maximum: (lambda a, b, y: primal(a) >= primal(b), lambda a, b, y: primal(a) < primal(b)),
+    np.minimum: (lambda a, b, y: primal(a) <= primal(b), lambda a, b, y: primal(a) > primal(b)),
+    np.hypot: (lambda a, b, y: a / y, lambda a, b, y: b / y),
+    np.arctan2: (lambda a, b, y: b / (a**2 + b**2), lambda a, b, y: -a / (a**2 + b**2)),
+    np.logaddexp: (lambda a, b, y: np.exp(a - y), lambda a, b, y: np.exp(b - y)),
+}
+
+# piecewise constant, so the tangent of the result is zero
+_CONSTANT_UFUNCS = {np.sign, np.floor, np.ceil, np.trunc, np.rint}
+
+# not differentiable, so evaluated on the values alone
+_VALUE_UFUNCS = {
+    np.greater, np.greater_equal, np.less, np.less_equal, np.equal, np.not_equal,
+    np.isfinite, np.isinf, np.isnan, np.signbit,
+    np.logical_and, np.logical_or, np.logical_xor, np.logical_not,
+}
+
+# implementations of NumPy functions for DualNumbers, see `_implements`
+_ARRAY_FUNCTIONS = {}
+
+
 class DualNumber:
     '''
     Parameters
     ----------
-    x: float or np.array
-        Corresponds to a variable.
-    dx: float or np.array
+    x: float or np.array or DualNumber
+        Corresponds to a variable.  May itself be a DualNumber, to nest
+        dual numbers for higher order derivatives.
+    dx: float or np.array or DualNumber
         Corresponds to gradient step. Must be same shape as `x`
     '''
+    __slots__ = ('__x', '__dx', '__shared_dx')
 
     @classmethod
-    def create(cls, val):
+    def create(cls, val, dtype=None):
         '''
         Factory for creating DualNumbers
 
@@ -32,13 +182,79 @@ class DualNumber:
         val: Either DualNumber instance or float or np.array
             If float or np.array, initializes a DualNumber with
             `x=val` and `dx=zeros`
+        dtype: np.dtype or None
+            dtype of x and dx.  If None, that of a floating point `val`, or
+            else the default dtype, see `set_dtype`.
         '''
         if not isinstance(val, cls):
-            x = np.array(val)
+            x = _as_array(val) if dtype is None else np.array(val, dtype=resolve_dtype(dtype))
             zero = np.zeros_like(x)
             val = cls(x=x, dx=zero)
         return val
 
+    @classmethod
+    def stack(cls, duals, axis=0):
+        '''
+        Joins DualNumbers of equal shape along a new axis
+
+        Parameters
+        ----------
+        duals: sequence of DualNumber
+            May also contain constants, whose tangent is zero
+        axis: int
+
+        Returns
+        -------
+        DualNumber
+            x is `np.stack` of the x's, and dx the `np.stack` of the dx's
+        '''
+        dual, duals = _promote(duals)
+        x = np.stack([d.x for d in duals], axis)
+        return dual._new(x, np.stack([d.dx for d in duals], dual._dx_axis(axis, np.ndim(x))))
+
+    @classmethod
+    def concatenate(cls, duals, axis=0):
+        '''
+        Joins DualNumbers along an existing axis
+
+        Parameters
+        ----------
+        duals: sequence of DualNumber
+            May also contain constants, whose tangent is zero
+        axis: int
+
+        Returns
+        -------
+        DualNumber
+            x is `np.concatenate` of the x's, and dx the `np.concatenate` of the dx's
+        '''
+        dual, duals = _promote(duals)
+        x = np.concatenate([d.x for d in duals], axis)
+        return dual._new(x, np.concatenate([d.dx for d in duals], dual._dx_axis(axis, np.ndim(x))))
+
+    @classmethod
+    def _new(cls, x, dx, shared_dx=False):
+        '''
+        Fast constructor for operator results: no copy and no validation.
+
+        `shared_dx` marks a `dx` that is also the tangent of another DualNumber,
+        which in-place operations must therefore not write into.
+        '''
+        new = object.__new__(cls)
+        new.__x = x
+        new.__dx = dx
+        new.__shared_dx = shared_dx
+        return new
+
+    def _share(self, x, dx):
+        '''
+        Result of value `x` whose tangent `dx` is, or is a view of, the tangent
+        of self.  Both are marked `shared_dx`, so an in-place operation on
+        either one copies its tangent rather than altering the other's.
+        '''
+        self.__shared_dx = True
+        return self._new(x, dx, shared_dx=True)
+
     def __init__(self, x, dx):
         self.x = x
         self.dx = dx
@@ -50,13 +266,41 @@ class DualNumber:
                 "x and dx must have same shape but got {} and {}".format(
                     self.x.shape, self.dx.shape))
 
+    def _tangent(self, value): # pylint: disable=no-self-use
+        '''Shapes a primal-valued array so it broadcasts against tangents'''
+        return value
+
+    def _broadcast_dx(self, x):
+        '''Tangent of `self` broadcast to the shape of the result `x` of a constant operation'''
+        if np.shape(x) == self.x.shape:
+            return self.dx
+        return np.broadcast_to(self.dx, np.shape(x))
+
+    def chain(self, x, der):
+        '''
+        Applies the chain rule for an elementwise function.
+
+        Parameters
+        ----------
+        x: float or np.array
+            Value of the function evaluated at `self.x`
+        der: float or np.array
+            Derivative of the function evaluated at `self.x`
+
+        Returns
+        -------
+        DualNumber
+            (x, der * self.dx)
+        '''
+        return self._new(x, self.dx * self._tangent(der))
+
     @property
     def x(self): # pylint: disable=missing-docstring
         return self.__x
 
     @x.setter
     def x(self, value):
-        self.__x = np.array(value) # pylint: disable=attribute-defined-outside-init
+        self.__x = value if isinstance(value, DualNumber) else _as_array(value)
 
     @property
     def dx(self): # pylint: disable=missing-docstring
@@ -64,7 +308,8 @@ class DualNumber:
 
     @dx.setter
     def dx(self, value):
-        self.__dx = np.array(value) # pylint: disable=attribute-defined-outside-init
+        self.__dx = value if isinstance(value, DualNumber) else _as_array(value)
+        self.__shared_dx = False
 
     @property
     def shape(self): # pylint: disable=missing-docstring
@@ -83,74 +328,546 @@ class DualNumber:
         return True
 
     def __neg__(self):
-        return self.__class__(x=-self.x, dx=-self.dx)
+        return self._new(-self.x, -self.dx)
 
     def __abs__(self):
-        x = abs(self.x)
-        dx = self.dx * np.sign(self.x)
-        return self.__class__(x=x, dx=dx)
+        return self.chain(abs(self.x), np.sign(primal(self.x)))
 
     def __pow__(self, power):
-        x = self.x ** power
-        dx = power * self.x ** (power - 1) * self.dx
-        return self.__class__(x=x, dx=dx)
+        return self.chain(self.x ** power, power * self.x ** (power - 1))
 
     def __add__(self, other):
-        other = DualNumber.create(other)
-        x = self.x + other.x
-        dx = self.dx + other.dx
-        return self.__class__(x=x, dx=dx)
+        if not isinstance(other, DualNumber):
+            x = self.x + other
+            return self._share(x, self._broadcast_dx(x))
+        return self._new(self.x + other.x, self.dx + other.dx)
 
     def __radd__(self, other):
-        other = DualNumber.create(other)
-        return other + self
+        x = other + self.x
+        return self._share(x, self._broadcast_dx(x))
 
     def __sub__(self, other):
-        other = DualNumber.create(other)
-        x = self.x - other.x
-        dx = self.dx - other.dx
-        return self.__class__(x=x, dx=dx)
+        if not isinstance(other, DualNumber):
+            x = self.x - other
+            return self._share(x, self._broadcast_dx(x))
+        return self._new(self.x - other.x, self.dx - other.dx)
 
     def __rsub__(self, other):
-        other = DualNumber.create(other)
-        return other - self
+        x = other - self.x
+        return self._new(x, -self._broadcast_dx(x))
 
     def __mul__(self, other):
-        other = DualNumber.create(other)
+        if not isinstance(other, DualNumber):
+            return self._new(self.x * other, self.dx * self._tangent(other))
         x = self.x * other.x
-        dx = self.dx * other.x + self.x * other.dx
-        return self.__class__(x=x, dx=dx)
+        dx = self.dx * self._tangent(other.x) + self._tangent(self.x) * other.dx
+        return self._new(x, dx)
 
     def __rmul__(self, other):
-        other = DualNumber.create(other)
-        return other * self
+        return self._new(other * self.x, self._tangent(other) * self.dx)
 
     def __truediv__(self, other):
-        other = DualNumber.create(other)
+        if not isinstance(other, DualNumber):
+            return self._new(self.x / other, self.dx / self._tangent(other))
         x = self.x / other.x
-        dx = (self.dx * other.x - self.x * other.dx) / other.x ** 2
-        return self.__class__(x=x, dx=dx)
+        dx = ((self.dx * self._tangent(other.x) - self._tangent(self.x) * other.dx)
+              / self._tangent(other.x ** 2))
+        return self._new(x, dx)
 
     def __rtruediv__(self, other):
-        other = DualNumber.create(other)
-        return other / self
+        # -other / x**2 as -(other / x) / x, for lists and other operands without unary minus
+        x = other / self.x
+        return self.chain(x, -x / self.x)
+
+    def _store(self, out, x, dx_ufunc, *dx_operands):
+        '''Writes `x` and `dx_ufunc(*dx_operands)` into the buffers of `out`, where possible'''
+        # pylint: disable=protected-access
+        if out is None:
+            return self._new(x, _OPERATORS[dx_ufunc](*dx_operands))
+        out.__dx = _into(out.__dx, not out.__shared_dx, dx_ufunc, *dx_operands)
+        out.__shared_dx = False
+        out.__x = x
+        return out
+
+    def add(self, other, out=None):
+        '''
+        self + other, optionally written into the buffers of an existing DualNumber
+
+        Parameters
+        ----------
+        other: DualNumber or float or np.array
+        out: DualNumber or None
+            If given, receives the result, reusing its `x` and `dx` arrays when
+            their shape and dtype fit.  May be `self` or `other`.
+
+        Returns
+        -------
+        DualNumber
+            `out`, or a new DualNumber if `out` is None
+        '''
+        if out is None:
+            return self + other
+        if not isinstance(other, DualNumber):
+            x = _into(out.x, True, np.add, self.x, other)
+            if out is self and np.shape(x) == self.shape:
+                out.__x = x
+                return out
+            return self._store(out, x, np.add, self._broadcast_dx(x), 0)
+        x = _into(out.x, True, np.add, self.x, other.x)
+        return self._store(out, x, np.add, self.dx, other.dx)
+
+    def sub(self, other, out=None):
+        '''self - other, optionally written into `out`, see `add`'''
+        if out is None:
+            return self - other
+        if not isinstance(other, DualNumber):
+            x = _into(out.x, True, np.subtract, self.x, other)
+            if out is self and np.shape(x) == self.shape:
+                out.__x = x
+                return out
+            return self._store(out, x, np.add, self._broadcast_dx(x), 0)
+        x = _into(out.x, True, np.subtract, self.x, other.x)
+        return self._store(out, x, np.subtract, self.dx, other.dx)
+
+    def mul(self, other, out=None):
+        '''self * other, optionally written into `out`, see `add`'''
+        if out is None:
+            return self * other
+        if not isinstance(other, DualNumber):
+            self._store(out, out.x, np.multiply, self.dx, self._tangent(other))
+            out.__x = _into(out.x, True, np.multiply, self.x, other)
+            return out
+        cross = self._tangent(self.x) * other.dx
+        self._store(out, out.x, np.multiply, self.dx, self._tangent(other.x))
+        self._store(out, out.x, np.add, out.dx, cross)
+        out.__x = _into(out.x, True, np.multiply, self.x, other.x)
+        return out
+
+    def truediv(self, other, out=None):
+        '''self / other, optionally written into `out`, see `add`'''
+        if out is None:
+            return self / other
+        if not isinstance(other, DualNumber):
+            self._store(out, out.x, np.true_divide, self.dx, self._tangent(other))
+            out.__x = _into(out.x, True, np.true_divide, self.x, other)
+            return out
+        cross = self._tangent(self.x) * other.dx
+        self._store(out, out.x, np.multiply, self.dx, self._tangent(other.x))
+        self._store(out, out.x, np.subtract, out.dx, cross)
+        self._store(out, out.x, np.true_divide, out.dx, self._tangent(other.x ** 2))
+        out.__x = _into(out.x, True, np.true_divide, self.x, other.x)
+        return out
+
+    def __iadd__(self, other):
+        return self.add(other, out=self)
+
+    def __isub__(self, other):
+        return self.sub(other, out=self)
+
+    def __imul__(self, other):
+        return self.mul(other, out=self)
+
+    def __itruediv__(self, other):
+        return self.truediv(other, out=self)
+
+    def __matmul__(self, other):
+        return _matmul(self, other)
+
+    def __rmatmul__(self, matrix):
+        if np.ndim(self.x) > 2 or isinstance(self.dx, DualNumber):
+            # batched or nested, so the tangent is not a tensordot with the matrix
+            return _matmul(matrix, self)
+        matrix = np.asarray(matrix)
+        x = np.matmul(matrix, self.x)
+        dx = np.tensordot(matrix, self.dx, axes=1)
+        return self._new(x, dx)
+
+    def dot(self, other):
+        '''Same as `np.dot(self, other)`'''
+        return _dot(self, other)
+
+    def sum(self, axis=None, keepdims=False):
+        '''Same as `np.sum(self, axis, keepdims=keepdims)`'''
+        return _sum(self, axis, keepdims)
+
+    def mean(self, axis=None, keepdims=False):
+        '''Same as `np.mean(self, axis, keepdims=keepdims)`'''
+        return _mean(self, axis, keepdims)
+
+    def __getitem__(self, key):
+        # x is copied, so in-place operations on the result cannot alter self,
+        # while dx stays a view which in-place operations on either do not write into
+        return self._share(_copy(self.x[key]), self.dx[self._dx_key(key)])
+
+    def reshape(self, *shape):
+        '''Same as `np.reshape(self, shape)`'''
+        if len(shape) == 1 and np.ndim(shape[0]):
+            shape, = shape
+        x = np.reshape(self.x, shape)
+        return self._share(_copy(x), np.reshape(self.dx, self._dx_shape(np.shape(x))))
+
+    def transpose(self, *axes):
+        '''Same as `np.transpose(self, axes)`'''
+        if len(axes) == 1 and (axes[0] is None or np.ndim(axes[0])):
+            axes, = axes
+        if not axes:
+            axes = tuple(reversed(range(np.ndim(self.x))))
+        return self._share(_copy(np.transpose(self.x, axes)),
+                           np.transpose(self.dx, self._dx_axes(axes)))
+
+    @property
+    def T(self): # pylint: disable=invalid-name, missing-docstring
+        return self.transpose()
+
+    @staticmethod
+    def _primal(other):
+        return other.x if isinstance(other, DualNumber) else other
 
     def __gt__(self, other):
-        other = DualNumber.create(other)
-        return self.x > other.x
+        return self.x > self._primal(other)
 
     def __ge__(self, other):
-        other = DualNumber.create(other)
-        return self.x >= other.x
+        return self.x >= self._primal(other)
 
     def __lt__(self, other):
-        other = DualNumber.create(other)
-        return self.x < other.x
+        return self.x < self._primal(other)
 
     def __le__(self, other):
-        other = DualNumber.create(other)
-        return self.x <= other.x
+        return self.x <= self._primal(other)
 
     @property
     def size_dx(self): # pylint: disable=missing-docstring
         return np.linalg.norm(self.dx)
+
+    def _dx_axis(self, axis, ndim=None): # pylint: disable=no-self-use, unused-argument
+        '''Axis of `dx` corresponding to the axis, or axes, `axis` of an `x` of `ndim` dimensions'''
+        return axis
+
+    def _dx_key(self, key): # pylint: disable=no-self-use
+        '''Index into `dx` corresponding to the index `key` into `x`'''
+        return key
+
+    def _dx_shape(self, shape): # pylint: disable=no-self-use
+        '''Shape of `dx` for an `x` of `shape`'''
+        return shape
+
+    def _dx_axes(self, axes): # pylint: disable=no-self-use
+        '''Permutation of the axes of `dx` for the permutation `axes` of the axes of `x`'''
+        return axes
+
+    def _dx_subscripts(self, subscripts, letter): # pylint: disable=no-self-use, unused-argument
+        '''`np.einsum` subscripts of `dx` for the subscripts of `x`, `letter` being unused'''
+        return subscripts
+
+    def _zero_dx(self, shape):
+        '''Zero tangent for a constant of `shape`'''
+        if isinstance(self.dx, DualNumber):
+            return self.dx._constant(np.zeros(shape)) # pylint: disable=protected-access
+        return np.zeros(shape)
+
+    def _constant(self, value):
+        '''A constant `value` as a DualNumber of the same kind as self'''
+        return self._new(value, self._zero_dx(np.shape(value)))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        '''
+        NumPy ufuncs on DualNumbers propagate tangents, so NumPy-written
+        functions such as `np.exp(d)` or `array * d` are differentiable.
+
+        Ufuncs without a derivative rule raise TypeError rather than dropping the tangent.
+        '''
+        if method == 'reduce' and ufunc is np.add and len(inputs) == 1:
+            return np.sum(inputs[0], **{'axis': 0, **kwargs})
+        if method != '__call__':
+            return NotImplemented
+        out = kwargs.pop('out', None)
+        if kwargs:
+            return NotImplemented
+        if out is not None:
+            return _ufunc_into(ufunc, inputs, out)
+        values = [d.x if isinstance(d, DualNumber) else d for d in inputs]
+        if ufunc in _VALUE_UFUNCS:
+            return ufunc(*values)
+        if ufunc in _OPERATORS:
+            if isinstance(inputs[0], DualNumber):
+                return _OPERATORS[ufunc](*inputs)
+            return getattr(inputs[1], '__r{}__'.format(_OPERATORS[ufunc].__name__))(inputs[0])
+        if ufunc is np.matmul:
+            if not isinstance(inputs[0], DualNumber):
+                return inputs[1].__rmatmul__(inputs[0])
+            return _matmul(*inputs)
+        if ufunc is np.negative:
+            return -self
+        if ufunc is np.positive:
+            return self._share(+self.x, self.dx)
+        if ufunc in _CONSTANT_UFUNCS:
+            return self._new(ufunc(self.x), self.dx * 0)
+        if ufunc in _UNARY_DERIVATIVES:
+            y = ufunc(self.x)
+            return self.chain(y, _UNARY_DERIVATIVES[ufunc](self.x, y))
+        if ufunc in _BINARY_DERIVATIVES:
+            y = ufunc(*values)
+            dx = None
+            for operand, der in zip(inputs, _BINARY_DERIVATIVES[ufunc]):
+                if isinstance(operand, DualNumber):
+                    term = operand.dx * self._tangent(der(*values, y))
+                    dx = term if dx is None else dx + term
+            return self._new(y, dx)
+        return NotImplemented
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func not in _ARRAY_FUNCTIONS:
+            return NotImplemented
+        return _ARRAY_FUNCTIONS[func](*args, **kwargs)
+
+
+class MultiDualNumber(DualNumber):
+    '''
+    DualNumber carrying several tangent directions at once.
+
+    `dx` has one more axis than `x`: the trailing axis indexes the tangent
+    directions, so a single evaluation of a function propagates every
+    direction simultaneously.
+
+    Parameters
+    ----------
+    x: float or np.array
+        Corresponds to a variable.
+    dx: np.array
+        Tangent directions. Must have shape `x.shape + (num_tangents,)`
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def seed(cls, x, dtype=None):
+        '''
+        Creates one MultiDualNumber per component of `x`, seeded with the identity
+
+        Parameters
+        ----------
+        x: np.array
+            Input variable whose last axis indexes the components.  Any leading
+            axes are treated as a batch of independent input points.
+        dtype: np.dtype or None
+            dtype of the values and seeds.  If None, that of a floating point
+            `x`, or else the default dtype, see `set_dtype`.
+
+        Returns
+        -------
+        list of MultiDualNumber
+            The `i`-th element has value `x[..., i]` and tangent `e_i`
+        '''
+        x = _as_array(x) if dtype is None else np.array(x, dtype=resolve_dtype(dtype))
+        num = x.shape[-1]
+        eye = np.eye(num, dtype=x.dtype)
+        return [cls._new(x[..., i], np.broadcast_to(eye[i], x.shape))
+                for i in range(num)]
+
+    @property
+    def num_tangents(self): # pylint: disable=missing-docstring
+        return self.dx.shape[-1]
+
+    def _validate(self):
+        if self.dx.shape[:-1] != self.x.shape or self.dx.ndim != self.x.ndim + 1:
+            raise DualNumberError(
+                "dx must have shape x.shape + (num_tangents,) but got {} and {}".format(
+                    self.x.shape, self.dx.shape))
+
+    def _broadcast_dx(self, x):
+        if np.shape(x) == self.x.shape:
+            return self.dx
+        return np.broadcast_to(self.dx, np.shape(x) + (self.num_tangents,))
+
+    def _tangent(self, value):
+        if not np.ndim(value):
+            # Python scalars broadcast as they are, and keep the dtype of the tangents
+            return value
+        return np.expand_dims(value, -1)
+
+    def _dx_axis(self, axis, ndim=None):
+        ndim = np.ndim(self.x) if ndim is None else ndim
+        if axis is None:
+            return tuple(range(ndim))
+        if np.ndim(axis):
+            return tuple(int(a) % ndim for a in axis)
+        return int(axis) % ndim
+
+    def _dx_key(self, key):
+        return (key if isinstance(key, tuple) else (key,)) + (slice(None),)
+
+    def _dx_shape(self, shape):
+        return tuple(shape) + (self.num_tangents,)
+
+    def _dx_axes(self, axes):
+        return tuple(self._dx_axis(axes)) + (np.ndim(self.x),)
+
+    def _dx_subscripts(self, subscripts, letter):
+        return subscripts + letter
+
+    def _zero_dx(self, shape):
+        return np.zeros(tuple(shape) + (self.num_tangents,))
+
+
+def _copy(value):
+    return value.copy() if isinstance(value, np.ndarray) else value
+
+
+def _promote(operands):
+    '''The first DualNumber of `operands`, and `operands` with constants made DualNumbers'''
+    # pylint: disable=protected-access
+    dual = next(d for d in operands if isinstance(d, DualNumber))
+    return dual, [d if isinstance(d, DualNumber) else dual._constant(np.asarray(d))
+                  for d in operands]
+
+
+def _ufunc_into(ufunc, inputs, out):
+    '''`ufunc(*inputs, out=out)` for the arithmetic ufuncs, see `DualNumber.add`'''
+    if len(out) != 1 or not isinstance(out[0], DualNumber) or ufunc not in _OPERATORS:
+        return NotImplemented
+    first, second = inputs
+    if not isinstance(first, DualNumber):
+        if ufunc not in (np.add, np.multiply):
+            return NotImplemented
+        first, second = second, first
+    return getattr(first, _OPERATORS[ufunc].__name__)(second, out=out[0])
+
+
+def _implements(*funcs):
+    '''Registers the decorated function as the DualNumber implementation of NumPy `funcs`'''
+    def register(implementation):
+        for func in funcs:
+            _ARRAY_FUNCTIONS[func] = implementation
+        return implementation
+    return register
+
+
+@_implements(np.shape)
+def _shape(array):
+    return array.shape
+
+
+@_implements(np.ndim)
+def _ndim(array):
+    return len(array.shape)
+
+
+@_implements(np.size)
+def _size(array, axis=None):
+    return np.size(array.x, axis)
+
+
+def _einsum_subscripts(subscripts):
+    '''
+    Input subscripts and output subscript of `np.einsum(subscripts, ...)`,
+    with the implicit output made explicit, and a letter used by neither
+    '''
+    subscripts = subscripts.replace(' ', '')
+    if '->' in subscripts:
+        inputs, output = subscripts.split('->')
+    else:
+        inputs = subscripts
+        letters = inputs.replace(',', '').replace('.', '')
+        output = ('...' if '...' in inputs else '') + ''.join(
+            sorted(c for c in set(letters) if letters.count(c) == 1))
+    letter = next(c for c in string.ascii_letters if c not in subscripts)
+    return inputs.split(','), output, letter
+
+
+@_implements(np.einsum)
+def _einsum(subscripts, *operands, **kwargs):
+    '''
+    Product rule: the tangent of an einsum is the sum, over the DualNumber
+    operands, of the einsum with that operand replaced by its tangent.
+    '''
+    inputs, output, letter = _einsum_subscripts(subscripts)
+    values = [DualNumber._primal(op) for op in operands] # pylint: disable=protected-access
+    x = np.einsum(subscripts, *values, **kwargs)
+    dual, dx = None, None
+    for i, operand in enumerate(operands):
+        if isinstance(operand, DualNumber):
+            dual = operand
+            specs = list(inputs)
+            # pylint: disable=protected-access
+            specs[i] = operand._dx_subscripts(specs[i], letter)
+            spec = ','.join(specs) + '->' + operand._dx_subscripts(output, letter)
+            term = np.einsum(spec, *(values[:i] + [operand.dx] + values[i + 1:]), **kwargs)
+            dx = term if dx is None else dx + term
+    return dual._new(x, dx) # pylint: disable=protected-access
+
+
+def _matmul(left, right):
+    '''`left @ right` where either is a DualNumber, as an einsum'''
+    left_spec = 'j' if np.ndim(left) == 1 else '...ij'
+    right_spec = 'j' if np.ndim(right) == 1 else '...jk'
+    output = (('...' if np.ndim(left) > 1 or np.ndim(right) > 1 else '')
+              + left_spec[3:4] + right_spec[4:])
+    return _einsum('{},{}->{}'.format(left_spec, right_spec, output), left, right)
+
+
+@_implements(np.dot)
+def _dot(left, right):
+    left_ndim, right_ndim = np.ndim(left), np.ndim(right)
+    if not left_ndim or not right_ndim:
+        return left * right
+    left_spec = 'abcdefgh'[:left_ndim - 1] + 'z'
+    right_spec = 'z' if right_ndim == 1 else 'ijklmnop'[:right_ndim - 2] + 'zy'
+    output = left_spec[:-1] + right_spec.replace('z', '')
+    return _einsum('{},{}->{}'.format(left_spec, right_spec, output), left, right)
+
+
+@_implements(np.stack)
+def _stack(arrays, axis=0):
+    return DualNumber.stack(arrays, axis)
+
+
+@_implements(np.concatenate)
+def _concatenate(arrays, axis=0):
+    return DualNumber.concatenate(arrays, axis)
+
+
+@_implements(np.reshape)
+def _reshape(array, shape):
+    return array.reshape(shape)
+
+
+@_implements(np.transpose)
+def _transpose(array, axes=None):
+    return array.transpose(axes)
+
+
+@_implements(np.sum)
+def _sum(array, axis=None, keepdims=False):
+    # pylint: disable=protected-access
+    return array._new(np.sum(array.x, axis=axis, keepdims=keepdims),
+                      np.sum(array.dx, axis=array._dx_axis(axis), keepdims=keepdims))
+
+
+@_implements(np.mean)
+def _mean(array, axis=None, keepdims=False):
+    # pylint: disable=protected-access
+    return array._new(np.mean(array.x, axis=axis, keepdims=keepdims),
+                      np.mean(array.dx, axis=array._dx_axis(axis), keepdims=keepdims))
+
+
+@_implements(np.where)
+def _where(condition, x, y):
+    condition = primal(condition)
+    duals = [d for d in (x, y) if isinstance(d, DualNumber)]
+    if not duals:
+        return np.where(condition, x, y)
+    dual = duals[0]
+    dx = [d.dx if isinstance(d, DualNumber) else 0 for d in (x, y)]
+    # pylint: disable=protected-access
+    return dual._new(np.where(condition, DualNumber._primal(x), DualNumber._primal(y)),
+                     np.where(dual._tangent(condition), *dx))
+
+
+@_implements(np.broadcast_to)
+def _broadcast_to(array, shape):
+    x = np.broadcast_to(array.x, shape)
+    return array._share(x, array._broadcast_dx(x)) # pylint: disable=protected-access
+
+
+@_implements(np.array_equal)
+def _array_equal(left, right, equal_nan=False): # pylint: disable=unused-argument
+    return left == right
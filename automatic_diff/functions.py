@@ -1,77 +1,139 @@
 '''
 Transcendental functions for dual numbers
+
+Each function also accepts plain floats and arrays, and recurses into the
+payload of nested DualNumbers, so it can be applied at every level of a
+dual number of dual numbers.
 '''
 # pylint: disable=missing-docstring
 import numpy as np
 from automatic_diff.dual_number import DualNumber
+from automatic_diff.reverse import ReverseNumber
+
+
+def _is_dual(d):
+    return isinstance(d, (DualNumber, ReverseNumber))
 
 
 def exp(d: DualNumber):
-    return DualNumber(np.exp(d.x), np.exp(d.x) * d.dx)
+    if not _is_dual(d):
+        return np.exp(d)
+    ex = exp(d.x)
+    return d.chain(ex, ex)
 
 
 def log(d: DualNumber):
-    return DualNumber(np.log(d.x), d.dx / d.x)
+    if not _is_dual(d):
+        return np.log(d)
+    return d.chain(log(d.x), 1 / d.x)
 
 
 def sigmoid(d: DualNumber):
-    return 1 / (1 + exp(-d))
+    if not _is_dual(d):
+        return 1 / (1 + np.exp(-d))
+    sigmoid_x = sigmoid(d.x)
+    return d.chain(sigmoid_x, sigmoid_x * (1 - sigmoid_x))
 
 
 def sin(d: DualNumber):
-    return DualNumber(np.sin(d.x), np.cos(d.x) * d.dx)
+    if not _is_dual(d):
+        return np.sin(d)
+    return d.chain(sin(d.x), cos(d.x))
 
 
 def cos(d: DualNumber):
-    return DualNumber(np.cos(d.x), - np.sin(d.x) * d.dx)
+    if not _is_dual(d):
+        return np.cos(d)
+    return d.chain(cos(d.x), - sin(d.x))
 
 
 def tan(d: DualNumber):
-    return sin(d) / cos(d)
+    if not _is_dual(d):
+        return np.tan(d)
+    tan_x = tan(d.x)
+    return d.chain(tan_x, 1 + tan_x**2)
 
 
 def cot(d: DualNumber):
-    return 1 / tan(d)
+    if not _is_dual(d):
+        return 1 / np.tan(d)
+    cot_x = cot(d.x)
+    return d.chain(cot_x, -(1 + cot_x**2))
 
 
 def csc(d: DualNumber):
-    return 1 / sin(d)
+    if not _is_dual(d):
+        return 1 / np.sin(d)
+    csc_x = csc(d.x)
+    return d.chain(csc_x, -csc_x * csc_x * cos(d.x))
 
 
 def sec(d: DualNumber):
-    return 1 / cos(d)
+    if not _is_dual(d):
+        return 1 / np.cos(d)
+    sec_x = sec(d.x)
+    return d.chain(sec_x, sec_x * sec_x * sin(d.x))
 
 
 def sinh(d: DualNumber):
-    return (exp(d) - exp(-d)) / 2
+    if not _is_dual(d):
+        return np.sinh(d)
+    return d.chain(sinh(d.x), cosh(d.x))
 
 
 def cosh(d: DualNumber):
-    return (exp(d) + exp(-d)) / 2
+    if not _is_dual(d):
+        return np.cosh(d)
+    return d.chain(cosh(d.x), sinh(d.x))
 
 
 def tanh(d: DualNumber):
-    return sinh(d) / cosh(d)
+    if not _is_dual(d):
+        return np.tanh(d)
+    tanh_x = tanh(d.x)
+    return d.chain(tanh_x, 1 - tanh_x**2)
 
 
 def coth(d: DualNumber):
-    return 1 / tanh(d)
+    if not _is_dual(d):
+        return 1 / np.tanh(d)
+    coth_x = coth(d.x)
+    return d.chain(coth_x, 1 - coth_x**2)
 
 
 def csch(d: DualNumber):
-    return 1 / sinh(d)
+    if not _is_dual(d):
+        return 1 / np.sinh(d)
+    csch_x = csch(d.x)
+    return d.chain(csch_x, -csch_x * csch_x * cosh(d.x))
 
 
 def sech(d: DualNumber):
-    return 1 / cosh(d)
+    if not _is_dual(d):
+        return 1 / np.cosh(d)
+    sech_x = sech(d.x)
+    return d.chain(sech_x, -sech_x * tanh(d.x))
 
 
 def matmul(matrix: np.ndarray, d: DualNumber):
-    if d.shape:
-        x = np.matmul(matrix, d.x)
-        dx = np.matmul(matrix, d.dx)
-    else:
-        x = matrix * d.x
-        dx = matrix * d.dx
-
-    return DualNumber(x, dx)
+    if _is_dual(matrix):
+        return matrix @ d
+    if not _is_dual(d):
+        return np.matmul(matrix, d)
+    if not d.shape:
+        return d.chain(matrix * d.x, matrix)
+    return matrix @ d
+
+
+def stack(duals):
+    dual = next((d for d in duals if _is_dual(d)), None)
+    if dual is None:
+        return np.stack(duals)
+    return dual.stack(duals)
+
+
+def concatenate(duals, axis=0):
+    dual = next((d for d in duals if _is_dual(d)), None)
+    if dual is None:
+        return np.concatenate(duals, axis)
+    return dual.concatenate(duals, axis)
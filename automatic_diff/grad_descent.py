@@ -2,9 +2,14 @@
 Implementation of gradient descent using dual numbers
 '''
 # pylint: disable=too-many-instance-attributes, too-many-arguments
+import concurrent.futures
+import copy
+import functools
+import time
 import numpy as np
-from automatic_diff.dual_number import DualNumber
-from automatic_diff.gradients import gradient
+from automatic_diff.callbacks import Callback, FunctionCallback, load_checkpoint
+from automatic_diff.dual_number import DualNumber, DualNumberError
+from automatic_diff.gradients import gradient, gradient_batch
 from automatic_diff.learning_rates import LearningRate
 
 
@@ -15,18 +20,44 @@ class GradientDescent:
     Casual users would benefit from using the `grad_descent` wrapper function
     rather than this class.
 
+    The arrays of `dual_x`, and the gradient array `grad`, are allocated once
+    per fit and updated in place by every iteration.  `num_func_evals` and
+    `num_grad_evals` count the evaluations of `func` alone, and of `func`
+    together with its gradient.  `iter_seconds` is the duration of the last
+    iteration, split into `grad_seconds` evaluating `func` and `update_seconds`.
+    After a fit, `stop_reason` is why it stopped: "tol", "max_iters",
+    "callback", or a reason particular to the optimizer.
+
     Parameters
     ----------
     func: function
         Dual-number function to be minimized
     '''
+    # attributes a fit is resumed from, together with the learning rate's state, see `get_state`
+    _state_names = ('dual_x', 'y', 'dy', 'grad', 'num_iter', 'num_func_evals', 'num_grad_evals')
+
     def __init__(self, func):
         self.func = func
         self.dual_x = None
         self.y = None
         self.dy = None
+        self.grad = None
         self.lr = None
+        self.mode = "forward"
+        self.executor = None
+        self.n_jobs = None
         self.num_iter = 0
+        self.num_func_evals = 0
+        self.num_grad_evals = 0
+        self.tol = None
+        self.max_iters = None
+        self.dtype = None
+        self.callbacks = []
+        self.cache = None
+        self.stop_reason = None
+        self.iter_seconds = 0.
+        self.grad_seconds = 0.
+        self.update_seconds = 0.
 
     @property
     def dual_x(self): # pylint: disable=missing-docstring
@@ -53,7 +84,33 @@ class GradientDescent:
         self.__lr = LearningRate.create(lr) # pylint: disable=attribute-defined-outside-init
         self.__lr.num_iters = 0
 
-    def fit(self, initial_x=None, tol=1e-2, max_iters=10, lr=0.1, verbose=False):
+    def get_state(self):
+        '''
+        Returns
+        -------
+        dict:
+            Copy of everything a fit needs to carry on from the current
+            iteration, including the state of the learning rate under "lr".
+            The function, learning rate type and fit parameters are not included.
+        '''
+        state = {name: copy.deepcopy(getattr(self, name)) for name in self._state_names}
+        state['lr'] = self.lr.get_state()
+        return state
+
+    def set_state(self, state):
+        '''Restores the state returned by `get_state`'''
+        state = dict(state)
+        self.lr.set_state(state.pop('lr'))
+        for name, value in state.items():
+            current = getattr(self, name, None)
+            if isinstance(current, np.ndarray) and current.shape == np.shape(value):
+                # the buffers of the fit, and anything sharing them, are kept
+                current[...] = value
+            else:
+                setattr(self, name, copy.deepcopy(value))
+
+    def fit(self, initial_x=None, tol=1e-2, max_iters=10, lr=0.1, verbose=False, mode="forward",
+            executor=None, n_jobs=None, callbacks=None, resume=None, dtype=None, cache=None):
         '''
         Parameters
         ----------
@@ -71,24 +128,285 @@ class GradientDescent:
             adaptive learning rates and momentum.
         verbose: bool
             If true, status messages printed after each iteration.
+        mode: str
+            Differentiation mode passed to `gradients.gradient`: "forward",
+            "reverse" or "compiled".  With "compiled", `func` is traced on the
+            first iteration and the trace is replayed on every later one.
+        executor: concurrent.futures.Executor or None
+            Passed to `gradients.gradient`, to evaluate chunks of partial derivatives in parallel
+        n_jobs: int or None
+            Number of chunks of partial derivatives.  If given without an
+            `executor`, a process pool with `n_jobs` workers is kept for the whole fit.
+        callbacks: sequence of callbacks.Callback or functions, or None
+            Hooks called at the start and end of the fit and after every
+            iteration, see `callbacks.Callback`.  A function is called as
+            `function(grad_descent)` after every iteration.  The fit stops
+            early when a call after an iteration returns True.
+        resume: str, dict or None
+            Path of a checkpoint written by `callbacks.Checkpoint`, or a state
+            returned by `get_state`, to carry on from instead of `initial_x`.
+            `lr` must be of the same type as the learning rate checkpointed,
+            and `max_iters` still counts the iterations before the checkpoint.
+        dtype: np.dtype or None
+            dtype of x, its gradient and the learning rate's state.  If None,
+            that of a floating point `initial_x`, or else the default dtype,
+            see `dual_number.set_dtype`.
+        cache: cache.ResultCache or None
+            Passed to `gradients.gradient`, so points evaluated before, e.g.
+            by an earlier fit of the same function, are not evaluated again.
+            Evaluations served by the cache are still counted.
         '''
         self.num_iter = 0
+        self.num_func_evals = 0
+        self.num_grad_evals = 0
+        self.tol = tol
+        self.max_iters = max_iters
+        self.dtype = dtype
         self.lr = lr
-        self.dual_x = DualNumber.create(initial_x)
-        self.dual_x.dx = 2 * tol * np.ones_like(self.dx)
-        while self.num_iter < max_iters and self.dual_x.size_dx > tol:
+        self.mode = mode
+        self.n_jobs = n_jobs
+        self.cache = cache
+        self.callbacks = [callback if isinstance(callback, Callback) else FunctionCallback(callback)
+                          for callback in callbacks or ()]
+        if executor is None and n_jobs is not None:
+            with concurrent.futures.ProcessPoolExecutor(n_jobs) as pool:
+                self.executor = pool
+                self._descend(initial_x, verbose, resume)
+            self.executor = None
+        else:
+            self.executor = executor
+            self._descend(initial_x, verbose, resume)
+
+    def _descend(self, initial_x, verbose, resume=None):
+        if resume is None:
+            self._start(initial_x)
+        else:
+            state = load_checkpoint(resume) if isinstance(resume, str) else resume
+            self._start(state['dual_x'].x)
+            self.set_state(state)
+        self._iterate(verbose)
+
+    def _start(self, initial_x):
+        '''Allocates the buffers of a fit from `initial_x`'''
+        self.dual_x = DualNumber.create(initial_x, dtype=self.dtype)
+        self.dtype = self.x.dtype
+        self.grad = np.zeros_like(self.x)
+
+    def _converged(self):
+        return self.num_iter > 0 and self.dual_x.size_dx <= self.tol
+
+    def _status(self):
+        return "x:  {}".format(self.dual_x)
+
+    def _iterate(self, verbose):
+        for callback in self.callbacks:
+            callback.on_fit_begin(self)
+        self.stop_reason = None
+        while self.stop_reason is None:
+            if self.num_iter >= self.max_iters:
+                self.stop_reason = "max_iters"
+                break
+            if self._converged():
+                self.stop_reason = "tol"
+                break
+            start = time.perf_counter()
+            self.grad_seconds = 0.
             self._grad_descent_step()
             self.num_iter += 1
+            self.iter_seconds = time.perf_counter() - start
+            self.update_seconds = self.iter_seconds - self.grad_seconds
+            if any([callback.on_iteration_end(self) for callback in self.callbacks]):
+                self.stop_reason = self.stop_reason or "callback"
             if verbose:
-                print("Iteration {}\n\tx:  {}\n".format(self.num_iter, self.dual_x))
+                print("Iteration {}\n\t{}\n".format(self.num_iter, self._status()))
+        for callback in self.callbacks:
+            callback.on_fit_end(self)
         if verbose:
             print("y:  {}\n".format(self.y))
 
+    def _step_func(self):
+        '''Objective differentiated at the current step'''
+        return self.func
+
+    def _grad_descent_step(self):
+        # x, dx and grad are buffers reused by every iteration
+        start = time.perf_counter()
+        self.y, self.dy = gradient(self.x, self._step_func(), mode=self.mode,
+                                   executor=self.executor, n_jobs=self.n_jobs, cache=self.cache)
+        self.grad_seconds += time.perf_counter() - start
+        self.num_grad_evals += 1
+        self.grad[...] = self.dy
+        step = self.lr.update_into(self, self.dx)
+        np.subtract(self.x, step, out=self.x)
+
+
+class StochasticGradientDescent(GradientDescent):
+    '''
+    Mini-batch stochastic gradient descent.
+
+    Each step differentiates the objective on a mini-batch of rows only, so the
+    cost of a step does not grow with the number of rows.
+
+    Parameters
+    ----------
+    func: function
+        Dual-number function to be minimized.  Called as `func(rows, *x)`, where
+        `rows` is the integer index array of the current mini-batch.
+    num_rows: int
+        Number of rows that mini-batches are drawn from
+    '''
+    def __init__(self, func, num_rows):
+        super().__init__(func)
+        self.num_rows = num_rows
+        self.batch_size = None
+        self.shuffle = True
+        self.num_epoch = 0
+        self._random_state = None
+        self._batches = iter(())
+
+    _state_names = GradientDescent._state_names + ('num_epoch', '_random_state', '_batches')
+
+    def fit(self, initial_x=None, tol=1e-2, max_iters=None, lr=0.1, verbose=False,
+            mode="forward", executor=None, n_jobs=None, callbacks=None, resume=None, dtype=None,
+            cache=None, *, batch_size=32, epochs=1, shuffle=True, seed=None):
+        '''
+        Parameters
+        ----------
+        initial_x, tol, lr, verbose, executor, n_jobs, callbacks, resume, dtype:
+            As in `GradientDescent.fit`
+        mode: str
+            "forward" or "reverse", as in `GradientDescent.fit`.  "compiled" is
+            not supported, as the objective differs from one mini-batch to the next.
+        max_iters: int or None
+            Maximum number of iterations, i.e. mini-batches.  If None, as many
+            iterations as it takes to complete `epochs`.
+        cache: None
+            Not supported, for the same reason as "compiled", so must be None
+        batch_size: int
+            Number of rows per mini-batch.  The last mini-batch of an epoch may be smaller.
+        epochs: int
+            Maximum number of passes over the rows
+        shuffle: bool
+            If true, rows are reshuffled at the start of every epoch
+        seed: int or None
+            Seed for the shuffling
+        '''
+        if mode == "compiled":
+            raise DualNumberError("mode 'compiled' cannot be used with mini-batches")
+        if cache is not None:
+            raise DualNumberError("cache cannot be used with mini-batches")
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.num_epoch = 0
+        self._random_state = np.random.RandomState(seed)
+        self._batches = iter(())
+        num_batches = -(-self.num_rows // batch_size)
+        if max_iters is None:
+            max_iters = epochs * num_batches
+        max_iters = min(max_iters, epochs * num_batches)
+        super().fit(initial_x, tol=tol, max_iters=max_iters, lr=lr, verbose=verbose, mode=mode,
+                    executor=executor, n_jobs=n_jobs, callbacks=callbacks, resume=resume,
+                    dtype=dtype)
+
+    def _epoch_batches(self):
+        if self.shuffle:
+            rows = self._random_state.permutation(self.num_rows)
+        else:
+            rows = np.arange(self.num_rows)
+        return iter([rows[i:i + self.batch_size]
+                     for i in range(0, self.num_rows, self.batch_size)])
+
+    def _step_func(self):
+        rows = next(self._batches, None)
+        if rows is None:
+            self._batches = self._epoch_batches()
+            self.num_epoch += 1
+            rows = next(self._batches)
+        return functools.partial(self.func, rows)
+
+
+class PopulationGradientDescent(GradientDescent):
+    '''
+    Gradient descent from many initial points at once.
+
+    The points are rows of a single array, and every step evaluates the
+    objective and its gradient at all of them with one call of `func`, see
+    `gradients.gradient_batch`.  Learning rates are applied row by row.  A
+    member whose step falls below `tol` has converged, and is no longer
+    evaluated or updated.
+
+    Parameters
+    ----------
+    func: function
+        Dual-number function to be minimized.  It is called with one argument
+        per variable, holding that variable for every active member, and must
+        operate elementwise across the members.
+    '''
+    def __init__(self, func):
+        super().__init__(func)
+        self.active = None
+        self._step = None
+
+    _state_names = GradientDescent._state_names + ('active',)
+
+    @property
+    def converged(self): # pylint: disable=missing-docstring
+        return None if self.active is None else ~self.active
+
+    @property
+    def best(self):
+        '''Index of the member with the least objective value'''
+        return int(np.nanargmin(self.y))
+
+    def fit(self, initial_x=None, tol=1e-2, max_iters=10, lr=0.1, verbose=False,
+            mode="forward", executor=None, n_jobs=None, callbacks=None, resume=None, dtype=None,
+            cache=None):
+        '''
+        Parameters
+        ----------
+        initial_x: np.array
+            Initial points, number of members by number of variables
+        tol, max_iters, lr, verbose, callbacks, resume, dtype:
+            As in `GradientDescent.fit`, with `tol` applying to each member separately
+        mode: str
+            "forward" or "reverse", as in `gradients.gradient_batch`
+        executor, n_jobs, cache: None
+            Not supported, as all members are evaluated by a single call of
+            `func`, so must be None
+        '''
+        if executor is not None or n_jobs is not None or cache is not None:
+            raise DualNumberError(
+                "executor, n_jobs and cache cannot be used with a population of points")
+        super().fit(initial_x, tol=tol, max_iters=max_iters, lr=lr, verbose=verbose, mode=mode,
+                    callbacks=callbacks, resume=resume, dtype=dtype)
+
+    def _start(self, initial_x):
+        super()._start(initial_x)
+        self.dy = self.grad
+        self.y = np.full(len(self.x), np.nan, dtype=self.dtype)
+        self.active = np.ones(len(self.x), dtype=bool)
+        self._step = np.empty_like(self.x)
+
+    def _converged(self):
+        return not self.active.any()
+
+    def _status(self):
+        return "active:  {}\n\tbest y:  {}".format(self.active.sum(), self.y[self.best])
+
     def _grad_descent_step(self):
-        self.y, self.dy = gradient(self.x, self.func)
-        new_dx = self.lr.update(self)
-        new_x = self.x - new_dx
-        self.dual_x = DualNumber(new_x, new_dx)
+        active = self.active
+        start = time.perf_counter()
+        self.y[active], self.grad[active] = gradient_batch(self.x[active], self.func,
+                                                           mode=self.mode)
+        self.grad_seconds += time.perf_counter() - start
+        self.num_grad_evals += 1
+        # the stale gradients of converged members may make their steps 0 / 0,
+        # and those steps are discarded
+        with np.errstate(invalid='ignore', divide='ignore'):
+            step = self.lr.update_into(self, self._step)
+        self.dx[active] = step[active]
+        self.x[active] -= step[active]
+        self.active &= np.linalg.norm(self.dx, axis=-1) > self.tol
 
 
 def grad_descent(initial_x, func, **fit_kwargs):
@@ -113,3 +431,58 @@ def grad_descent(initial_x, func, **fit_kwargs):
     grad_desc = GradientDescent(func)
     grad_desc.fit(initial_x, **fit_kwargs)
     return grad_desc.dual_x, grad_desc.y, grad_desc.dy
+
+
+def stochastic_grad_descent(initial_x, func, num_rows, **fit_kwargs):
+    '''
+    Estimates minimum value of func using mini-batch stochastic gradient descent
+
+    Parameters
+    ----------
+    initial_x: float or np.array
+    func:
+        Dual-number function called as `func(rows, *x)`, where `rows` indexes the mini-batch
+    num_rows: int
+        Number of rows that mini-batches are drawn from
+    fit_kwargs:
+        Keyword args passed to `StochasticGradientDescent` instance's `fit`
+
+    Returns
+    -------
+    tuple:
+        dual_number: representing the minimizing x and its gradient step
+        float: value of the function on the last mini-batch
+        float: gradient step on the last mini-batch
+    '''
+    grad_desc = StochasticGradientDescent(func, num_rows)
+    grad_desc.fit(initial_x, **fit_kwargs)
+    return grad_desc.dual_x, grad_desc.y, grad_desc.dy
+
+
+def multi_start_grad_descent(initial_x, func, **fit_kwargs):
+    '''
+    Estimates minimum value of func using gradient descent from many initial points at once
+
+    Parameters
+    ----------
+    initial_x: np.array
+        Initial points, number of members by number of variables
+    func:
+        Dual-number function operating elementwise across members, see `PopulationGradientDescent`
+    fit_kwargs:
+        Keyword args passed to `PopulationGradientDescent` instance's `fit`
+
+    Returns
+    -------
+    tuple:
+        dual_number: representing the best minimizing x and its gradient step
+        float: estimated minimum value of function
+        np.array: gradient at the best minimizing x
+        dual_number: the final x and gradient step of every member
+        np.array: the final value of function of every member
+    '''
+    grad_desc = PopulationGradientDescent(func)
+    grad_desc.fit(initial_x, **fit_kwargs)
+    best = grad_desc.best
+    return (DualNumber(grad_desc.x[best], grad_desc.dx[best]), grad_desc.y[best],
+            grad_desc.grad[best], grad_desc.dual_x, grad_desc.y)
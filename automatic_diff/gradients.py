@@ -1,11 +1,23 @@
 '''
 Gradients and partial derivatives for Dual Numbers
 '''
+import concurrent.futures
+import os
 import numpy as np
-from automatic_diff.dual_number import DualNumber
+from automatic_diff.dual_number import DualNumber, DualNumberError, MultiDualNumber, resolve_dtype
+from automatic_diff.reverse import ReverseNumber, Tape
+from automatic_diff.sparse import SparseDualNumber
+from automatic_diff.trace import compiled_gradient
 
 
-def partial_der(x, func, idx):
+def _input(x, dtype):
+    '''`x` as an array of `dtype`, or of its own floating point dtype or the default if None'''
+    if dtype is None and isinstance(x, np.ndarray) and x.dtype.kind == 'f':
+        return x
+    return np.array(x, dtype=resolve_dtype(dtype))
+
+
+def partial_der(x, func, idx, dtype=None):
     '''
     Parameters
     ----------
@@ -15,16 +27,21 @@ def partial_der(x, func, idx):
         Dual-Number implemented function that takes input in shape of `x`
     idx: int
         Index of variable to take partial derivative with respect to
+    dtype: np.dtype or None
+        dtype of the input and seed.  If None, that of a floating point `x`,
+        or else the default dtype, see `dual_number.set_dtype`.
 
     Returns
     -------
     DualNumber
         (x, dx) = (value of `func(x)`, partial derivative of `func` wrt x[`idx`]
     '''
-    return func(*[DualNumber(component, int(i == idx)) for i, component in enumerate(x)])
+    x = _input(x, dtype)
+    return func(*[DualNumber(component, np.asarray(i == idx, dtype=x.dtype))
+                  for i, component in enumerate(x)])
 
 
-def gradient(x, func):
+def gradient(x, func, mode="forward", executor=None, n_jobs=None, dtype=None, cache=None):
     '''
     Parameters
     ----------
@@ -32,19 +49,140 @@ def gradient(x, func):
         Input variable
     func: function
         Dual-Number implemented function that takes input in shape of `x`
+    mode: str
+        "forward" propagates dual numbers through `func`.  "sparse" does so
+        with tangents that only store their non-zero directions, see
+        `sparse.SparseDualNumber`, which is cheaper when each intermediate
+        value depends on few inputs.  "reverse" records `func` on a
+        `reverse.Tape` and back-propagates, which is cheaper for
+        scalar-valued functions of many variables.  "compiled" traces the
+        forward mode computation once per function and input shape, see
+        `trace.trace`, and replays the trace on later calls.
+    executor: concurrent.futures.Executor or None
+        If given, the seed directions are split into chunks, and the forward
+        mode evaluations of the chunks run as tasks on `executor`.  For a
+        process pool, `func` must be picklable.
+    n_jobs: int or None
+        Number of chunks of seed directions.  Defaults to the number of CPUs
+        when `executor` is given.  If `n_jobs` is given without an
+        `executor`, a process pool with `n_jobs` workers is used for this call.
+    dtype: np.dtype or None
+        dtype of the input, seeds and so derivatives.  If None, that of a
+        floating point `x`, or else the default dtype, see `dual_number.set_dtype`.
+    cache: cache.ResultCache or None
+        If given, the value and gradient are looked up in `cache`, keyed on
+        `func`, `mode` and `x`, and only evaluated if not found there.
 
     Returns
     -------
     tuple: (float, array of floats)
         First element is the evaluation `func(x)`
         Second element is the list of partial derivatives of `func`
+
+    Notes
+    -----
+    Without an executor, `func` is evaluated only once in every mode.  Forward mode
+    propagates all partial derivatives together as the tangent axis of a `MultiDualNumber`.
+    '''
+    x = _input(x, dtype)
+    if cache is not None:
+        y, grad = cache.get(func, x, lambda: _array_gradient(
+            x, func, mode=mode, executor=executor, n_jobs=n_jobs), kind=("gradient", mode))
+        return y, list(grad)
+    if executor is not None or n_jobs is not None:
+        if mode != "forward":
+            raise DualNumberError("an executor can only be used with mode 'forward'")
+        return _parallel_gradient(x, func, executor, n_jobs)
+    if mode == "forward":
+        y = func(*MultiDualNumber.seed(x))
+        return y.x, list(y.dx)
+    if mode == "sparse":
+        y = func(*SparseDualNumber.seed(x))
+        return y.x, list(np.asarray(y.dx))
+    if mode == "reverse":
+        return _reverse_gradient(x, func)
+    if mode == "compiled":
+        return compiled_gradient(x, func)
+    raise DualNumberError(
+        "mode must be 'forward', 'sparse', 'reverse' or 'compiled' but got {}".format(mode))
+
+
+def _array_gradient(x, func, **kwargs):
+    y, grad = gradient(x, func, **kwargs)
+    return y, np.array(grad, dtype=x.dtype)
+
+
+def gradient_batch(X, func, mode="forward", dtype=None):
     '''
+    Gradients of `func` at many input points, from a single evaluation of `func`
+
+    Parameters
+    ----------
+    X: array-like
+        Number of points by number of variables
+    func: function
+        Dual-Number implemented function that takes one argument per variable
+        and operates elementwise across the points, returning one value per point.
+        DualNumberError is raised for any other result, such as a constant or
+        a value combining the points, whose gradients would not be per point.
+    mode: str
+        "forward" or "reverse", as in `gradient`
+    dtype: np.dtype or None
+        As in `gradient`
+
+    Returns
+    -------
+    tuple: (np.array, np.array)
+        First element is the evaluation of `func` at each point, shape (N,)
+        Second element is the gradient at each point, shape (N, d)
+    '''
+    X = _input(X, dtype)
+    if mode == "forward":
+        y = _batch_output(func(*MultiDualNumber.seed(X)), X)
+        return y.x, y.dx
+    if mode == "reverse":
+        tape = Tape()
+        inputs = [tape.variable(X[:, i]) for i in range(X.shape[1])]
+        y = _batch_output(func(*inputs), X)
+        tape.backward(y)
+        return y.x, np.stack([component.grad for component in inputs], axis=-1)
+    raise DualNumberError("mode must be 'forward' or 'reverse' but got {}".format(mode))
+
+
+def _batch_output(y, X):
+    '''`y` if it holds one dual number value per point of `X`, else raises DualNumberError'''
+    if not isinstance(y, (DualNumber, ReverseNumber)) or np.shape(y.x) != X.shape[:1]:
+        raise DualNumberError(
+            "func must return a dual number of shape {} in gradient_batch but got {} of shape {}"
+            .format(X.shape[:1], type(y).__name__, np.shape(getattr(y, 'x', y))))
+    return y
+
+
+def _parallel_gradient(x, func, executor, n_jobs):
     x = np.array(x)
-    grad = []
-    for i in range(len(x)):
-        y = partial_der(x, func, i)
-        grad.append(y.dx)
-    return y.x, grad
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(n_jobs) as pool:
+            return _parallel_gradient(x, func, pool, n_jobs)
+    chunks = np.array_split(np.arange(len(x)), min(n_jobs or os.cpu_count(), len(x)))
+    results = list(executor.map(_chunk_partial_ders, [func] * len(chunks), [x] * len(chunks),
+                                chunks))
+    return results[0][0], list(np.concatenate([dy for _, dy in results]))
+
+
+def _chunk_partial_ders(func, x, columns):
+    '''Value of `func` and its partial derivatives with respect to `x[columns]`'''
+    seeds = np.zeros((len(x), len(columns)), dtype=x.dtype)
+    seeds[columns, np.arange(len(columns))] = 1
+    y = func(*[MultiDualNumber(component, seed) for component, seed in zip(x, seeds)])
+    return y.x, y.dx
+
+
+def _reverse_gradient(x, func):
+    tape = Tape()
+    inputs = [tape.variable(component) for component in np.array(x)]
+    y = func(*inputs)
+    tape.backward(y)
+    return y.x, list(np.array([component.grad for component in inputs]))
 
 
 def directional_der(dual_number_array, func):
@@ -62,3 +200,89 @@ def directional_der(dual_number_array, func):
         (x, dx) = (eval of func(x), directional derivative)
     '''
     return func(*[DualNumber(x, d) for x, d in zip(dual_number_array.x, dual_number_array.dx)])
+
+
+def jacobian(x, func, dtype=None, mode="forward"):
+    '''
+    Parameters
+    ----------
+    x: float or np.array
+        Input variable
+    func: function
+        Dual-Number implemented function that takes input in shape of `x`, and returns
+        either a DualNumber or a sequence of DualNumbers
+    dtype: np.dtype or None
+        As in `gradient`
+    mode: str
+        "forward" or "sparse", as in `gradient`
+
+    Returns
+    -------
+    tuple: (np.array, np.array)
+        First element is the evaluation `func(x)`, shape (m,)
+        Second element is the Jacobian, shape (m, len(x)), whose `i`-th row
+        is the gradient of the `i`-th output
+    '''
+    if mode not in ("forward", "sparse"):
+        raise DualNumberError("mode must be 'forward' or 'sparse' but got {}".format(mode))
+    seed = MultiDualNumber.seed if mode == "forward" else SparseDualNumber.seed
+    y = func(*seed(_input(x, dtype)))
+    if isinstance(y, (list, tuple)):
+        y = y[0].stack(y)
+    return y.x, np.asarray(y.dx)
+
+
+def hessian(x, func, sparsity=None, dtype=None):
+    '''
+    Hessian via nested dual numbers.
+
+    Each input is a DualNumber whose x and dx are themselves MultiDualNumbers:
+    the inner level carries the gradient, and the outer level a seed direction
+    `s`, so a single evaluation of `func` yields the Hessian-vector product `H s`.
+
+    Parameters
+    ----------
+    x: float or np.array
+        Input variable
+    func: function
+        Dual-Number implemented function that takes input in shape of `x`
+    sparsity: np.array of bool or None
+        Structural sparsity pattern of the Hessian, shape (len(x), len(x)):
+        entries that are False are known to be zero.  Columns that never share
+        a non-zero row are evaluated together with a single seed direction.
+        If None, the Hessian is treated as dense and `func` is evaluated
+        `len(x)` times.
+    dtype: np.dtype or None
+        As in `gradient`
+
+    Returns
+    -------
+    tuple: (float, np.array, np.array)
+        The evaluation `func(x)`, the gradient and the Hessian
+    '''
+    x = _input(x, dtype)
+    num = len(x)
+    if sparsity is None:
+        sparsity = np.ones((num, num), dtype=bool)
+    sparsity = np.array(sparsity, dtype=bool)
+    colors = _color_columns(sparsity)
+    hess = np.zeros((num, num), dtype=x.dtype)
+    for color in range(colors.max() + 1):
+        columns = colors == color
+        seed = columns.astype(x.dtype)
+        y = func(*[DualNumber(inner, MultiDualNumber(s, np.zeros(num, dtype=x.dtype)))
+                   for inner, s in zip(MultiDualNumber.seed(x), seed)])
+        compressed = y.dx.dx
+        for j in np.flatnonzero(columns):
+            hess[sparsity[:, j], j] = compressed[sparsity[:, j]]
+    return y.x.x, y.x.dx, hess
+
+
+def _color_columns(sparsity):
+    '''Greedy coloring of the columns so that columns of equal color share no non-zero row'''
+    overlap = sparsity.T.astype(int) @ sparsity.astype(int) > 0
+    colors = np.full(len(overlap), -1)
+    for j in range(len(overlap)):
+        used = set(colors[overlap[j] & (colors >= 0)])
+        colors[j] = next(color for color in range(len(overlap)) if color not in used)
+    return colors
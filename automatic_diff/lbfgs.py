@@ -0,0 +1,284 @@
+'''
+Limited memory BFGS, a quasi-Newton method using dual-number gradients
+
+Rather than stepping by a fixed rule along the gradient, L-BFGS builds an
+estimate of the inverse Hessian from the last few steps and gradient
+changes, and a line search picks how far to go along the resulting
+direction.  Badly scaled problems take far fewer iterations than with
+`grad_descent`.
+'''
+# pylint: disable=too-many-arguments
+import collections
+import time
+import numpy as np
+from automatic_diff.dual_number import DualNumberError
+from automatic_diff.gradients import gradient
+from automatic_diff.grad_descent import GradientDescent
+
+
+def backtracking_line_search(phi, phi0, dphi0, alpha=1., decrease=1e-4, shrink=0.5, max_steps=30):
+    '''
+    Backtracking line search for the Armijo (sufficient decrease) condition
+
+    Parameters
+    ----------
+    phi: function
+        Value of the objective at step length `alpha` along the search direction
+    phi0: float
+        `phi(0)`
+    dphi0: float
+        Derivative of `phi` at 0, negative for a descent direction
+    alpha: float
+        Initial step length
+    decrease: float
+        Sufficient decrease parameter, c1 in Nocedal & Wright
+    shrink: float
+        Factor the step length is multiplied by after each rejected step
+    max_steps: int
+        Maximum number of evaluations of `phi`
+
+    Returns
+    -------
+    tuple: (float, float)
+        Accepted step length and `phi` at that step length.  If no step length
+        is accepted within `max_steps`, the step length is 0.
+    '''
+    for _ in range(max_steps):
+        value = phi(alpha)
+        if value <= phi0 + decrease * alpha * dphi0:
+            return alpha, value
+        alpha *= shrink
+    return 0., phi0
+
+
+def wolfe_line_search(phi, phi0, dphi0, alpha=1., decrease=1e-4, curvature=0.9, max_steps=20):
+    '''
+    Line search for the strong Wolfe conditions, see Nocedal & Wright, Algorithms 3.5 and 3.6
+
+    Parameters
+    ----------
+    phi: function
+        Returns a tuple of the value of the objective at step length `alpha`
+        along the search direction, the derivative along the direction, and
+        anything else to be returned for the accepted step, e.g. the gradient
+    phi0: tuple
+        `phi(0)`
+    dphi0: float
+        Derivative of `phi` at 0, negative for a descent direction
+    alpha: float
+        Initial step length
+    decrease: float
+        Sufficient decrease parameter, c1 in Nocedal & Wright
+    curvature: float
+        Curvature parameter, c2 in Nocedal & Wright
+    max_steps: int
+        Maximum number of evaluations of `phi` in each stage of the search
+
+    Returns
+    -------
+    tuple: (float, tuple)
+        Accepted step length and `phi` at that step length.  If no step length
+        is accepted, the best step length satisfying sufficient decrease, which may be 0.
+    '''
+    prev = (0.,) + tuple(phi0)
+    value0 = prev[1]
+    for i in range(max_steps):
+        trial = (alpha,) + tuple(phi(alpha))
+        if trial[1] > value0 + decrease * alpha * dphi0 or (i > 0 and trial[1] >= prev[1]):
+            return _zoom(phi, value0, dphi0, prev, trial, decrease, curvature, max_steps)
+        if abs(trial[2]) <= -curvature * dphi0:
+            return trial[0], trial[1:]
+        if trial[2] >= 0:
+            return _zoom(phi, value0, dphi0, trial, prev, decrease, curvature, max_steps)
+        prev = trial
+        alpha *= 2
+    return prev[0], prev[1:]
+
+
+def _zoom(phi, value0, dphi0, low, high, decrease, curvature, max_steps):
+    '''Narrows the bracket of step lengths `low` and `high` until strong Wolfe conditions hold'''
+    for _ in range(max_steps):
+        alpha = _cubic_minimizer(low, high)
+        trial = (alpha,) + tuple(phi(alpha))
+        if trial[1] > value0 + decrease * alpha * dphi0 or trial[1] >= low[1]:
+            high = trial
+        else:
+            if abs(trial[2]) <= -curvature * dphi0:
+                return trial[0], trial[1:]
+            if trial[2] * (high[0] - low[0]) >= 0:
+                high = low
+            low = trial
+    return low[0], low[1:]
+
+
+def _cubic_minimizer(low, high):
+    '''Minimizer of the cubic through two (step length, value, slope) points, within the bracket'''
+    (a_0, v_0, s_0), (a_1, v_1, s_1) = low[:3], high[:3]
+    d_1 = s_0 + s_1 - 3 * (v_0 - v_1) / (a_0 - a_1)
+    radicand = d_1**2 - s_0 * s_1
+    width = a_1 - a_0
+    if radicand >= 0:
+        d_2 = np.sign(width) * np.sqrt(radicand)
+        alpha = a_1 - width * (s_1 + d_2 - d_1) / (s_1 - s_0 + 2 * d_2)
+        if np.isfinite(alpha) and min(a_0, a_1) + 0.1 * abs(width) <= alpha \
+                <= max(a_0, a_1) - 0.1 * abs(width):
+            return alpha
+    return a_0 + width / 2
+
+
+class LBFGS(GradientDescent):
+    '''
+    Limited memory BFGS.
+
+    Casual users would benefit from using the `lbfgs` wrapper function
+    rather than this class.
+
+    A fit whose line search accepts no step length, e.g. once the objective
+    no longer decreases to machine precision, stops with `stop_reason`
+    "line_search" rather than reporting convergence.
+
+    Parameters
+    ----------
+    func: function
+        Dual-number function to be minimized
+    '''
+    def __init__(self, func):
+        super().__init__(func)
+        self.memory = 10
+        self.line_search = "wolfe"
+        self._history = collections.deque()
+
+    _state_names = GradientDescent._state_names + ('_history',)
+
+    def fit(self, initial_x=None, tol=1e-2, max_iters=10, lr=1., verbose=False, mode="forward",
+            executor=None, n_jobs=None, callbacks=None, resume=None, dtype=None, cache=None,
+            memory=10, line_search="wolfe"):
+        '''
+        Parameters
+        ----------
+        initial_x, tol, max_iters, verbose, mode, executor, n_jobs, callbacks, resume, dtype:
+            As in `GradientDescent.fit`
+        cache: cache.ResultCache or None
+            As in `GradientDescent.fit`, and also looked up for the values of
+            `func` evaluated by the "armijo" line search
+        lr: float
+            Initial step length of the line search for the first iteration,
+            before any curvature has been estimated
+        memory: int
+            Number of recent steps the inverse Hessian estimate is built from
+        line_search: str
+            "wolfe" for a line search on the strong Wolfe conditions, which
+            evaluates the gradient at every trial step length, or "armijo"
+            for a backtracking line search, which evaluates only the
+            objective at trial step lengths
+        '''
+        if line_search not in ("wolfe", "armijo"):
+            raise DualNumberError(
+                "line_search must be 'wolfe' or 'armijo' but got {}".format(line_search))
+        self.memory = memory
+        self.line_search = line_search
+        super().fit(initial_x, tol=tol, max_iters=max_iters, lr=lr, verbose=verbose, mode=mode,
+                    executor=executor, n_jobs=n_jobs, callbacks=callbacks, resume=resume,
+                    dtype=dtype, cache=cache)
+
+    def _start(self, initial_x):
+        super()._start(initial_x)
+        self._history = collections.deque(maxlen=self.memory)
+
+    def _value(self, x):
+        start = time.perf_counter()
+        if self.cache is None:
+            y = self.func(*x)
+        else:
+            y = self.cache.get(self.func, x, lambda: self.func(*x))
+        y = np.asarray(y, dtype=self.dtype)[()]
+        self.grad_seconds += time.perf_counter() - start
+        self.num_func_evals += 1
+        return y
+
+    def _value_and_grad(self, x):
+        start = time.perf_counter()
+        y, dy = gradient(x, self.func, mode=self.mode, executor=self.executor, n_jobs=self.n_jobs,
+                         cache=self.cache)
+        self.grad_seconds += time.perf_counter() - start
+        self.num_grad_evals += 1
+        return y, dy, np.array(dy, dtype=self.dtype)
+
+    def _direction(self):
+        '''Minus the inverse Hessian estimate times the gradient, by the two-loop recursion'''
+        direction = -self.grad
+        coefs = []
+        for step, change, rho in reversed(self._history):
+            coef = rho * np.dot(step, direction)
+            direction -= coef * change
+            coefs.append(coef)
+        if self._history:
+            step, change, _ = self._history[-1]
+            direction *= np.dot(step, change) / np.dot(change, change)
+        for (step, change, rho), coef in zip(self._history, reversed(coefs)):
+            direction += step * (coef - rho * np.dot(change, direction))
+        return direction
+
+    def _grad_descent_step(self):
+        if self.num_iter == 0:
+            self.y, self.dy, grad = self._value_and_grad(self.x)
+            self.grad[...] = grad
+        direction = self._direction()
+        slope = np.dot(self.grad, direction)
+        if not np.isfinite(slope) or slope >= 0:
+            # not a descent direction, so the curvature estimate is dropped
+            self._history.clear()
+            direction = -self.grad
+            slope = np.dot(self.grad, direction)
+        alpha = 1. if self._history else self.lr.lr
+        if self.line_search == "wolfe":
+            def phi(alpha):
+                y, dy, grad = self._value_and_grad(self.x + alpha * direction)
+                return y, np.dot(grad, direction), dy, grad
+            alpha, (y, _, dy, grad) = wolfe_line_search(
+                phi, (self.y, slope, self.dy, self.grad.copy()), slope, alpha)
+        else:
+            alpha, _ = backtracking_line_search(
+                lambda alpha: self._value(self.x + alpha * direction), self.y, slope, alpha)
+            y, dy, grad = self._value_and_grad(self.x + alpha * direction)
+        if alpha == 0:
+            # no step length decreases the objective enough, so x is left as is
+            self.dx[...] = 0
+            self.stop_reason = "line_search"
+            return
+        np.multiply(direction, -alpha, out=self.dx)
+        np.subtract(self.x, self.dx, out=self.x)
+        change = grad - self.grad
+        curvature = -np.dot(self.dx, change)
+        if curvature > 1e-10:
+            self._history.append((-self.dx.copy(), change, 1 / curvature))
+        else:
+            # without the curvature condition, which only the Wolfe line search
+            # guarantees, the estimate goes stale, so it restarts from the gradient
+            self._history.clear()
+        self.y, self.dy = y, dy
+        self.grad[...] = grad
+
+
+def lbfgs(initial_x, func, **fit_kwargs):
+    '''
+    Estimates minimum value of func using L-BFGS
+
+    Parameters
+    ----------
+    initial_x: float or np.array
+    func:
+        Dual-number function, input same shape as `initial_x`
+    fit_kwargs:
+        Keyword args passed to `LBFGS` instance's `fit`
+
+    Returns
+    -------
+    tuple:
+        dual_number: representing the minimizing x and its last step
+        float: estimated minimum value of function
+        float: gradient at the estimated minimum
+    '''
+    optimizer = LBFGS(func)
+    optimizer.fit(initial_x, **fit_kwargs)
+    return optimizer.dual_x, optimizer.y, optimizer.dy
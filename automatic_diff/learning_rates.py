@@ -1,22 +1,42 @@
 '''
 Classes for various learning rate schedules
 '''
+import copy
+import functools
+import inspect
 import numpy as np
 
 
+def _inner(left, right):
+    '''Inner product over the last axis, keeping it as a unit axis for arrays of rows'''
+    if np.ndim(left) < 2:
+        return np.dot(left, right)
+    return np.einsum('...i,...i->...', left, right)[..., np.newaxis]
+
+
+@functools.lru_cache(maxsize=None)
+def _takes_out(update):
+    '''Whether the `update` method accepts an `out` buffer'''
+    return 'out' in inspect.signature(update).parameters
+
+
 class LearningRate:
     '''
     Base class for learning rates
 
     Base class implements constant learning rate for standard gradient descent.
     Child classes can be implemented to add complexity to the learning rate
-    schedule, for example decaying learning rates or momentum
+    schedule, for example decaying learning rates or momentum, by overriding
+    `update(grad_descent)`, and optionally taking an `out` buffer as well.
 
     Parameters
     ----------
     lr: float
         Learning rate for standard gradient descent algorithms
     '''
+    # attributes carried by `update` from one iteration to the next, see `get_state`
+    _state_names = ('lr',)
+
     @classmethod
     def create(cls, *arg):
         '''
@@ -43,7 +63,30 @@ class LearningRate:
     def lr(self, lr):
         self.__lr = lr # pylint: disable=attribute-defined-outside-init
 
-    def update(self, grad_descent):
+    def get_state(self):
+        '''
+        Exports the state `update` carries from one iteration to the next
+
+        Returns
+        -------
+        dict
+            Copies of the state attributes, floats, np.arrays and lists of them
+        '''
+        return {name: copy.deepcopy(getattr(self, name)) for name in self._state_names}
+
+    def set_state(self, state):
+        '''
+        Restores state exported by `get_state`, so a fit resumed at the same
+        iteration continues as if it had not been interrupted
+
+        Parameters
+        ----------
+        state: dict
+        '''
+        for name, value in state.items():
+            setattr(self, name, copy.deepcopy(value))
+
+    def update(self, grad_descent, out=None):
         '''
         Update for standard gradient descent
 
@@ -52,13 +95,36 @@ class LearningRate:
         Parameters
         ----------
         grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
+
+        Returns
+        -------
+        np.array
+            Step vector for next iteration
+        '''
+        return np.multiply(grad_descent.grad, self.lr, out=out)
+
+    def update_into(self, grad_descent, out):
+        '''
+        Step of `update`, written into `out`.  `update` is passed `out` if it
+        takes it, and otherwise its step is copied into `out`.
+
+        Parameters
+        ----------
+        grad_descent: gradient_descent.GradientDescent
+        out: np.array
+            Buffer the step vector is written into
 
         Returns
         -------
         np.array
             Step vector for next iteration
         '''
-        return np.array(grad_descent.dy) * self.lr
+        if _takes_out(type(self).update):
+            return self.update(grad_descent, out=out)
+        np.copyto(out, self.update(grad_descent))
+        return out
 
 
 class TimeDecayLearningRate(LearningRate):
@@ -78,11 +144,13 @@ class TimeDecayLearningRate(LearningRate):
         super().__init__(**kwargs)
         self.decay_rate = decay_rate
 
-    def update(self, grad_descent):
+    def update(self, grad_descent, out=None):
         '''
         Parameters
         ----------
         grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
 
         Returns
         -------
@@ -90,7 +158,7 @@ class TimeDecayLearningRate(LearningRate):
             Step vector for next iteration
         '''
         self.lr = self._init_lr / (1 + self.decay_rate * grad_descent.num_iter)
-        return np.array(grad_descent.dy) * self.lr
+        return np.multiply(grad_descent.grad, self.lr, out=out)
 
 
 class GradDecayLearningRate(LearningRate):
@@ -105,6 +173,8 @@ class GradDecayLearningRate(LearningRate):
     patience: int
         Learning rate is based on the `patience` most recent gradient steps
     '''
+    _state_names = ('lr', 'this_dy', 'prev_dy', 'this_x', 'prev_x', 'prev_lr')
+
     def __init__(self, patience=5, **kwargs):
         super().__init__(**kwargs)
         self.patience = patience
@@ -113,33 +183,49 @@ class GradDecayLearningRate(LearningRate):
         self.this_x = None
         self.prev_x = None
         self.prev_lr = []
+        self._delta_dy = None
+        self._delta_x = None
 
-    def update(self, grad_descent):
+    def update(self, grad_descent, out=None):
         '''
         Parameters
         ----------
         grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
 
         Returns
         -------
         np.array
             Step vector for next iteration
         '''
-        if grad_descent.num_iter > 0:
-            self.prev_dy = self.this_dy.copy()
-            self.prev_x = self.this_x.copy()
-        self.this_dy = np.array(grad_descent.dy)
-        self.this_x = np.array(grad_descent.x)
-        if grad_descent.num_iter > 0:
-            delta_dy = self.this_dy - self.prev_dy
-            delta_x = self.this_x - self.prev_x
-            self.lr = np.dot(delta_x, delta_dy) / np.dot(delta_dy, delta_dy)
-            self.lr = min(abs(self.lr), abs(self._init_lr))
+        if grad_descent.num_iter == 0:
+            self.this_dy = np.array(grad_descent.grad)
+            self.this_x = np.array(grad_descent.x)
+            self.prev_dy = np.empty_like(self.this_dy)
+            self.prev_x = np.empty_like(self.this_x)
+            self._delta_dy = np.empty_like(self.this_dy)
+            self._delta_x = np.empty_like(self.this_x)
+        else:
+            if self._delta_dy is None:
+                # state was restored by `set_state`
+                self._delta_dy = np.empty_like(self.this_dy)
+                self._delta_x = np.empty_like(self.this_x)
+            # swap buffers rather than copying into new arrays
+            self.prev_dy, self.this_dy = self.this_dy, self.prev_dy
+            self.prev_x, self.this_x = self.this_x, self.prev_x
+            np.copyto(self.this_dy, grad_descent.grad)
+            np.copyto(self.this_x, grad_descent.x)
+            delta_dy = np.subtract(self.this_dy, self.prev_dy, out=self._delta_dy)
+            delta_x = np.subtract(self.this_x, self.prev_x, out=self._delta_x)
+            # one rate per row, when rows are members of a population
+            self.lr = _inner(delta_x, delta_dy) / _inner(delta_dy, delta_dy)
+            self.lr = np.minimum(abs(self.lr), abs(self._init_lr))
             self.prev_lr.append(self.lr)
             if len(self.prev_lr) > self.patience:
                 self.prev_lr.pop(0)
-            self.lr = np.mean(self.prev_lr)
-        return np.array(grad_descent.dy) * self.lr
+            self.lr = np.mean(self.prev_lr, axis=0)
+        return np.multiply(grad_descent.grad, self.lr, out=out)
 
 
 class MomentumLearningRate(LearningRate):
@@ -156,17 +242,21 @@ class MomentumLearningRate(LearningRate):
     kwargs:
         Keyword arguments passed to `LearningRate`'s constructor
     '''
+    _state_names = ('lr', 'nu')
+
     def __init__(self, momentum_rate=0.9, decay_rate=1e-1, **kwargs):
         super().__init__(**kwargs)
         self.momentum_rate = momentum_rate
         self.decay_rate = decay_rate
         self.nu = None
 
-    def update(self, grad_descent):
+    def update(self, grad_descent, out=None):
         '''
         Parameters
         ----------
         grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
 
         Returns
         -------
@@ -176,6 +266,205 @@ class MomentumLearningRate(LearningRate):
         self.lr = self._init_lr / (1 + self.decay_rate * grad_descent.num_iter)
         if grad_descent.num_iter == 0:
             self.nu = np.zeros_like(grad_descent.x)
-        self.nu = self.momentum_rate * self.nu + np.array(grad_descent.dy) * self.lr
-        # print(self.nu)
-        return self.nu
+        step = np.multiply(grad_descent.grad, self.lr, out=out)
+        self.nu *= self.momentum_rate
+        self.nu += step
+        if out is None:
+            return self.nu
+        np.copyto(out, self.nu)
+        return out
+
+
+class NesterovLearningRate(LearningRate):
+    '''
+    Momentum with Nesterov's look-ahead: the step is taken from where the
+    momentum is about to carry x, rather than from x
+
+    Parameters
+    ----------
+    momentum_rate: float
+        Scale factor for how much previous gradient steps affect next step
+    kwargs:
+        Keyword arguments passed to `LearningRate`'s constructor
+    '''
+    _state_names = ('lr', 'nu')
+
+    def __init__(self, momentum_rate=0.9, **kwargs):
+        super().__init__(**kwargs)
+        self.momentum_rate = momentum_rate
+        self.nu = None
+
+    def update(self, grad_descent, out=None):
+        '''
+        Parameters
+        ----------
+        grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
+
+        Returns
+        -------
+        np.array
+            Step vector for next iteration
+        '''
+        if grad_descent.num_iter == 0 or self.nu is None:
+            self.nu = np.zeros_like(grad_descent.x)
+        self.nu *= self.momentum_rate
+        self.nu += grad_descent.grad
+        out = np.multiply(self.nu, self.momentum_rate, out=out)
+        out += grad_descent.grad
+        out *= self.lr
+        return out
+
+
+class AdagradLearningRate(LearningRate):
+    '''
+    Per-coordinate learning rates, scaled down by the root of the sum of all
+    previous squared gradients of the coordinate
+
+    Parameters
+    ----------
+    epsilon: float
+        Added to the root, so coordinates without gradient do not divide by zero
+    kwargs:
+        Keyword arguments passed to `LearningRate`'s constructor
+    '''
+    _state_names = ('lr', 'sum_sq')
+
+    def __init__(self, epsilon=1e-8, **kwargs):
+        super().__init__(**kwargs)
+        self.epsilon = epsilon
+        self.sum_sq = None
+
+    def update(self, grad_descent, out=None):
+        '''
+        Parameters
+        ----------
+        grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
+
+        Returns
+        -------
+        np.array
+            Step vector for next iteration
+        '''
+        if grad_descent.num_iter == 0 or self.sum_sq is None:
+            self.sum_sq = np.zeros_like(grad_descent.x)
+        out = np.square(grad_descent.grad, out=out)
+        self.sum_sq += out
+        np.sqrt(self.sum_sq, out=out)
+        out += self.epsilon
+        np.divide(grad_descent.grad, out, out=out)
+        out *= self.lr
+        return out
+
+
+class RMSPropLearningRate(LearningRate):
+    '''
+    Per-coordinate learning rates, scaled down by the root of an exponential
+    moving average of the squared gradients of the coordinate
+
+    Parameters
+    ----------
+    decay_rate: float
+        Weight of the previous moving average against the latest squared gradient
+    epsilon: float
+        Added to the root, so coordinates without gradient do not divide by zero
+    kwargs:
+        Keyword arguments passed to `LearningRate`'s constructor
+    '''
+    _state_names = ('lr', 'mean_sq')
+
+    def __init__(self, decay_rate=0.9, epsilon=1e-8, **kwargs):
+        super().__init__(**kwargs)
+        self.decay_rate = decay_rate
+        self.epsilon = epsilon
+        self.mean_sq = None
+
+    def update(self, grad_descent, out=None):
+        '''
+        Parameters
+        ----------
+        grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
+
+        Returns
+        -------
+        np.array
+            Step vector for next iteration
+        '''
+        if grad_descent.num_iter == 0 or self.mean_sq is None:
+            self.mean_sq = np.zeros_like(grad_descent.x)
+        out = np.square(grad_descent.grad, out=out)
+        out *= 1 - self.decay_rate
+        self.mean_sq *= self.decay_rate
+        self.mean_sq += out
+        np.sqrt(self.mean_sq, out=out)
+        out += self.epsilon
+        np.divide(grad_descent.grad, out, out=out)
+        out *= self.lr
+        return out
+
+
+class AdamLearningRate(LearningRate):
+    '''
+    Adam: per-coordinate learning rates from exponential moving averages of
+    the gradients and of the squared gradients, corrected for their bias
+    towards zero over the first iterations
+
+    Parameters
+    ----------
+    beta_1: float
+        Decay rate of the moving average of the gradients
+    beta_2: float
+        Decay rate of the moving average of the squared gradients
+    epsilon: float
+        Added to the root, so coordinates without gradient do not divide by zero
+    kwargs:
+        Keyword arguments passed to `LearningRate`'s constructor
+    '''
+    _state_names = ('lr', 'mean', 'mean_sq', 'num_updates')
+
+    def __init__(self, beta_1=0.9, beta_2=0.999, epsilon=1e-8, **kwargs):
+        super().__init__(**kwargs)
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.mean = None
+        self.mean_sq = None
+        self.num_updates = 0
+
+    def update(self, grad_descent, out=None):
+        '''
+        Parameters
+        ----------
+        grad_descent: gradient_descent.GradientDescent
+        out: np.array or None
+            If given, the step vector is written into `out` rather than a new array
+
+        Returns
+        -------
+        np.array
+            Step vector for next iteration
+        '''
+        if grad_descent.num_iter == 0 or self.mean is None:
+            self.mean = np.zeros_like(grad_descent.x)
+            self.mean_sq = np.zeros_like(grad_descent.x)
+            self.num_updates = 0
+        self.num_updates += 1
+        grad = grad_descent.grad
+        out = np.multiply(grad, 1 - self.beta_1, out=out)
+        self.mean *= self.beta_1
+        self.mean += out
+        np.square(grad, out=out)
+        out *= 1 - self.beta_2
+        self.mean_sq *= self.beta_2
+        self.mean_sq += out
+        np.sqrt(self.mean_sq, out=out)
+        out /= np.sqrt(1 - self.beta_2**self.num_updates)
+        out += self.epsilon
+        np.divide(self.mean, out, out=out)
+        out *= self.lr / (1 - self.beta_1**self.num_updates)
+        return out
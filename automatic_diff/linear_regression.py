@@ -3,25 +3,106 @@ Classes for LinearRegression
 '''
 import abc
 import numpy as np
-from automatic_diff.grad_descent import grad_descent
+from automatic_diff import functions as fn
+from automatic_diff.dual_number import DualNumber, DualNumberError
+from automatic_diff.grad_descent import grad_descent, stochastic_grad_descent
+
+
+def _with_intercept(X):
+    '''Design matrix with a leading column of ones for the intercept'''
+    return np.hstack([np.ones((len(X), 1)), X])
+
+
+class NormalEquations:
+    '''
+    Sufficient statistics of least squares, accumulated over chunks of records
+
+    Only `X^T X`, `X^T y` and `y^T y`, with an intercept column prepended to
+    `X`, are kept, so a dataset is fit in a single pass over its chunks with
+    memory independent of the number of records.
+
+    Parameters
+    ----------
+    num_features: int
+        Number of features, not counting the intercept
+    '''
+    def __init__(self, num_features):
+        self.xtx = np.zeros((num_features + 1, num_features + 1))
+        self.xty = np.zeros(num_features + 1)
+        self.yty = 0.
+        self.num_records = 0
+
+    def update(self, X, y):
+        '''Adds the records of the chunk `X`, `y`'''
+        X = _with_intercept(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=float)
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += y @ y
+        self.num_records += len(y)
+
+    def solve(self):
+        '''
+        Least squares parameters, intercept first, by Cholesky factorization of `X^T X`
+
+        Raises
+        ------
+        np.linalg.LinAlgError:
+            If `X^T X` is not positive definite, i.e. the features are collinear
+        '''
+        lower = np.linalg.cholesky(self.xtx)
+        return np.linalg.solve(lower.T, np.linalg.solve(lower, self.xty))
+
+    def loss(self, params):
+        '''Square root of the sum of squared residuals, as in `LinearRegression.loss_func`'''
+        params = np.asarray(params, dtype=float)
+        sse = self.yty - 2 * params @ self.xty + params @ self.xtx @ params
+        return np.sqrt(max(sse, 0.))
 
 
 class Model(metaclass=abc.ABCMeta):
     '''
+    Datasets larger than memory can be given as memory-mapped arrays, e.g.
+    from `np.load(path, mmap_mode="r")`, which are not copied, or as a
+    function returning an iterable of `(X, y)` chunks of records, which is
+    called once per pass over the dataset.  Either way, with `chunk_size`
+    set, the loss is evaluated one block of records at a time, see `chunks`.
+
     Parameters
     ----------
-    X: array-like
-        number of records by number of features
-    y: array-like
-        labels corresponding to X
+    X: array-like or function
+        number of records by number of features, or a function returning an
+        iterable of `(X, y)` chunks of records.  The function is also called
+        once here, to read the number of features from the first chunk, so it
+        must return a new iterable on every call rather than one generator.
+    y: array-like or None
+        labels corresponding to X, or None if X is a function
     init_params:
         Initial values for the model's parameters that will be learned
+    chunk_size: int or None
+        Number of records per block the loss is evaluated on.  If None, the
+        whole of `X` at once, or each chunk returned by `X` if a function.
+
+    Subclasses supporting mini-batch fitting define `batch_loss_func(rows, *params)`,
+    the loss restricted to the records indexed by the integer array `rows`.
     '''
-    def __init__(self, X, y, init_params=None):
-        self.X = np.array(X)
-        if self.X.ndim == 1:
-            self.X = self.X.reshape((1, len(self.X)))
-        self.y = y
+    # loss function restricted to a mini-batch of records, or None if not supported
+    batch_loss_func = None
+
+    def __init__(self, X, y=None, init_params=None, chunk_size=None):
+        self.chunk_size = chunk_size
+        if callable(X):
+            self.make_chunks = X
+            self.X = self.y = None
+            first_features, _ = next(iter(X()))
+            self.num_features = np.shape(first_features)[1]
+        else:
+            self.make_chunks = None
+            self.X = np.asarray(X)
+            if self.X.ndim == 1:
+                self.X = self.X.reshape((1, len(self.X)))
+            self.y = np.asarray(y)
+            self.num_features = self.X.shape[1]
         self.init_params = init_params
 
     @property
@@ -34,19 +115,60 @@ class Model(metaclass=abc.ABCMeta):
         self.__init_params = init_params # pragma: no cover
     # pragma pylint: enable=attribute-defined-outside-init
 
+    def chunks(self, chunk_size=None):
+        '''
+        Blocks of records, of `chunk_size` records if given or else of the
+        model's `chunk_size`.  Blocks of arrays are views, so blocks of a
+        memory-mapped array are only read when used.
 
-    def fit(self, *args, **kwargs):
+        Yields
+        ------
+        tuple: (np.array, np.array)
+            Features and labels of the block
+        '''
+        chunk_size = chunk_size or self.chunk_size
+        if self.make_chunks is None:
+            chunks = [(self.X, self.y)]
+        else:
+            chunks = self.make_chunks()
+        for X, y in chunks:
+            size = chunk_size or max(len(X), 1)
+            for start in range(0, len(X), size):
+                yield X[start:start + size], y[start:start + size]
+
+    def fit(self, *args, batch_size=None, **kwargs):
         '''
         Parameters
         ----------
+        batch_size: int or None
+            If None, every iteration evaluates `loss_func` on the whole dataset.
+            Otherwise, each iteration evaluates `batch_loss_func` on a mini-batch
+            of `batch_size` records, via `stochastic_grad_descent`.
         args, kwargs:
-            Passed to `grad_descent`
+            Passed to `grad_descent`, or to `stochastic_grad_descent` when `batch_size` is set
 
         Returns
         -------
         Learned values of model's parameters
+
+        Raises
+        ------
+        DualNumberError:
+            If `batch_size` is set and the model has no `batch_loss_func`, or
+            its records are given by a function of chunks
         '''
-        params, loss, dloss = grad_descent(self.init_params, self.loss_func, *args, **kwargs) # pylint: disable=unused-variable
+        if batch_size is not None and self.batch_loss_func is None:
+            raise DualNumberError(
+                "{} does not support mini-batch fitting".format(self.__class__.__name__))
+        if batch_size is not None and self.make_chunks is not None:
+            raise DualNumberError("mini-batch fitting needs X as an array")
+        if batch_size is None:
+            params, loss, dloss = grad_descent( # pylint: disable=unused-variable
+                self.init_params, self.loss_func, *args, **kwargs)
+        else:
+            params, loss, dloss = stochastic_grad_descent( # pylint: disable=unused-variable
+                self.init_params, self.batch_loss_func, len(self.X), *args,
+                batch_size=batch_size, **kwargs)
         return params
 
     @abc.abstractmethod
@@ -59,6 +181,8 @@ class LinearRegression(Model):
     '''
     Least squares linear regression
     '''
+    solvers = ("grad_descent", "qr", "cholesky")
+
     @property
     def init_params(self): # pylint: disable=missing-docstring
         return self.__init_params
@@ -66,11 +190,74 @@ class LinearRegression(Model):
     @init_params.setter
     def init_params(self, init_params=None):
         if init_params is None:
-            init_params = np.random.uniform(-1, 1, self.X.shape[1] + 1)
+            init_params = np.random.uniform(-1, 1, self.num_features + 1)
         self.__init_params = init_params # pylint: disable=attribute-defined-outside-init
 
+    def fit(self, *args, solver="grad_descent", chunk_size=None, **kwargs):
+        '''
+        Parameters
+        ----------
+        solver: str
+            "grad_descent" minimizes `loss_func` iteratively, as in `Model.fit`,
+            which also suits ill-conditioned problems and losses modified by
+            subclasses.  The exact least squares solution is computed by "qr",
+            a QR factorization of the design matrix, or by "cholesky", which
+            solves the normal equations accumulated over chunks of
+            `chunk_size` records, see `NormalEquations`.
+        chunk_size: int or None
+            Number of records per chunk for "cholesky".  If None, the model's
+            `chunk_size`.  Other solvers raise DualNumberError if it is given:
+            "grad_descent" evaluates the loss in chunks of the model's `chunk_size`.
+        args, kwargs:
+            Passed to `Model.fit` for "grad_descent"
+
+        Returns
+        -------
+        Learned values of model's parameters, intercept first
+        '''
+        if solver not in self.solvers:
+            raise DualNumberError(
+                "solver must be one of {} but got {}".format(self.solvers, solver))
+        if chunk_size is not None and solver != "cholesky":
+            raise DualNumberError("solver {} takes no chunk_size".format(solver))
+        if solver == "grad_descent":
+            return super().fit(*args, **kwargs)
+        if args or kwargs:
+            raise DualNumberError("solver {} takes no descent arguments".format(solver))
+        if solver == "qr":
+            if self.make_chunks is not None:
+                raise DualNumberError("solver qr needs X as an array")
+            orthogonal, upper = np.linalg.qr(_with_intercept(np.asarray(self.X, dtype=float)))
+            params = np.linalg.solve(upper, orthogonal.T @ self.y)
+        else:
+            params = self.normal_equations(chunk_size).solve()
+        return DualNumber.create(params)
+
+    def normal_equations(self, chunk_size=None):
+        '''NormalEquations of the whole dataset, accumulated over chunks of `chunk_size` records'''
+        equations = NormalEquations(self.num_features)
+        for X, y in self.chunks(chunk_size):
+            equations.update(X, y)
+        return equations
+
     def loss_func(self, *params):
-        return sum(
-            (sum(s * component for s, component in zip(params[1:], x)) + params[0] - y)**2
-            for x, y in zip(self.X, self.y)
-        )**0.5
+        '''
+        Square root of the sum of squared residuals.
+
+        `params[0]` is the intercept and `params[1:]` the slopes.  The residuals
+        of a block of records are computed together as `X @ slopes + intercept - y`,
+        and the sum of their squares accumulated over the blocks of `chunks`.
+        '''
+        sse = 0
+        for X, y in self.chunks():
+            sse = sse + self._sse(X, y, params)
+        return sse**0.5
+
+    def batch_loss_func(self, rows, *params):
+        '''Square root of the sum of squared residuals of the records indexed by `rows`'''
+        return self._sse(self.X[rows], self.y[rows], params)**0.5
+
+    @staticmethod
+    def _sse(X, y, params):
+        residual = fn.matmul(X, fn.stack(params[1:])) + params[0] - y
+        return fn.matmul(np.ones(len(X)), residual**2)
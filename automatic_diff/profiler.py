@@ -0,0 +1,187 @@
+'''
+Op-level profiling of dual-number functions.
+
+Inside `with Profiler() as profiler:`, every DualNumber operator and method,
+and every kernel of `functions` called through the module (`fn.exp(d)`,
+rather than an `exp` imported before profiling started), is counted and
+timed, along with the arrays it allocates for its result.  The methods and
+kernels are only wrapped while the profiler is entered, so code run outside
+of it pays nothing.
+
+Times are both inclusive of the ops an op calls, in `seconds`, and exclusive
+of them, in `own_seconds`.  An op calling itself, e.g. the kernel `exp` on the
+value of a dual number, or an operator on nested dual numbers, counts as one
+call.  An allocation is an array of the result which shares no memory with
+any argument, so in-place operators and views allocate nothing.
+'''
+import functools
+import time
+import types
+import numpy as np
+from automatic_diff import functions
+from automatic_diff.dual_number import DualNumber, MultiDualNumber
+
+
+class ProfilerError(Exception):
+    '''Error handling for profiling'''
+    pass
+
+
+class OpStats:
+    '''Counts and times of one op'''
+    __slots__ = ('name', 'calls', 'seconds', 'own_seconds', 'allocations', 'bytes')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.
+        self.own_seconds = 0.
+        self.allocations = 0
+        self.bytes = 0
+
+    def __repr__(self):
+        return 'OpStats({})'.format(', '.join(
+            '{}={!r}'.format(slot, getattr(self, slot)) for slot in self.__slots__))
+
+
+def _arrays(value):
+    '''Arrays held by `value`, through nested dual numbers, tuples and lists'''
+    if isinstance(value, DualNumber):
+        yield from _arrays(value.x)
+        yield from _arrays(value.dx)
+    elif isinstance(value, np.ndarray):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _arrays(item)
+
+
+def _allocated(result, args):
+    '''Arrays of `result` sharing no memory with the arrays of `args`'''
+    inputs = list(_arrays(args))
+    allocated = {}
+    for array in _arrays(result):
+        if not any(np.may_share_memory(array, arg) for arg in inputs):
+            allocated[id(array)] = array
+    return allocated.values()
+
+
+def _profiled_names(cls):
+    '''Operators and public methods defined by `cls`, that are wrapped while profiling'''
+    for name, attr in vars(cls).items():
+        func = attr.__func__ if isinstance(attr, (classmethod, staticmethod)) else attr
+        if not isinstance(func, types.FunctionType) or name in ('__init__', '__repr__'):
+            continue
+        if not name.startswith('_') or (name.startswith('__') and name.endswith('__')):
+            yield name
+
+
+class Profiler:
+    '''
+    Context manager counting and timing dual-number ops
+
+    Attributes
+    ----------
+    stats: dict
+        OpStats of every op called while profiling, keyed on op name, e.g.
+        "DualNumber.__mul__" or "functions.exp".  Stats accumulate over every
+        time the same profiler is entered.
+    '''
+    _active = False
+
+    def __init__(self):
+        self.stats = {}
+        self._originals = []
+        # seconds spent in profiled ops called by each op on the call stack
+        self._child_seconds = []
+
+    def __enter__(self):
+        if Profiler._active:
+            raise ProfilerError("Profilers cannot be nested")
+        Profiler._active = True
+        targets = [(DualNumber, name) for name in _profiled_names(DualNumber)]
+        targets += [(MultiDualNumber, name) for name in _profiled_names(MultiDualNumber)]
+        targets += [(functions, name) for name, func in vars(functions).items()
+                    if isinstance(func, types.FunctionType) and not name.startswith('_')
+                    and func.__module__ == functions.__name__]
+        for owner, name in targets:
+            attr = vars(owner)[name]
+            label = '{}.{}'.format(owner.__name__.rpartition('.')[2], name)
+            if isinstance(attr, (classmethod, staticmethod)):
+                wrapped = type(attr)(self._wrap(label, attr.__func__))
+            else:
+                wrapped = self._wrap(label, attr)
+            self._originals.append((owner, name, attr))
+            setattr(owner, name, wrapped)
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, name, attr in reversed(self._originals):
+            setattr(owner, name, attr)
+        self._originals = []
+        self._child_seconds.clear()
+        Profiler._active = False
+
+    def _wrap(self, label, func):
+        child_seconds = self._child_seconds
+        # calls of the op in progress, as kernels recurse on the values of dual numbers
+        depth = [0]
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            if depth[0]:
+                # a recursive call is part of the call of the op it is nested in
+                return func(*args, **kwargs)
+            stats = self.stats.get(label)
+            if stats is None:
+                stats = self.stats[label] = OpStats(label)
+            child_seconds.append(0.)
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+                seconds = time.perf_counter() - start
+                stats.calls += 1
+                stats.seconds += seconds
+                stats.own_seconds += seconds - child_seconds.pop()
+            for array in _allocated(result, (args, tuple(kwargs.values()))):
+                stats.allocations += 1
+                stats.bytes += array.nbytes
+            if child_seconds:
+                # the caller's own time excludes this op, and counting its allocations
+                child_seconds[-1] += time.perf_counter() - start
+            return result
+        return profiled
+
+    def report(self, sort='own_seconds', limit=None):
+        '''
+        Parameters
+        ----------
+        sort: str
+            OpStats attribute the ops are sorted on, largest first
+        limit: int or None
+            Maximum number of ops reported
+
+        Returns
+        -------
+        str:
+            Table of the stats of every op called
+        '''
+        if sort not in OpStats.__slots__:
+            raise ProfilerError(
+                "sort must be one of {} but got {}".format(OpStats.__slots__, sort))
+        ops = sorted(self.stats.values(), key=lambda stats: getattr(stats, sort),
+                     reverse=sort != 'name')[:limit]
+        width = max([len('op')] + [len(stats.name) for stats in ops])
+        header = '{:<{width}}  {:>8}  {:>10}  {:>10}  {:>12}  {:>11}  {:>12}'
+        row = '{:<{width}}  {:>8}  {:>10.6f}  {:>10.6f}  {:>12.2f}  {:>11}  {:>12}'
+        lines = [header.format('op', 'calls', 'seconds', 'own sec', 'own us/call', 'allocations',
+                               'bytes', width=width)]
+        for stats in ops:
+            lines.append(row.format(
+                stats.name, stats.calls, stats.seconds, stats.own_seconds,
+                1e6 * stats.own_seconds / stats.calls, stats.allocations, stats.bytes,
+                width=width))
+        return '\n'.join(lines)
@@ -0,0 +1,352 @@
+'''
+Reverse accumulation (back-propagation) counterpart to DualNumbers.
+
+Every operation on a ReverseNumber is recorded on a Tape together with the
+vector-Jacobian product mapping the output's adjoint back to its operands.
+A single backward sweep over the tape then yields the partial derivatives of
+a scalar output with respect to every input, no matter how many inputs
+there are.
+'''
+import numpy as np
+from automatic_diff.dual_number import (
+    _BINARY_DERIVATIVES, _CONSTANT_UFUNCS, _OPERATORS, _UNARY_DERIVATIVES, _VALUE_UFUNCS,
+    DualNumberError, get_dtype)
+
+
+def _float_dtype(x):
+    '''dtype of a floating point `x`, or else the default dtype'''
+    return x.dtype if x.dtype.kind == 'f' else get_dtype()
+
+
+def _unbroadcast(adjoint, shape):
+    '''Sums `adjoint` over the axes that broadcasting added to an operand of `shape`'''
+    adjoint = np.asarray(adjoint)
+    if adjoint.shape == shape:
+        return adjoint
+    extra = adjoint.ndim - len(shape)
+    if extra > 0:
+        adjoint = adjoint.sum(axis=tuple(range(extra)))
+    axes = tuple(i for i, size in enumerate(shape) if size == 1 and adjoint.shape[i] != 1)
+    if axes:
+        adjoint = adjoint.sum(axis=axes, keepdims=True)
+    return adjoint
+
+
+class Tape:
+    '''
+    Records ReverseNumbers in the order they are created.
+
+    Creation order is a topological order of the computation, so the
+    backward sweep simply walks the tape in reverse.
+    '''
+    def __init__(self):
+        self.nodes = []
+
+    def variable(self, x):
+        '''
+        Creates an input variable recorded on this tape
+
+        Parameters
+        ----------
+        x: float or np.array
+
+        Returns
+        -------
+        ReverseNumber
+        '''
+        return ReverseNumber(x, tape=self)
+
+    def record(self, node):
+        '''Appends `node` to the tape'''
+        self.nodes.append(node)
+
+    def backward(self, output):
+        '''
+        Back-propagates adjoints from `output` to every node on the tape.
+
+        Parameters
+        ----------
+        output: ReverseNumber
+            Output of the recorded computation.  Its adjoint is seeded with ones.
+        '''
+        for node in self.nodes:
+            node.adjoint = None
+        output.adjoint = np.ones_like(output.x, dtype=_float_dtype(output.x))
+        for node in reversed(self.nodes):
+            if node.adjoint is None:
+                continue
+            for parent, vjp in node.parents:
+                contribution = _unbroadcast(vjp(node.adjoint), parent.shape)
+                if parent.adjoint is None:
+                    parent.adjoint = contribution
+                else:
+                    parent.adjoint = parent.adjoint + contribution
+
+
+class ReverseNumber:
+    '''
+    Parameters
+    ----------
+    x: float or np.array
+        Value of the variable.
+    tape: Tape
+        Tape on which this variable, and every result computed from it, is recorded.
+    parents: sequence of (ReverseNumber, function) pairs
+        Operands of the operation that produced this variable, each paired with
+        the vector-Jacobian product mapping this variable's adjoint to the
+        operand's adjoint.
+    '''
+    @classmethod
+    def stack(cls, nodes, axis=0):
+        '''
+        Joins ReverseNumbers of equal shape, recorded on the same tape, along a new axis
+
+        Parameters
+        ----------
+        nodes: sequence of ReverseNumber
+        axis: int
+
+        Returns
+        -------
+        ReverseNumber
+        '''
+        parents = [(node, lambda g, i=i: np.take(g, i, axis)) for i, node in enumerate(nodes)]
+        return cls(np.stack([node.x for node in nodes], axis), nodes[0].tape, parents)
+
+    @classmethod
+    def concatenate(cls, nodes, axis=0):
+        '''
+        Joins ReverseNumbers, recorded on the same tape, along an existing axis
+
+        Parameters
+        ----------
+        nodes: sequence of ReverseNumber
+        axis: int
+
+        Returns
+        -------
+        ReverseNumber
+        '''
+        bounds = np.cumsum([node.x.shape[axis] for node in nodes])[:-1]
+        parents = [(node, lambda g, i=i: np.split(g, bounds, axis)[i])
+                   for i, node in enumerate(nodes)]
+        return cls(np.concatenate([node.x for node in nodes], axis), nodes[0].tape, parents)
+
+    def __init__(self, x, tape, parents=()):
+        self.x = np.array(x)
+        self.tape = tape
+        self.parents = tuple(parents)
+        self.adjoint = None
+        tape.record(self)
+
+    @property
+    def shape(self): # pylint: disable=missing-docstring
+        return self.x.shape
+
+    @property
+    def grad(self):
+        '''Adjoint after `Tape.backward`, or zeros if the output does not depend on this variable'''
+        if self.adjoint is None:
+            return np.zeros_like(self.x, dtype=_float_dtype(self.x))
+        return self.adjoint
+
+    def __repr__(self):
+        return "{} (adjoint {})".format(self.x, self.adjoint)
+
+    def _result(self, x, *parents):
+        return self.__class__(x, self.tape, parents)
+
+    @staticmethod
+    def _value(other):
+        if isinstance(other, ReverseNumber):
+            return other.x
+        if isinstance(other, (int, float)):
+            # Python scalars keep the dtype of the array they are combined with
+            return other
+        return np.asarray(other)
+
+    def chain(self, x, der):
+        '''
+        Applies the chain rule for an elementwise function.
+
+        Parameters
+        ----------
+        x: float or np.array
+            Value of the function evaluated at `self.x`
+        der: float or np.array
+            Derivative of the function evaluated at `self.x`
+
+        Returns
+        -------
+        ReverseNumber
+        '''
+        return self._result(x, (self, lambda g: g * der))
+
+    def __neg__(self):
+        return self._result(-self.x, (self, lambda g: -g))
+
+    def __abs__(self):
+        return self.chain(abs(self.x), np.sign(self.x))
+
+    def __pow__(self, power):
+        return self.chain(self.x ** power, power * self.x ** (power - 1))
+
+    def __add__(self, other):
+        parents = [(self, lambda g: g)]
+        if isinstance(other, ReverseNumber):
+            parents.append((other, lambda g: g))
+        return self._result(self.x + self._value(other), *parents)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        parents = [(self, lambda g: g)]
+        if isinstance(other, ReverseNumber):
+            parents.append((other, lambda g: -g))
+        return self._result(self.x - self._value(other), *parents)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        other_x = self._value(other)
+        parents = [(self, lambda g: g * other_x)]
+        if isinstance(other, ReverseNumber):
+            parents.append((other, lambda g: g * self.x))
+        return self._result(self.x * other_x, *parents)
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        other_x = self._value(other)
+        x = self.x / other_x
+        parents = [(self, lambda g: g / other_x)]
+        if isinstance(other, ReverseNumber):
+            parents.append((other, lambda g: -g * x / other_x))
+        return self._result(x, *parents)
+
+    def __rtruediv__(self, other):
+        x = self._value(other) / self.x
+        return self._result(x, (self, lambda g: -g * x / self.x))
+
+    def __rmatmul__(self, matrix):
+        matrix = np.asarray(matrix)
+        axes = list(range(matrix.ndim - 1))
+        return self._result(
+            np.matmul(matrix, self.x),
+            (self, lambda g: np.tensordot(matrix, g, axes=(axes, axes))))
+
+    def __matmul__(self, other):
+        left, right = self.x, self._value(other)
+        # vectors are promoted to matrices, as np.matmul does, for the products of the adjoint
+        left_2d = left[np.newaxis] if left.ndim == 1 else left
+        right_2d = right[:, np.newaxis] if right.ndim == 1 else right
+        shape_2d = np.matmul(left_2d, right_2d).shape
+
+        def left_vjp(grad):
+            adjoint = np.matmul(np.reshape(grad, shape_2d), np.swapaxes(right_2d, -1, -2))
+            return adjoint[..., 0, :] if left.ndim == 1 else adjoint
+
+        def right_vjp(grad):
+            adjoint = np.matmul(np.swapaxes(left_2d, -1, -2), np.reshape(grad, shape_2d))
+            return adjoint[..., 0] if right.ndim == 1 else adjoint
+
+        parents = [(self, left_vjp)]
+        if isinstance(other, ReverseNumber):
+            parents.append((other, right_vjp))
+        return self._result(np.matmul(left, right), *parents)
+
+    def __getitem__(self, key):
+        def vjp(grad):
+            adjoint = np.zeros_like(self.x, dtype=_float_dtype(self.x))
+            np.add.at(adjoint, key, grad)
+            return adjoint
+        return self._result(self.x[key], (self, vjp))
+
+    def reshape(self, *shape):
+        '''ReverseNumber with the values of self in `shape`, as `np.reshape`'''
+        return self._result(self.x.reshape(*shape), (self, lambda g: np.reshape(g, self.shape)))
+
+    def sum(self, axis=None, keepdims=False):
+        '''Sum over `axis`, as `np.sum`'''
+        def vjp(grad):
+            if axis is not None and not keepdims:
+                grad = np.expand_dims(grad, axis)
+            return np.broadcast_to(grad, self.shape)
+        return self._result(self.x.sum(axis=axis, keepdims=keepdims), (self, vjp))
+
+    def mean(self, axis=None, keepdims=False):
+        '''Mean over `axis`, as `np.mean`'''
+        total = self.sum(axis, keepdims)
+        return total / (self.x.size / total.x.size)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        '''
+        NumPy ufuncs on ReverseNumbers are recorded on the tape, so NumPy-written
+        functions such as `np.exp(d)` or `array * d` are differentiable.
+
+        Ufuncs without a derivative rule raise DualNumberError rather than
+        silently returning values without a gradient.
+        '''
+        if method == 'reduce' and ufunc is np.add and len(inputs) == 1 and 'out' not in kwargs:
+            return inputs[0].sum(**kwargs)
+        if method != '__call__' or kwargs:
+            raise DualNumberError(
+                "{}.{} with arguments {} is not supported in reverse mode".format(
+                    ufunc.__name__, method, sorted(kwargs)))
+        values = [self._value(d) for d in inputs]
+        if ufunc in _VALUE_UFUNCS:
+            return ufunc(*values)
+        if ufunc in _OPERATORS:
+            if isinstance(inputs[0], ReverseNumber):
+                return _OPERATORS[ufunc](*inputs)
+            return getattr(inputs[1], '__r{}__'.format(_OPERATORS[ufunc].__name__))(inputs[0])
+        if ufunc is np.matmul:
+            if not isinstance(inputs[0], ReverseNumber):
+                return inputs[1].__rmatmul__(inputs[0])
+            return inputs[0] @ inputs[1]
+        if ufunc is np.negative:
+            return -self
+        if ufunc is np.positive:
+            return self._result(+self.x, (self, lambda g: g))
+        if ufunc in _CONSTANT_UFUNCS:
+            return self._result(ufunc(self.x))
+        if ufunc in _UNARY_DERIVATIVES:
+            y = ufunc(self.x)
+            return self.chain(y, _UNARY_DERIVATIVES[ufunc](self.x, y))
+        if ufunc in _BINARY_DERIVATIVES:
+            y = ufunc(*values)
+            parents = [(operand, lambda g, der=der: g * der(*values, y))
+                       for operand, der in zip(inputs, _BINARY_DERIVATIVES[ufunc])
+                       if isinstance(operand, ReverseNumber)]
+            return self._result(y, *parents)
+        raise DualNumberError("{} is not supported in reverse mode".format(ufunc.__name__))
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func not in _ARRAY_FUNCTIONS:
+            raise DualNumberError("{} is not supported in reverse mode".format(func.__name__))
+        return _ARRAY_FUNCTIONS[func](*args, **kwargs)
+
+    def __gt__(self, other):
+        return self.x > self._value(other)
+
+    def __ge__(self, other):
+        return self.x >= self._value(other)
+
+    def __lt__(self, other):
+        return self.x < self._value(other)
+
+    def __le__(self, other):
+        return self.x <= self._value(other)
+
+
+# implementations of NumPy functions for ReverseNumbers
+_ARRAY_FUNCTIONS = {
+    np.sum: lambda d, axis=None, keepdims=False: d.sum(axis, keepdims),
+    np.mean: lambda d, axis=None, keepdims=False: d.mean(axis, keepdims),
+    np.reshape: lambda d, shape: d.reshape(shape),
+    np.stack: ReverseNumber.stack,
+    np.concatenate: ReverseNumber.concatenate,
+}
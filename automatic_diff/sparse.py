@@ -0,0 +1,196 @@
+'''
+Sparse tangents for forward mode differentiation in many directions.
+
+The seed of the `i`-th input of `gradients.gradient` is the one-hot
+direction `e_i`, and an intermediate value computed from a few inputs only
+has non-zero tangents in those few directions.  A `SparseTangent` stores just
+the directions that are non-zero, so the memory and arithmetic of every
+operation scale with their number rather than with the number of inputs.
+
+Results combining many directions, and NumPy functions other than the
+arithmetic ufuncs, fall back to dense tangents: a SparseTangent converts to
+an array wherever one is expected, and arithmetic returns a plain array
+once more than `SparseTangent.max_density` of the directions are non-zero.
+'''
+import numpy as np
+from automatic_diff.dual_number import MultiDualNumber, _as_array, resolve_dtype
+
+
+class SparseTangent:
+    '''
+    Tangents of shape `values.shape[:-1] + (num_tangents,)`, of which only the
+    directions `indices` along the last axis may be non-zero
+
+    Parameters
+    ----------
+    values: np.array
+        Tangents in the directions `indices`, along the last axis
+    indices: np.array of int
+        Sorted, distinct directions
+    num_tangents: int
+        Number of tangent directions
+    '''
+    __slots__ = ('values', 'indices', 'num_tangents')
+    # arithmetic results with a larger fraction of non-zero directions are dense arrays
+    max_density = 0.1
+
+    def __init__(self, values, indices, num_tangents):
+        self.values = values
+        self.indices = indices
+        self.num_tangents = num_tangents
+
+    @property
+    def shape(self): # pylint: disable=missing-docstring
+        return self.values.shape[:-1] + (self.num_tangents,)
+
+    @property
+    def ndim(self): # pylint: disable=missing-docstring
+        return self.values.ndim
+
+    @property
+    def dtype(self): # pylint: disable=missing-docstring
+        return self.values.dtype
+
+    @property
+    def nnz(self):
+        '''Number of values stored'''
+        return self.values.size
+
+    def __repr__(self):
+        return "SparseTangent(indices={}, values={}, num_tangents={})".format(
+            self.indices, self.values, self.num_tangents)
+
+    def __array__(self, dtype=None, copy=None): # pylint: disable=unused-argument
+        dense = np.zeros(self.shape, dtype=dtype or self.dtype)
+        dense[..., self.indices] = self.values
+        return dense
+
+    def broadcast_to(self, shape):
+        '''Broadcasts to `shape`, which includes the trailing tangent axis'''
+        return SparseTangent(np.broadcast_to(self.values, tuple(shape[:-1]) + self.indices.shape),
+                             self.indices, self.num_tangents)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and key and key[-1] == slice(None):
+            return SparseTangent(self.values[key], self.indices, self.num_tangents)
+        return np.asarray(self)[key]
+
+    def _factor(self, other):
+        '''Dense `other` broadcast against the stored directions, or None if it cannot be'''
+        if isinstance(other, SparseTangent):
+            return None
+        shape = np.shape(other)
+        if not shape or shape[-1] == 1:
+            return other
+        if shape[-1] == self.num_tangents:
+            return np.asarray(other)[..., self.indices]
+        return None
+
+    def _add(self, other):
+        if not isinstance(other, SparseTangent):
+            if np.ndim(other) == 0 and other == 0:
+                return self
+            return np.asarray(self) + other
+        if self.indices is other.indices or np.array_equal(self.indices, other.indices):
+            return SparseTangent(self.values + other.values, self.indices, self.num_tangents)
+        # the directions of the operand with fewer are merged into those of the other
+        large, small = (self, other) if len(self.indices) >= len(other.indices) else (other, self)
+        positions = np.searchsorted(large.indices, small.indices)
+        new = large.indices[np.minimum(positions, len(large.indices) - 1)] != small.indices
+        if new.any():
+            indices = np.insert(large.indices, positions[new], small.indices[new])
+            if len(indices) > self.max_density * self.num_tangents:
+                return np.asarray(self) + np.asarray(other)
+            positions = np.searchsorted(indices, small.indices)
+            shape = np.broadcast_shapes(large.values.shape[:-1], small.values.shape[:-1])
+            values = np.zeros(shape + indices.shape, dtype=np.result_type(self.dtype, other.dtype))
+            values[..., np.searchsorted(indices, large.indices)] = large.values
+        else:
+            indices = large.indices
+            shape = np.broadcast_shapes(large.values.shape[:-1], small.values.shape[:-1])
+            values = np.array(np.broadcast_to(large.values, shape + indices.shape),
+                              dtype=np.result_type(self.dtype, other.dtype))
+        values[..., positions] += small.values
+        return SparseTangent(values, indices, self.num_tangents)
+
+    def _mul(self, other):
+        factor = self._factor(other)
+        if factor is None:
+            return np.asarray(self) * np.asarray(other)
+        return SparseTangent(self.values * factor, self.indices, self.num_tangents)
+
+    def __neg__(self):
+        return SparseTangent(-self.values, self.indices, self.num_tangents)
+
+    def __add__(self, other):
+        return self._add(other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._add(-other)
+
+    def __rsub__(self, other):
+        return (-self)._add(other)
+
+    def __mul__(self, other):
+        return self._mul(other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        factor = self._factor(other)
+        if factor is None:
+            return np.asarray(self) / np.asarray(other)
+        return SparseTangent(self.values / factor, self.indices, self.num_tangents)
+
+    def __rtruediv__(self, other):
+        return other / np.asarray(self)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == '__call__' and not kwargs:
+            # arrays on the left of an operator dispatch here
+            if ufunc is np.add:
+                return inputs[1] + inputs[0] if isinstance(inputs[1], SparseTangent) \
+                    else inputs[0] + inputs[1]
+            if ufunc is np.multiply:
+                return inputs[1] * inputs[0] if isinstance(inputs[1], SparseTangent) \
+                    else inputs[0] * inputs[1]
+            if ufunc is np.subtract and isinstance(inputs[1], SparseTangent):
+                return inputs[1].__rsub__(inputs[0])
+            if ufunc is np.negative:
+                return -inputs[0]
+        inputs = [np.asarray(value) if isinstance(value, SparseTangent) else value
+                  for value in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+
+class SparseDualNumber(MultiDualNumber):
+    '''
+    MultiDualNumber whose tangents are stored as a `SparseTangent`, until they
+    become dense.  Its tangents may be either.
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def seed(cls, x, dtype=None):
+        '''
+        As `MultiDualNumber.seed`, with each tangent `e_i` stored sparsely
+
+        Returns
+        -------
+        list of SparseDualNumber
+            The `i`-th element has value `x[..., i]` and tangent `e_i`
+        '''
+        x = _as_array(x) if dtype is None else np.array(x, dtype=resolve_dtype(dtype))
+        num = x.shape[-1]
+        ones = np.ones(x.shape[:-1] + (1,), dtype=x.dtype)
+        return [cls._new(x[..., i], SparseTangent(ones, np.array([i]), num))
+                for i in range(num)]
+
+    def _broadcast_dx(self, x):
+        if np.shape(x) == self.x.shape:
+            return self.dx
+        if isinstance(self.dx, SparseTangent):
+            return self.dx.broadcast_to(np.shape(x) + (self.num_tangents,))
+        return super()._broadcast_dx(x)
@@ -0,0 +1,371 @@
+'''
+Trace-and-replay compilation of dual-number functions.
+
+`trace` runs a dual-number function once on dual numbers whose values are
+`Symbol`s.  A Symbol behaves like a NumPy array, but every NumPy kernel
+applied to it (ufuncs through `__array_ufunc__`, other functions through
+`__array_function__`) is appended to a `Trace`.  The resulting Trace is a
+flat list of NumPy kernels for the value and all partial derivatives.
+Replaying it writes each ufunc result into a buffer preallocated at trace
+time, so none of the Python dispatch through DualNumber and functions.py is
+repeated.
+
+Traces are specific to the shape and dtype of the input, and record control
+flow as it happened when traced, so a function whose branches depend on the
+values of its input cannot be traced.
+'''
+import inspect
+import operator
+import weakref
+from collections import OrderedDict
+import numpy as np
+from automatic_diff.dual_number import MultiDualNumber
+
+
+class TraceError(Exception):
+    '''Error handling for tracing'''
+    pass
+
+
+class _Ref:
+    '''Reference to the output buffer of a node of a Trace'''
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _to_ref(arg):
+    if isinstance(arg, Symbol):
+        return _Ref(arg.index)
+    if isinstance(arg, (list, tuple)):
+        return type(arg)(_to_ref(item) for item in arg)
+    return arg
+
+
+def _to_value(arg):
+    if isinstance(arg, Symbol):
+        return arg.value
+    if isinstance(arg, (list, tuple)):
+        return type(arg)(_to_value(item) for item in arg)
+    return arg
+
+
+def _resolve(arg, buffers):
+    if isinstance(arg, _Ref):
+        return buffers[arg.index]
+    if isinstance(arg, (list, tuple)):
+        return type(arg)(_resolve(item, buffers) for item in arg)
+    return arg
+
+
+class Symbol:
+    '''
+    Array-like placeholder that records the NumPy kernels applied to it.
+
+    Parameters
+    ----------
+    value: np.array
+        Value of the placeholder for the example input being traced
+    trace: Trace
+        Trace the kernels are recorded on
+    index: int
+        Position of this placeholder's node in `trace`
+    '''
+    def __init__(self, value, trace, index):
+        self.value = value
+        self.trace = trace
+        self.index = index
+
+    @property
+    def shape(self): # pylint: disable=missing-docstring
+        return self.value.shape
+
+    @property
+    def ndim(self): # pylint: disable=missing-docstring
+        return self.value.ndim
+
+    @property
+    def dtype(self): # pylint: disable=missing-docstring
+        return self.value.dtype
+
+    def __len__(self):
+        return len(self.value)
+
+    def __repr__(self):
+        return "Symbol({})".format(self.value)
+
+    def __bool__(self):
+        raise TraceError("control flow that depends on traced values cannot be traced")
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or 'out' in kwargs:
+            raise TraceError("cannot trace {}.{}".format(ufunc.__name__, method))
+        return self.trace.record(ufunc, inputs, kwargs, is_ufunc=True)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func in (np.shape, np.ndim, np.size):
+            return func(self.value)
+        return self.trace.record(func, args, kwargs)
+
+    def __getitem__(self, key):
+        return self.trace.record(operator.getitem, (self, key), {})
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __add__(self, other):
+        return np.add(self, other)
+
+    def __radd__(self, other):
+        return np.add(other, self)
+
+    def __sub__(self, other):
+        return np.subtract(self, other)
+
+    def __rsub__(self, other):
+        return np.subtract(other, self)
+
+    def __mul__(self, other):
+        return np.multiply(self, other)
+
+    def __rmul__(self, other):
+        return np.multiply(other, self)
+
+    def __truediv__(self, other):
+        return np.true_divide(self, other)
+
+    def __rtruediv__(self, other):
+        return np.true_divide(other, self)
+
+    def __pow__(self, power):
+        return np.power(self, power)
+
+    def __rpow__(self, other):
+        return np.power(other, self)
+
+    def __matmul__(self, other):
+        return np.matmul(self, other)
+
+    def __rmatmul__(self, other):
+        return np.matmul(other, self)
+
+    def __gt__(self, other):
+        return np.greater(self, other)
+
+    def __ge__(self, other):
+        return np.greater_equal(self, other)
+
+    def __lt__(self, other):
+        return np.less(self, other)
+
+    def __le__(self, other):
+        return np.less_equal(self, other)
+
+
+class Trace:
+    '''
+    Flat program of NumPy kernels recorded from one evaluation of a dual-number function.
+
+    Casual users would benefit from using `trace`, or `gradients.gradient`
+    with `mode="compiled"`, rather than building a Trace themselves.
+    '''
+    def __init__(self):
+        self.kernels = []
+        self.buffers = []
+        self.num_inputs = 0
+        self.outputs = None
+
+    def placeholder(self, value):
+        '''
+        Appends an input placeholder
+
+        Parameters
+        ----------
+        value: float or np.array
+            Value of the input for the traced example
+
+        Returns
+        -------
+        Symbol
+        '''
+        self.kernels.append(None)
+        self.buffers.append(np.array(value))
+        self.num_inputs += 1
+        return Symbol(self.buffers[-1], self, len(self.buffers) - 1)
+
+    def record(self, kernel, args, kwargs, is_ufunc=False):
+        '''
+        Evaluates `kernel` on the traced values and appends it to the program
+
+        Returns
+        -------
+        Symbol
+            Placeholder for the result of the kernel
+        '''
+        value = kernel(*_to_value(args), **_to_value(kwargs))
+        if is_ufunc and isinstance(value, tuple):
+            raise TraceError("cannot trace {} with several outputs".format(kernel.__name__))
+        value = np.array(value)
+        args = _to_ref(tuple(args))
+        refs = [(position, arg.index) for position, arg in enumerate(args) if isinstance(arg, _Ref)]
+        if any(isinstance(arg, (list, tuple)) for arg in args) or kwargs:
+            refs = None
+        self.kernels.append((kernel, args, refs, _to_ref(kwargs), is_ufunc))
+        self.buffers.append(value)
+        return Symbol(value, self, len(self.buffers) - 1)
+
+    def replay(self, *inputs):
+        '''
+        Re-runs the recorded kernels on new inputs, in place
+
+        Parameters
+        ----------
+        inputs: floats or np.arrays
+            New values of the placeholders, in the order they were created
+
+        Returns
+        -------
+        list
+            Buffers of every node.  They are overwritten by the next replay.
+        '''
+        buffers = self.buffers
+        for i, value in enumerate(inputs):
+            buffers[i][...] = value
+        for i in range(self.num_inputs, len(self.kernels)):
+            kernel, args, refs, kwargs, is_ufunc = self.kernels[i]
+            if refs is None:
+                args = _resolve(args, buffers)
+                kwargs = _resolve(kwargs, buffers)
+            else:
+                args = list(args)
+                for position, index in refs:
+                    args[position] = buffers[index]
+            if is_ufunc:
+                kernel(*args, out=buffers[i], **kwargs)
+            else:
+                buffers[i] = np.asarray(kernel(*args, **kwargs))
+        return buffers
+
+    def output(self, outputs, buffers):
+        '''Copies the traced `outputs` out of the replayed `buffers`'''
+        return [np.array(_resolve(out, buffers)) for out in outputs]
+
+    def gradient(self, x):
+        '''
+        Parameters
+        ----------
+        x: np.array
+            Input variable, same shape and dtype as the traced example
+
+        Returns
+        -------
+        tuple: (float, list of floats)
+            As returned by `gradients.gradient`
+        '''
+        y, dy = self.output(self.outputs, self.replay(*x))
+        return y[()], list(dy)
+
+
+def trace(func, example_x):
+    '''
+    Records the kernels that evaluate a dual-number function and its gradient
+
+    Parameters
+    ----------
+    func: function
+        Dual-Number implemented function that takes input in shape of `example_x`
+    example_x: np.array
+        Example input.  The trace is valid for inputs of the same shape and dtype.
+
+    Returns
+    -------
+    Trace
+    '''
+    example_x = np.array(example_x)
+    program = Trace()
+    # pylint: disable=protected-access
+    inputs = [MultiDualNumber._new(program.placeholder(seed.x), seed.dx)
+              for seed in MultiDualNumber.seed(example_x)]
+    y = func(*inputs)
+    program.outputs = (_to_ref(y.x), _to_ref(y.dx))
+    return program
+
+
+def _weak(func, callback=None):
+    '''Weak reference to `func`, or `func` itself if it cannot be weakly referenced'''
+    try:
+        if inspect.ismethod(func):
+            return weakref.WeakMethod(func, callback)
+        return weakref.ref(func, callback)
+    except TypeError:
+        return func
+
+
+class TraceCache:
+    '''
+    Traces keyed on function, input shape and input dtype
+
+    Functions are referenced weakly, so caching a trace does not keep a
+    function alive, nor the instance of a bound method and the data it
+    holds.  The traces of a function are dropped once it is garbage collected.
+
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of traces kept.  The least recently used trace is
+        dropped when a new one would exceed it.
+    '''
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._traces = OrderedDict()
+
+    def __len__(self):
+        return len(self._traces)
+
+    def get(self, func, x):
+        '''Trace of `func` for inputs like `x`, tracing on first use'''
+        x = np.asarray(x)
+        key = (_weak(func), x.shape, x.dtype)
+        if key in self._traces:
+            self._traces.move_to_end(key)
+            return self._traces[key]
+        program = trace(func, x)
+        self._traces[(_weak(func, self._drop), x.shape, x.dtype)] = program
+        if len(self._traces) > self.max_size:
+            self._traces.popitem(last=False)
+        return program
+
+    def _drop(self, ref):
+        '''Drops the traces of the function `ref` referenced, which has been garbage collected'''
+        for key in [key for key in self._traces if key[0] is ref]:
+            del self._traces[key]
+
+    def clear(self):
+        '''Drops every trace'''
+        self._traces.clear()
+
+
+TRACE_CACHE = TraceCache()
+
+
+def compiled_gradient(x, func):
+    '''
+    Same as `gradients.gradient`, but replays a cached trace of `func`
+
+    Parameters
+    ----------
+    x: np.array
+        Input variable
+    func: function
+        Dual-Number implemented function that takes input in shape of `x`
+
+    Returns
+    -------
+    tuple: (float, list of floats)
+    '''
+    x = np.asarray(x)
+    return TRACE_CACHE.get(func, x).gradient(x)
@@ -0,0 +1,53 @@
+'''
+Microbenchmarks of DualNumber arithmetic, for scalar and array payloads.
+'''
+import numpy as np
+from automatic_diff.dual_number import DualNumber, MultiDualNumber
+from benchmarks.utils import time_per_call
+
+
+OPERATIONS = {
+    'neg': lambda a, b: -a,
+    'abs': lambda a, b: abs(a),
+    'pow': lambda a, b: a**2.5,
+    'add': lambda a, b: a + b,
+    'add_constant': lambda a, b: a + 2.,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'mul_constant': lambda a, b: 2. * a,
+    'truediv': lambda a, b: a / b,
+    'rtruediv': lambda a, b: 2. / a,
+}
+
+
+def _operands(size, num_tangents):
+    rng = np.random.RandomState(0)
+    shape = () if size is None else (size,)
+    if num_tangents is None:
+        make = lambda: DualNumber(rng.uniform(1, 2, shape), rng.uniform(-1, 1, shape))
+    else:
+        make = lambda: MultiDualNumber(rng.uniform(1, 2, shape),
+                                       rng.uniform(-1, 1, shape + (num_tangents,)))
+    return make(), make()
+
+
+def run(cases=((None, None), (1000, None), (None, 10), (1000, 10))):
+    '''
+    Parameters
+    ----------
+    cases: sequence of (size, num_tangents)
+        `size` None for scalar payloads, `num_tangents` None for DualNumber
+        rather than MultiDualNumber
+
+    Returns
+    -------
+    dict
+        Seconds per operation under "seconds_per_call", keyed on case then operation name
+    '''
+    results = {}
+    for size, num_tangents in cases:
+        a, b = _operands(size, num_tangents)
+        case = 'size={} tangents={}'.format(size or 'scalar', num_tangents or 'single')
+        results[case] = {name: time_per_call(lambda op=op: op(a, b))
+                         for name, op in OPERATIONS.items()}
+    return {'seconds_per_call': results}
@@ -0,0 +1,75 @@
+'''
+Microbenchmark of the fused transcendental kernels in `functions.py` against
+the previous implementations composed from `exp`, `sin`, `cos` and division.
+
+Run with `python -m benchmarks.bench_functions`.  For each function, reports
+the number of DualNumbers created per call and the time per call.
+'''
+import numpy as np
+from automatic_diff import functions as fn
+from automatic_diff.dual_number import DualNumber
+from benchmarks.composed import COMPOSED
+from benchmarks.utils import time_per_call
+
+
+def count_dual_numbers(func, d):
+    '''Number of DualNumbers created by one call of `func(d)`'''
+    original = DualNumber.__dict__['_new']
+    count = [0]
+
+    def counting_new(cls, x, dx, **kwargs):
+        count[0] += 1
+        return original.__func__(cls, x, dx, **kwargs)
+
+    DualNumber._new = classmethod(counting_new) # pylint: disable=protected-access
+    try:
+        func(d)
+    finally:
+        DualNumber._new = original # pylint: disable=protected-access
+    return count[0]
+
+
+def run(size=1000):
+    '''
+    Parameters
+    ----------
+    size: int
+        Length of the array payload of the benchmarked DualNumber
+
+    Returns
+    -------
+    dict
+        For each function name, the number of DualNumbers created, the time per call
+        and the largest deviation from the composed implementation.
+    '''
+    rng = np.random.RandomState(0)
+    d = DualNumber(rng.uniform(0.1, 1.4, size), rng.uniform(-1, 1, size))
+    results = {}
+    for name, composed in COMPOSED.items():
+        fused = getattr(fn, name)
+        fused_d, composed_d = fused(d), composed(d)
+        results[name] = {
+            'fused_dual_numbers': count_dual_numbers(fused, d),
+            'composed_dual_numbers': count_dual_numbers(composed, d),
+            'fused_seconds': time_per_call(lambda f=fused: f(d)),
+            'composed_seconds': time_per_call(lambda f=composed: f(d)),
+            'max_abs_diff': float(max(np.max(abs(fused_d.x - composed_d.x)),
+                                      np.max(abs(fused_d.dx - composed_d.dx)))),
+        }
+    return results
+
+
+def main():
+    '''Prints the benchmark table'''
+    header = "{:<8} {:>14} {:>16} {:>12} {:>12} {:>10}".format(
+        'func', 'fused duals', 'composed duals', 'fused us', 'composed us', 'max diff')
+    print(header)
+    for name, result in run().items():
+        print("{:<8} {:>14} {:>16} {:>12.1f} {:>12.1f} {:>10.1e}".format(
+            name, result['fused_dual_numbers'], result['composed_dual_numbers'],
+            1e6 * result['fused_seconds'], 1e6 * result['composed_seconds'],
+            result['max_abs_diff']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+'''
+Cost of `gradients.gradient` against the input dimension, for each mode.
+'''
+import numpy as np
+from automatic_diff import functions as fn
+from automatic_diff.gradients import gradient
+from benchmarks.utils import time_per_call
+
+
+def objective(*d):
+    '''Scalar function coupling every pair of neighbouring inputs'''
+    return sum(fn.sin(d_0) * d_1 + fn.exp(-d_1**2) for d_0, d_1 in zip(d[:-1], d[1:]))
+
+
+def run(dims=(2, 8, 32, 128), modes=('forward', 'sparse', 'reverse', 'compiled')):
+    '''
+    Returns
+    -------
+    dict
+        Seconds per gradient under "seconds_per_gradient", keyed on mode then input dimension
+    '''
+    rng = np.random.RandomState(0)
+    results = {}
+    for mode in modes:
+        results[mode] = {}
+        for dim in dims:
+            x = rng.uniform(-1, 1, dim)
+            results[mode][str(dim)] = time_per_call(
+                lambda x=x, mode=mode: gradient(x, objective, mode=mode))
+    return {'seconds_per_gradient': results}
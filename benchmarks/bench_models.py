@@ -0,0 +1,28 @@
+'''
+Cost of `LinearRegression.fit` against the number of rows and features.
+'''
+import numpy as np
+from automatic_diff.linear_regression import LinearRegression
+from benchmarks.utils import wall_time
+
+
+def run(rows=(1000, 10000, 100000), features=(1, 10, 50), max_iters=20):
+    '''
+    Every fit runs exactly `max_iters` iterations, so timings are comparable.
+
+    Returns
+    -------
+    dict
+        Seconds per iteration under "seconds_per_iteration", keyed on "rows x features"
+    '''
+    rng = np.random.RandomState(0)
+    results = {}
+    for num_rows in rows:
+        for num_features in features:
+            X = rng.normal(size=(num_rows, num_features))
+            y = X @ rng.normal(size=num_features) + 1
+            model = LinearRegression(X, y, init_params=np.zeros(num_features + 1))
+            seconds, _ = wall_time(lambda model=model: model.fit(
+                max_iters=max_iters, tol=-1, lr=1e-3))
+            results['{}x{}'.format(num_rows, num_features)] = seconds / max_iters
+    return {'seconds_per_iteration': results}
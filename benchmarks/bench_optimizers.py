@@ -0,0 +1,61 @@
+'''
+Iterations per second and time to tolerance of `grad_descent`, for every
+LearningRate, and of L-BFGS, for both of its line searches.
+'''
+import numpy as np
+from automatic_diff import learning_rates
+from automatic_diff.grad_descent import GradientDescent
+from automatic_diff.lbfgs import LBFGS
+from benchmarks.utils import wall_time
+
+
+def objective(*d):
+    '''Badly scaled quadratic bowl with its minimum at (1, ..., 1)'''
+    return sum((i + 1) * (component - 1)**2 for i, component in enumerate(d))
+
+
+def learning_rate_factories():
+    '''Fresh instance of every LearningRate subclass, keyed on class name'''
+    return {
+        'LearningRate': lambda: learning_rates.LearningRate(lr=0.05),
+        'TimeDecayLearningRate': lambda: learning_rates.TimeDecayLearningRate(lr=0.05),
+        'GradDecayLearningRate': lambda: learning_rates.GradDecayLearningRate(lr=0.05),
+        'MomentumLearningRate': lambda: learning_rates.MomentumLearningRate(lr=0.05),
+        'NesterovLearningRate': lambda: learning_rates.NesterovLearningRate(lr=0.05),
+        'AdagradLearningRate': lambda: learning_rates.AdagradLearningRate(lr=0.5),
+        'RMSPropLearningRate': lambda: learning_rates.RMSPropLearningRate(lr=0.05),
+        'AdamLearningRate': lambda: learning_rates.AdamLearningRate(lr=0.05),
+    }
+
+
+def run(dim=10, tol=1e-4, max_iters=2000):
+    '''
+    Returns
+    -------
+    dict
+        Per learning rate, and per L-BFGS line search: iterations run, seconds,
+        iterations per second, evaluations of the objective alone and with its
+        gradient, whether `tol` was reached and the final objective value
+    '''
+    initial_x = np.zeros(dim)
+    # keyword args of fit are made afresh for every fit, as learning rates keep state
+    fits = {name: (GradientDescent, lambda factory=factory: {'lr': factory()})
+            for name, factory in learning_rate_factories().items()}
+    fits['LBFGS/wolfe'] = (LBFGS, lambda: {'line_search': 'wolfe'})
+    fits['LBFGS/armijo'] = (LBFGS, lambda: {'line_search': 'armijo'})
+    results = {}
+    for name, (optimizer_class, fit_kwargs) in fits.items():
+        optimizer = optimizer_class(objective)
+        # pylint: disable=cell-var-from-loop
+        seconds, _ = wall_time(lambda: optimizer.fit(
+            initial_x, tol=tol, max_iters=max_iters, **fit_kwargs()))
+        results[name] = {
+            'iterations': optimizer.num_iter,
+            'seconds': seconds,
+            'iterations_per_second': optimizer.num_iter / seconds,
+            'func_evals': optimizer.num_func_evals,
+            'grad_evals': optimizer.num_grad_evals,
+            'converged': bool(optimizer.dual_x.size_dx <= tol),
+            'objective': float(optimizer.y),
+        }
+    return results
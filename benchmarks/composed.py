@@ -0,0 +1,37 @@
+'''
+Implementations of the fused kernels of `functions.py` composed from `exp`,
+`sin`, `cos` and division, as they were before being fused.
+`bench_functions` times both, and the tests check the fused kernels against them.
+'''
+from automatic_diff import functions as fn
+
+
+def _composed_sinh(d):
+    return (fn.exp(d) - fn.exp(-d)) / 2
+
+
+def _composed_cosh(d):
+    return (fn.exp(d) + fn.exp(-d)) / 2
+
+
+def _composed_tanh(d):
+    return _composed_sinh(d) / _composed_cosh(d)
+
+
+def _composed_tan(d):
+    return fn.sin(d) / fn.cos(d)
+
+
+COMPOSED = {
+    'sigmoid': lambda d: 1 / (1 + fn.exp(-d)),
+    'tan': _composed_tan,
+    'cot': lambda d: 1 / _composed_tan(d),
+    'csc': lambda d: 1 / fn.sin(d),
+    'sec': lambda d: 1 / fn.cos(d),
+    'sinh': _composed_sinh,
+    'cosh': _composed_cosh,
+    'tanh': _composed_tanh,
+    'coth': lambda d: 1 / _composed_tanh(d),
+    'csch': lambda d: 1 / _composed_sinh(d),
+    'sech': lambda d: 1 / _composed_cosh(d),
+}
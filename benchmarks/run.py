@@ -0,0 +1,110 @@
+'''
+Benchmark harness.
+
+Runs every benchmark module and writes the results as JSON, so that runs
+can be compared to catch regressions:
+
+    python -m benchmarks.run --output new.json --compare old.json
+'''
+import argparse
+import datetime
+import json
+import platform
+import sys
+import numpy as np
+from benchmarks import (
+    bench_dual_number, bench_functions, bench_gradients, bench_models, bench_optimizers)
+
+
+BENCHMARKS = {
+    'dual_number': bench_dual_number.run,
+    'functions': bench_functions.run,
+    'gradients': bench_gradients.run,
+    'optimizers': bench_optimizers.run,
+    'models': bench_models.run,
+}
+
+
+def run(names=None):
+    '''
+    Parameters
+    ----------
+    names: sequence of str or None
+        Benchmarks to run, keys of BENCHMARKS.  All of them if None.
+
+    Returns
+    -------
+    dict
+        Environment metadata under "meta", and each benchmark's results under its name
+    '''
+    results = {'meta': {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }}
+    for name in names or BENCHMARKS:
+        print("running {}".format(name), file=sys.stderr)
+        results[name] = BENCHMARKS[name]()
+    return results
+
+
+def _is_timing(key):
+    return any(part.startswith('seconds') or part.endswith('seconds') for part in key.split('/'))
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + key + '/'))
+        elif isinstance(value, float):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old, new, threshold=0.2):
+    '''
+    Parameters
+    ----------
+    old, new: dict
+        Results of `run`
+    threshold: float
+        Relative slow down above which a timing is reported as a regression
+
+    Returns
+    -------
+    list of (str, float, float)
+        Name, old and new value of every timing in seconds that regressed
+    '''
+    old, new = _flatten(old), _flatten(new)
+    return [(key, old[key], new[key]) for key in sorted(set(old) & set(new))
+            if _is_timing(key) and new[key] > (1 + threshold) * old[key]]
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', default='benchmarks.json', help='JSON file to write')
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='benchmarks to run')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slow down reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.only)
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+    print("wrote {}".format(args.output), file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as previous:
+            regressions = compare(json.load(previous), results, args.threshold)
+        for key, old, new in regressions:
+            print("REGRESSION {}: {:.3g}s -> {:.3g}s".format(key, old, new))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+'''
+Timing helpers shared by the benchmarks
+'''
+import time
+import timeit
+
+
+def time_per_call(func, repeat=3, min_time=0.05):
+    '''
+    Best of `repeat` timings of `func()`, each averaged over enough calls to take `min_time`
+
+    Returns
+    -------
+    float
+        Seconds per call
+    '''
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def wall_time(func, repeat=3):
+    '''
+    Best of `repeat` single calls of `func()`, for calls too slow to average
+
+    Returns
+    -------
+    tuple
+        Seconds taken by the fastest call of `func()`, and its return value
+    '''
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
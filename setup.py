@@ -7,6 +7,6 @@ setup(
     name='automatic_diff',
     version='0.1.0',
     description='naive automatic differentiation via dual numbers',
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(exclude=['benchmarks', 'contrib', 'docs', 'tests']),
     install_requires=['numpy', 'scikit-learn']
 )
@@ -0,0 +1,34 @@
+import inspect
+import unittest
+
+from automatic_diff import learning_rates
+from benchmarks.bench_optimizers import learning_rate_factories
+from benchmarks.run import compare
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_reports_only_slower_timings(self):
+        old = {'meta': {'numpy': '1.0'},
+               'gradients': {'seconds_per_gradient': {'forward': {'2': 1.0, '8': 1.0}}},
+               'optimizers': {'LearningRate': {'seconds': 1.0, 'iterations_per_second': 10.,
+                                               'objective': 1.0}}}
+        new = {'meta': {'numpy': '2.0'},
+               'gradients': {'seconds_per_gradient': {'forward': {'2': 1.1, '8': 2.0}}},
+               'optimizers': {'LearningRate': {'seconds': 3.0, 'iterations_per_second': 30.,
+                                               'objective': 3.0}}}
+        self.assertEqual(
+            [('gradients/seconds_per_gradient/forward/8', 1.0, 2.0),
+             ('optimizers/LearningRate/seconds', 1.0, 3.0)],
+            compare(old, new, threshold=0.2))
+
+
+class TestBenchOptimizers(unittest.TestCase):
+
+    def test_every_learning_rate(self):
+        expected = {name for name, cls in inspect.getmembers(learning_rates, inspect.isclass)
+                    if issubclass(cls, learning_rates.LearningRate)}
+        factories = learning_rate_factories()
+        self.assertEqual(expected, set(factories))
+        for name, factory in factories.items():
+            self.assertEqual(name, type(factory()).__name__)
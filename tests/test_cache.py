@@ -0,0 +1,128 @@
+import numpy as np
+
+from automatic_diff import gradients as grads
+from automatic_diff.cache import CacheError, ResultCache
+from automatic_diff.grad_descent import GradientDescent
+from automatic_diff.lbfgs import LBFGS
+from automatic_diff.linear_regression import LinearRegression
+from tests.utils import DualNumberTestCase
+
+
+def rosenbrock(a, b):
+    return (a - 1)**2 + 10 * (b - a**2)**2
+
+
+class CountingFunction:
+
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.func(*args)
+
+
+class TestResultCache(DualNumberTestCase):
+
+    def setUp(self):
+        self.cache = ResultCache()
+        self.func = CountingFunction(rosenbrock)
+
+    def test_gradient_served_from_cache(self):
+        expected = grads.gradient([0.5, 0.2], rosenbrock)
+        for _ in range(3):
+            y, grad = grads.gradient([0.5, 0.2], self.func, cache=self.cache)
+            self.assertEqual(expected[0], y)
+            self.assertEqual(expected[1], grad)
+        self.assertEqual(1, self.func.calls)
+        self.assertEqual({'hits': 2, 'misses': 1, 'evictions': 0, 'entries': 1, 'nbytes': 40},
+                         self.cache.stats)
+
+    def test_key(self):
+        grads.gradient(np.array([0.5, 0.2]), self.func, cache=self.cache)
+        grads.gradient(np.array([0.5, 0.3]), self.func, cache=self.cache)
+        grads.gradient(np.array([0.5, 0.2], dtype=np.float32), self.func, cache=self.cache)
+        grads.gradient(np.array([0.5, 0.2]), self.func, mode="reverse", cache=self.cache)
+        grads.gradient(np.array([0.5, 0.2]), CountingFunction(rosenbrock), cache=self.cache)
+        self.assertEqual(5, self.cache.misses)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_bytes=100)
+        for x in [0., 1., 2., 0.]:
+            grads.gradient([x, x], self.func, cache=cache)
+        self.assertEqual(4, self.func.calls)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2, cache.evictions)
+        self.assertLessEqual(cache.nbytes, 100)
+        grads.gradient([0., 0.], self.func, cache=cache)
+        self.assertEqual(1, cache.hits)
+        grads.gradient(np.zeros(20), lambda *d: sum(d), cache=cache)
+        self.assertEqual(2, len(cache))
+        with self.assertRaises(CacheError):
+            ResultCache(max_bytes=-1)
+
+    def test_results_read_only(self):
+        y, _ = self.cache.get(self.func, [1., 2.], lambda: (np.ones(2), None))
+        with self.assertRaises(ValueError):
+            y[0] = 0
+
+    def test_wrap(self):
+        wrapped = self.cache.wrap(self.func)
+        self.assertEqual(rosenbrock(1., 2.), wrapped(1., 2.))
+        self.assertEqual(rosenbrock(1., 2.), wrapped(1., 2.))
+        self.assertEqual(1, self.func.calls)
+        self.assertEqual(grads.gradient([1., 2.], rosenbrock), grads.gradient([1., 2.], wrapped))
+        self.assertEqual(2, self.func.calls)
+
+    def test_invalidate(self):
+        other = CountingFunction(rosenbrock)
+        for x in [0., 1.]:
+            grads.gradient([x, x], self.func, cache=self.cache)
+            grads.gradient([x, x], other, cache=self.cache)
+        self.assertEqual(1, self.cache.invalidate(self.func, [1, 1]))
+        self.assertEqual(1, self.cache.invalidate(self.func))
+        self.assertEqual(2, len(self.cache))
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.nbytes)
+        self.cache.reset_stats()
+        self.assertEqual(0, self.cache.misses)
+
+    def test_invalidate_integer_input(self):
+        grads.gradient([1, 2], self.func, cache=self.cache)
+        self.assertEqual(1, self.cache.invalidate(self.func, [1, 2]))
+        wrapped = self.cache.wrap(self.func)
+        wrapped(1, 2)
+        self.assertEqual(1, self.cache.invalidate(self.func, np.array([1., 2.])))
+
+
+class TestCachedFits(DualNumberTestCase):
+
+    def test_repeated_fits(self):
+        cache = ResultCache()
+        for optimizer, kwargs in [(GradientDescent, {'lr': 0.01}),
+                                  (LBFGS, {'line_search': 'wolfe'}),
+                                  (LBFGS, {'line_search': 'armijo'})]:
+            func = CountingFunction(rosenbrock)
+            first = optimizer(func)
+            first.fit([0., 0.], max_iters=30, tol=1e-8, cache=cache, **kwargs)
+            calls = func.calls
+            second = optimizer(func)
+            second.fit([0., 0.], max_iters=30, tol=1e-8, cache=cache, **kwargs)
+            self.assertEqual(calls, func.calls)
+            np.testing.assert_equal(first.x, second.x)
+
+    def test_model_fit(self):
+        rng = np.random.RandomState(0)
+        X = rng.normal(size=(30, 2))
+        model = LinearRegression(X, X @ [2.5, -1.] + 4, init_params=[0, 0, 0])
+        cache = ResultCache()
+        first = model.fit(max_iters=20, lr=0.1, cache=cache).x
+        self.assertEqual(20, cache.misses)
+        second = model.fit(max_iters=20, lr=0.1, cache=cache).x
+        self.assertEqual(20, cache.hits)
+        np.testing.assert_equal(first, second)
+        model.y = model.y + 1
+        self.assertEqual(20, cache.invalidate(model.loss_func))
@@ -0,0 +1,205 @@
+import json
+import os
+import tempfile
+import numpy as np
+
+from automatic_diff.callbacks import Callback, Checkpoint, EarlyStopping, Recorder
+from automatic_diff.grad_descent import (
+    GradientDescent, PopulationGradientDescent, StochasticGradientDescent)
+from automatic_diff.lbfgs import LBFGS
+from automatic_diff.learning_rates import AdamLearningRate, GradDecayLearningRate
+from tests.utils import DualNumberTestCase
+
+
+def _bowl(d_0, d_1):
+    return (d_0 - 2)**2 + (d_1 + 3)**2 + 8
+
+
+class TestCallbacks(DualNumberTestCase):
+
+    def test_hooks_called_in_order(self):
+        calls = []
+        class Logging(Callback):
+            def on_fit_begin(self, grad_descent):
+                calls.append(('begin', grad_descent.num_iter))
+            def on_iteration_end(self, grad_descent):
+                calls.append(('iteration', grad_descent.num_iter))
+            def on_fit_end(self, grad_descent):
+                calls.append(('end', grad_descent.num_iter))
+        GradientDescent(_bowl).fit([10, 12], tol=1e-12, max_iters=3, callbacks=[Logging()])
+        self.assertEqual([('begin', 0), ('iteration', 1), ('iteration', 2), ('iteration', 3),
+                          ('end', 3)], calls)
+
+    def test_function_stops_fit(self):
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=100,
+                      callbacks=[lambda grad_descent: grad_descent.y < 20])
+        self.assertLess(grad_desc.num_iter, 100)
+        self.assertLess(grad_desc.y, 20)
+
+    def test_stopping_callback_runs_others(self):
+        recorder = Recorder()
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=100,
+                      callbacks=[lambda grad_descent: True, recorder])
+        self.assertEqual(1, grad_desc.num_iter)
+        self.assertEqual(1, len(recorder.history))
+
+
+class TestRecorder(DualNumberTestCase):
+
+    def test_history(self):
+        recorder = Recorder()
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=5, lr=0.1, callbacks=[recorder])
+        history = recorder.history
+        self.assertEqual(5, len(history))
+        np.testing.assert_equal(np.arange(1, 6), history['iteration'])
+        np.testing.assert_equal(np.arange(1, 6), history['grad_evals'])
+        np.testing.assert_equal(0, history['func_evals'])
+        np.testing.assert_equal(0.1, history['lr'])
+        self.assertAlmostEqual(grad_desc.y, history['objective'][-1])
+        self.assertAlmostEqual(grad_desc.dual_x.size_dx, history['step_size'][-1])
+        self.assertTrue(np.all(np.diff(history['objective']) < 0))
+        self.assertTrue(np.all(np.diff(history['elapsed_seconds']) > 0))
+        np.testing.assert_almost_equal(history['seconds'],
+                                       history['grad_seconds'] + history['update_seconds'])
+
+    def test_grows_past_capacity(self):
+        recorder = Recorder(capacity=2)
+        GradientDescent(_bowl).fit([10, 12], tol=1e-12, max_iters=7, callbacks=[recorder])
+        np.testing.assert_equal(np.arange(1, 8), recorder.history['iteration'])
+
+    def test_initial_allocation_bounded(self):
+        recorder = Recorder()
+        GradientDescent(_bowl).fit([10, 12], tol=1e-2, max_iters=10**8, callbacks=[recorder])
+        self.assertEqual(Recorder.max_initial_capacity, len(recorder._records))
+        self.assertEqual(recorder.history['iteration'][-1], len(recorder.history))
+
+    def test_reset_between_fits(self):
+        recorder = Recorder()
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=4, callbacks=[recorder])
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=2, callbacks=[recorder])
+        self.assertEqual(2, len(recorder.history))
+
+    def test_lbfgs_and_population(self):
+        recorder = Recorder()
+        LBFGS(_bowl).fit([10, 12], tol=1e-8, max_iters=20, callbacks=[recorder])
+        self.assertGreater(recorder.history['func_evals'][-1]
+                           + recorder.history['grad_evals'][-1], len(recorder.history))
+        population = PopulationGradientDescent(_bowl)
+        population.fit([[10, 12], [0, 0]], tol=1e-12, max_iters=3, lr=0.1,
+                       callbacks=[recorder])
+        self.assertAlmostEqual(population.y.min(), recorder.history['objective'][-1])
+
+    def test_export(self):
+        recorder = Recorder()
+        GradientDescent(_bowl).fit([10, 12], tol=1e-12, max_iters=3, callbacks=[recorder])
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'history.csv')
+            recorder.to_csv(csv_path)
+            loaded = np.genfromtxt(csv_path, delimiter=',', names=True)
+            np.testing.assert_equal(recorder.history['objective'], loaded['objective'])
+            json_path = os.path.join(directory, 'history.json')
+            recorder.to_json(json_path)
+            with open(json_path) as file:
+                self.assertEqual(recorder.to_dict(), json.load(file))
+
+
+class TestEarlyStopping(DualNumberTestCase):
+
+    def test_objective_plateau(self):
+        stopping = EarlyStopping(atol=1e-3, patience=3)
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=1000, lr=0.1, callbacks=[stopping])
+        self.assertEqual("objective", stopping.stop_reason)
+        self.assertLess(grad_desc.num_iter, 1000)
+        self.assertAlmostEqual(8, grad_desc.y, places=2)
+        self.assertEqual(3, stopping.num_plateaued)
+
+    def test_first_iteration_not_a_plateau(self):
+        for kwargs in [{'atol': 1e-3}, {'rtol': 1e-3}, {'atol': 1e-3, 'rtol': 1e-3}]:
+            stopping = EarlyStopping(patience=1, **kwargs)
+            grad_desc = GradientDescent(_bowl)
+            grad_desc.fit([10, 12], tol=1e-12, max_iters=100, lr=0.1, callbacks=[stopping])
+            self.assertGreater(grad_desc.num_iter, 1, msg=str(kwargs))
+            self.assertEqual("objective", stopping.stop_reason)
+
+    def test_patience_allows_bumps(self):
+        values = iter([5., 4., 4.5, 4.2, 3., 3., 3., 3.])
+        grad_desc = GradientDescent(lambda d: 1e-3 * d + next(values))
+        stopping = EarlyStopping(atol=1e-2, patience=3)
+        grad_desc.fit([1.], tol=1e-12, max_iters=100, callbacks=[stopping])
+        self.assertEqual(8, grad_desc.num_iter)
+
+    def test_gradient_norm(self):
+        stopping = EarlyStopping(gtol=1e-2)
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=1000, lr=0.1, callbacks=[stopping])
+        self.assertEqual("gradient", stopping.stop_reason)
+        self.assertLessEqual(np.linalg.norm(grad_desc.grad), 1e-2)
+
+    def test_time_budget(self):
+        stopping = EarlyStopping(max_seconds=0.)
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=1000, callbacks=[stopping])
+        self.assertEqual("time", stopping.stop_reason)
+        self.assertEqual(1, grad_desc.num_iter)
+
+    def test_population(self):
+        stopping = EarlyStopping(gtol=1e-2)
+        population = PopulationGradientDescent(_bowl)
+        population.fit([[10, 12], [2.001, -3]], tol=1e-12, max_iters=1000, lr=0.1,
+                       callbacks=[stopping])
+        self.assertEqual("gradient", stopping.stop_reason)
+        self.assertLessEqual(np.linalg.norm(population.grad, axis=-1).max(), 1e-2)
+
+
+class TestCheckpoint(DualNumberTestCase):
+
+    def _resumed(self, make_optimizer, make_lr, initial_x, **fit_kwargs):
+        '''Optimizers fit in one go, and fit halfway, checkpointed and resumed'''
+        whole = make_optimizer()
+        whole.fit(initial_x, tol=1e-12, max_iters=10, lr=make_lr(), **fit_kwargs)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fit.pkl')
+            make_optimizer().fit(initial_x, tol=1e-12, max_iters=5, lr=make_lr(),
+                                 callbacks=[Checkpoint(path, every=2)], **fit_kwargs)
+            resumed = make_optimizer()
+            resumed.fit(tol=1e-12, max_iters=10, lr=make_lr(), resume=path, **fit_kwargs)
+        return whole, resumed
+
+    def test_resume_matches_uninterrupted_fit(self):
+        cases = [
+            (lambda: GradientDescent(_bowl), lambda: GradDecayLearningRate(lr=0.1), [10, 12]),
+            (lambda: GradientDescent(_bowl), lambda: AdamLearningRate(lr=0.5), [10, 12]),
+            (lambda: LBFGS(lambda d_0, d_1: (d_0 - 1)**4 + 10 * d_1**2), lambda: 1.,
+             [3., 2.]),
+            (lambda: PopulationGradientDescent(_bowl), lambda: 0.1, [[10, 12], [0, 0]]),
+        ]
+        for make_optimizer, make_lr, initial_x in cases:
+            whole, resumed = self._resumed(make_optimizer, make_lr, initial_x)
+            self.assertEqual(10, resumed.num_iter)
+            self.assertEqual(whole.num_grad_evals, resumed.num_grad_evals)
+            np.testing.assert_almost_equal(whole.x, resumed.x)
+            np.testing.assert_almost_equal(whole.dx, resumed.dx)
+
+    def test_resume_stochastic(self):
+        targets = np.random.RandomState(0).normal(3, 0.1, 50)
+        func = lambda rows, d: np.mean((d - targets[rows])**2)
+        whole, resumed = self._resumed(
+            lambda: StochasticGradientDescent(func, len(targets)), lambda: 0.1, [10.],
+            batch_size=8, epochs=3, seed=2)
+        self.assertEqual(whole.num_epoch, resumed.num_epoch)
+        np.testing.assert_almost_equal(whole.x, resumed.x)
+
+    def test_resume_from_state(self):
+        grad_desc = GradientDescent(_bowl)
+        grad_desc.fit([10, 12], tol=1e-12, max_iters=3, lr=0.1)
+        state = grad_desc.get_state()
+        x = grad_desc.x.copy()
+        grad_desc.fit(tol=1e-12, max_iters=4, lr=0.1, resume=state)
+        self.assertEqual(4, grad_desc.num_iter)
+        np.testing.assert_almost_equal(x, state['dual_x'].x)
+        np.testing.assert_almost_equal(x - 0.1 * grad_desc.grad, grad_desc.x)
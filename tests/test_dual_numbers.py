@@ -2,7 +2,8 @@ import unittest
 import numpy as np
 import numpy.testing as npt
 
-from automatic_diff.dual_number import DualNumber, DualNumberError
+from automatic_diff.dual_number import (
+    DualNumber, DualNumberError, MultiDualNumber, get_dtype, set_dtype)
 
 
 class TestDualNumberConstructor(unittest.TestCase):
@@ -136,6 +137,33 @@ class TestLinearityDualNumbers(unittest.TestCase):
         self.assertEqual(expected, actual)
 
 
+class TestConstantOperands(unittest.TestCase):
+
+    def test_constant_operand_shares_tangent(self):
+        dual_number = DualNumber([3., 4.], [1., 2.])
+        self.assertIs(dual_number.dx, (dual_number + 2).dx)
+        self.assertIs(dual_number.dx, (dual_number - 2).dx)
+
+    def test_scalar_dual_plus_array(self):
+        actual = DualNumber(3, 8) + np.array([1, 2])
+        expected = DualNumber([4, 5], [8, 8])
+        self.assertEqual(expected, actual)
+
+    def test_list_minus_scalar_dual(self):
+        actual = [1, 2] - DualNumber(3, 8)
+        expected = DualNumber([-2, -1], [-8, -8])
+        self.assertEqual(expected, actual)
+
+    def test_list_divided_by_scalar_dual(self):
+        actual = [1, 2] / DualNumber(2, 8)
+        expected = DualNumber([0.5, 1], [-2, -4])
+        self.assertEqual(expected, actual)
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            DualNumber(3, 8).extra = 1
+
+
 class TestProductRule(unittest.TestCase):
 
     def test_dual_times_dual(self):
@@ -167,6 +195,179 @@ class TestQuotientRule(unittest.TestCase):
         expected = DualNumber(x1 / x2, -x1 * dx2/ x2**2)
         self.assertEqual(expected, actual)
 
+class TestInPlaceOps(unittest.TestCase):
+
+    def test_in_place_matches_out_of_place(self):
+        d_0 = DualNumber([1., 2.], [3., 4.])
+        d_1 = DualNumber([5., 6.], [7., 8.])
+        for op, iop in [('__add__', '__iadd__'), ('__sub__', '__isub__'),
+                        ('__mul__', '__imul__'), ('__truediv__', '__itruediv__')]:
+            for other in [d_1, 2.]:
+                expected = getattr(d_0, op)(other)
+                actual = DualNumber(d_0.x.copy(), d_0.dx.copy())
+                x, dx = actual.x, actual.dx
+                actual = getattr(actual, iop)(other)
+                npt.assert_almost_equal(actual.x, expected.x)
+                npt.assert_almost_equal(actual.dx, expected.dx)
+                self.assertIs(actual.x, x)
+                self.assertIs(actual.dx, dx)
+
+    def test_out_buffer(self):
+        d_0 = DualNumber([1., 2.], [3., 4.])
+        d_1 = DualNumber([5., 6.], [7., 8.])
+        out = DualNumber(np.zeros(2), np.zeros(2))
+        x, dx = out.x, out.dx
+        self.assertIs(d_0.mul(d_1, out=out), out)
+        self.assertIs(out.x, x)
+        self.assertIs(out.dx, dx)
+        self.assertEqual(out, d_0 * d_1)
+
+    def test_in_place_does_not_alter_shared_dx(self):
+        d_0 = DualNumber([1., 2.], [3., 4.])
+        d_1 = d_0 + 1
+        d_1 *= 2
+        npt.assert_equal(d_0.dx, [3, 4])
+        npt.assert_equal(d_1.dx, [6, 8])
+
+    def test_in_place_on_source_does_not_alter_shared_dx(self):
+        for derive in [lambda d: d + 1, lambda d: 1 + d, lambda d: d - 1, lambda d: d[0:2],
+                       lambda d: d.reshape(2), lambda d: d.T, np.positive]:
+            d_0 = DualNumber([1., 2.], [3., 4.])
+            d_1 = derive(d_0)
+            d_0 *= 3
+            d_0 += d_0
+            npt.assert_equal(d_1.dx, [3, 4])
+            npt.assert_equal(d_0.dx, [18, 24])
+            d_1 /= 2
+            npt.assert_equal(d_0.dx, [18, 24])
+
+
+class TestNumpyProtocol(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.array([0.2, 0.7])
+        self.d = MultiDualNumber(self.x, np.array([[1., 0.], [0.5, 2.]]))
+
+    def assert_derivative(self, func, x, actual, eps=1e-6):
+        npt.assert_allclose(actual.x, func(x), rtol=1e-12)
+        expected = (func(x + eps) - func(x - eps)) / (2 * eps)
+        npt.assert_allclose(actual.dx, expected[..., None] * self.d.dx, rtol=1e-5, atol=1e-8)
+
+    def test_unary_ufuncs(self):
+        for ufunc in [np.exp, np.expm1, np.log, np.log1p, np.sqrt, np.square, np.sin,
+                      np.cos, np.tan, np.arcsin, np.arctan, np.tanh, np.arcsinh]:
+            self.assert_derivative(ufunc, self.x, ufunc(self.d))
+
+    def test_binary_ufuncs_with_constant(self):
+        other = np.array([0.5, 0.4])
+        for ufunc in [np.power, np.maximum, np.hypot, np.arctan2, np.logaddexp]:
+            self.assert_derivative(lambda x, ufunc=ufunc: ufunc(x, other), self.x,
+                                   ufunc(self.d, other))
+            self.assert_derivative(lambda x, ufunc=ufunc: ufunc(other, x), self.x,
+                                   ufunc(other, self.d))
+
+    def test_binary_ufunc_of_duals(self):
+        d_0, d_1 = MultiDualNumber.seed([0.3, 0.8])
+        actual = np.hypot(d_0, d_1)
+        npt.assert_allclose(actual.dx, [0.3 / actual.x, 0.8 / actual.x])
+
+    def test_array_operand_is_constant(self):
+        actual = np.array([1., 2.]) - DualNumber(3., 8.)
+        self.assertIsInstance(actual, DualNumber)
+        self.assertEqual(DualNumber([-2., -1.], [-8., -8.]), actual)
+        actual = np.array([2., 3.]) * DualNumber([1., 2.], [1., 1.])
+        self.assertEqual(DualNumber([2., 6.], [2., 3.]), actual)
+
+    def test_piecewise_constant_and_comparison(self):
+        self.assertEqual(np.floor(DualNumber(2.5, 1.)), DualNumber(2., 0.))
+        npt.assert_equal(np.greater(self.d, 0.5), [False, True])
+
+    def test_reductions(self):
+        d = MultiDualNumber([[1., 2.], [3., 4.]], np.arange(8.).reshape(2, 2, 2))
+        npt.assert_equal(np.sum(d).dx, [12, 16])
+        npt.assert_equal(np.sum(d, axis=-1).dx, [[2, 4], [10, 12]])
+        npt.assert_equal(np.mean(d, axis=0).x, [2, 3])
+        npt.assert_equal(np.mean(d, axis=0).dx, [[2, 3], [4, 5]])
+        npt.assert_equal(np.add.reduce(d).dx, [[4, 6], [8, 10]])
+
+    def test_where(self):
+        actual = np.where(self.d > 0.5, self.d, 1.)
+        npt.assert_equal(actual.x, [1., 0.7])
+        npt.assert_equal(actual.dx, [[0, 0], [0.5, 2]])
+
+    def test_out(self):
+        out = DualNumber(np.zeros(2), np.zeros(2))
+        x = out.x
+        self.assertIs(np.multiply(2., DualNumber([1., 2.], [3., 4.]), out=out), out)
+        self.assertIs(out.x, x)
+        self.assertEqual(DualNumber([2., 4.], [6., 8.]), out)
+
+    def test_unsupported_raise_type_error(self):
+        with self.assertRaises(TypeError):
+            np.floor_divide(self.d, 2)
+        with self.assertRaises(TypeError):
+            np.cumsum(self.d)
+
+
+class TestArrayOps(unittest.TestCase):
+
+    def setUp(self):
+        self.d = MultiDualNumber(np.arange(6.).reshape(2, 3), np.arange(12.).reshape(2, 3, 2))
+
+    def test_getitem(self):
+        npt.assert_equal(self.d[1].x, [3, 4, 5])
+        npt.assert_equal(self.d[1].dx, self.d.dx[1])
+        npt.assert_equal(self.d[..., -1].dx, self.d.dx[:, -1])
+        npt.assert_equal(self.d[self.d > 2].dx, self.d.dx[self.d.x > 2])
+
+    def test_getitem_result_in_place_leaves_original(self):
+        row = self.d[0]
+        row *= 2
+        npt.assert_equal(self.d.x[0], [0, 1, 2])
+        npt.assert_equal(self.d.dx[0], [[0, 1], [2, 3], [4, 5]])
+
+    def test_reshape_and_transpose(self):
+        npt.assert_equal(self.d.reshape(3, 2).dx, self.d.dx.reshape(3, 2, 2))
+        npt.assert_equal(np.reshape(self.d, -1).x, np.arange(6))
+        npt.assert_equal(self.d.T.x, self.d.x.T)
+        npt.assert_equal(self.d.T.dx, self.d.dx.transpose(1, 0, 2))
+
+    def test_sum_and_mean_methods(self):
+        npt.assert_equal(self.d.sum(axis=0).dx, self.d.dx.sum(axis=0))
+        npt.assert_equal(self.d.mean().dx, self.d.dx.mean(axis=(0, 1)))
+
+    def test_concatenate_and_stack_with_constants(self):
+        actual = np.concatenate([self.d, np.ones((1, 3))])
+        npt.assert_equal(actual.x[2], [1, 1, 1])
+        npt.assert_equal(actual.dx[2], np.zeros((3, 2)))
+        actual = np.stack([self.d, np.ones((2, 3))], axis=-1)
+        self.assertEqual((2, 3, 2), actual.shape)
+        npt.assert_equal(actual.dx[..., 0, :], self.d.dx)
+
+    def test_matmul_of_duals(self):
+        a = DualNumber([[1., 2.], [3., 4.]], [[1., 0.], [0., 0.]])
+        b = DualNumber([5., 6.], [0., 1.])
+        actual = a @ b
+        npt.assert_equal(actual.x, [17, 39])
+        npt.assert_equal(actual.dx, [5 + 2, 4])
+
+    def test_batched_matmul(self):
+        matrices = np.arange(12.).reshape(3, 2, 2)
+        d = MultiDualNumber(np.ones((3, 2, 1)), np.ones((3, 2, 1, 1)))
+        actual = matrices @ d
+        npt.assert_equal(actual.x, matrices @ np.ones((3, 2, 1)))
+        npt.assert_equal(actual.dx[..., 0], matrices @ np.ones((3, 2, 1)))
+
+    def test_dot_and_einsum(self):
+        d_0, d_1 = MultiDualNumber.seed([2., 3.])
+        vector = np.stack([d_0, d_1])
+        actual = vector.dot(vector)
+        npt.assert_equal(actual.x, 13)
+        npt.assert_equal(actual.dx, [4, 6])
+        actual = np.einsum('i,i', vector, np.array([1., 10.]))
+        npt.assert_equal(actual.dx, [1, 10])
+
+
 class TestEquality(unittest.TestCase):
 
     def test_different_x(self):
@@ -200,6 +401,69 @@ class TestEquality(unittest.TestCase):
         self.assertGreaterEqual(DualNumber(5, 7), DualNumber(5, 1))
 
 
+class TestMultiDualNumber(unittest.TestCase):
 
+    def test_inconsistent_shape_raise_dual_number_error(self):
+        with self.assertRaises(DualNumberError):
+            MultiDualNumber([1, 0], [1, 0])
+
+    def test_seed(self):
+        seeds = MultiDualNumber.seed([3, 5])
+        npt.assert_equal(seeds[0].x, 3)
+        npt.assert_equal(seeds[0].dx, [1, 0])
+        npt.assert_equal(seeds[1].x, 5)
+        npt.assert_equal(seeds[1].dx, [0, 1])
+
+    def test_product_rule(self):
+        d_0, d_1 = MultiDualNumber.seed([4, 9])
+        actual = d_0 * d_1 + 2
+        expected = MultiDualNumber(4 * 9 + 2, [9, 4])
+        self.assertEqual(expected, actual)
 
-
+    def test_quotient_rule(self):
+        d_0, d_1 = MultiDualNumber.seed([4, 9])
+        actual = d_0 / d_1
+        expected = MultiDualNumber(4 / 9, [1 / 9, -4 / 81])
+        npt.assert_almost_equal(expected.x, actual.x)
+        npt.assert_almost_equal(expected.dx, actual.dx)
+
+    def test_array_valued_with_constant(self):
+        d = MultiDualNumber([1., 2., 3.], np.ones((3, 2)))
+        actual = 2 * d**2 - 1
+        npt.assert_equal(actual.x, [1, 7, 17])
+        npt.assert_equal(actual.dx, [[4, 4], [8, 8], [12, 12]])
+
+
+class TestDtypePolicy(unittest.TestCase):
+
+    def tearDown(self):
+        set_dtype(np.float64)
+
+    def test_numbers_get_default_dtype(self):
+        self.assertEqual(np.float64, DualNumber(1, 2).dx.dtype)
+        set_dtype('float32')
+        dual_number = DualNumber([1, 2], np.array([0, 1]))
+        self.assertEqual(np.float32, dual_number.x.dtype)
+        self.assertEqual(np.float32, dual_number.dx.dtype)
+        self.assertEqual(np.float32, DualNumber.create(3).dx.dtype)
+        self.assertEqual(np.float32, MultiDualNumber.seed([1, 2])[0].dx.dtype)
+
+    def test_floating_arrays_keep_dtype(self):
+        x = np.arange(3, dtype=np.float32)
+        self.assertEqual(np.float32, DualNumber(x, x).x.dtype)
+        self.assertEqual(np.float32, DualNumber.create(x).dx.dtype)
+        self.assertEqual(np.float64, DualNumber.create(x, dtype=np.float64).dx.dtype)
+
+    def test_ops_keep_dtype(self):
+        x, y = MultiDualNumber.seed(np.array([1, 2], dtype=np.float32))
+        for result in [3 * x, x * 2.5, x + 1, 1 - x, x / 2, 2 / x, x**2, x * y, np.exp(x),
+                       np.exp2(x), np.log2(x), np.log10(x)]:
+            self.assertEqual(np.float32, result.x.dtype)
+            self.assertEqual(np.float32, result.dx.dtype)
+
+    def test_set_dtype(self):
+        self.assertEqual(np.float64, set_dtype(np.float32))
+        self.assertEqual(np.float32, get_dtype())
+        with self.assertRaises(DualNumberError):
+            set_dtype(int)
+        self.assertEqual(np.float32, get_dtype())
@@ -1,7 +1,9 @@
 import numpy as np
+import numpy.testing as npt
 
-from automatic_diff.dual_number import DualNumber
+from automatic_diff.dual_number import DualNumber, MultiDualNumber
 import automatic_diff.functions as fn
+from benchmarks.composed import COMPOSED
 from tests.utils import DualNumberTestCase
 
 
@@ -138,3 +140,25 @@ class TestMatMul(DualNumberTestCase):
         expected = DualNumber([[5], [15], [25]], [[2], [6], [10]])
         self.assertEqual(expected, actual)
 
+    def test_plain_values(self):
+        npt.assert_equal([19, 43, 67], fn.matmul(np.array([[1, 2], [3, 4], [5, 6]]), [5, 7]))
+        npt.assert_equal([1., 2.], fn.stack([1., 2.]))
+        npt.assert_equal([1., 2., 3.], fn.concatenate([[1.], [2., 3.]]))
+
+
+class TestFusedKernels(DualNumberTestCase):
+
+    def test_fused_match_composed(self):
+        x = np.linspace(0.1, 1.4, 11)
+        d = MultiDualNumber(x, np.stack([np.ones_like(x), np.linspace(-1, 1, 11)], axis=-1))
+        for name, composed in COMPOSED.items():
+            fused = getattr(fn, name)(d)
+            expected = composed(d)
+            npt.assert_allclose(expected.x, fused.x, rtol=1e-12, err_msg=name)
+            npt.assert_allclose(expected.dx, fused.dx, rtol=1e-12, err_msg=name)
+
+    def test_plain_values(self):
+        x = np.array([0.3, 0.9])
+        for name, composed in COMPOSED.items():
+            npt.assert_allclose(composed(DualNumber(x, np.ones_like(x))).x,
+                                getattr(fn, name)(x), rtol=1e-12, err_msg=name)
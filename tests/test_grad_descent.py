@@ -1,8 +1,14 @@
 import unittest
 import numpy as np
 
-from automatic_diff.dual_number import DualNumber
-from automatic_diff.grad_descent import grad_descent
+from automatic_diff.cache import ResultCache
+from automatic_diff.dual_number import DualNumber, DualNumberError
+from automatic_diff import functions as fn
+from automatic_diff.grad_descent import (
+    grad_descent, multi_start_grad_descent, stochastic_grad_descent, GradientDescent,
+    PopulationGradientDescent, StochasticGradientDescent)
+from automatic_diff.lbfgs import LBFGS
+from automatic_diff.learning_rates import GradDecayLearningRate, MomentumLearningRate
 
 from tests.utils import DualNumberTestCase
 
@@ -26,4 +32,139 @@ class TestGradDescent(DualNumberTestCase):
         self.assertAlmostEqual(x.x[0], 2, places=1)
         self.assertAlmostEqual(x.x[1], -3, places=1)
         self.assertAlmostEqual(y, 8, places=1)
-        self.assertAlmostEqual(x.size_dx, tol, places=1)
\ No newline at end of file
+        self.assertAlmostEqual(x.size_dx, tol, places=1)
+
+    def test_buffers_reused_across_iterations(self):
+        func = lambda d_0, d_1: (d_0 - 2)**2 + (d_1 + 3)**2
+        for lr in [0.1, GradDecayLearningRate(lr=0.1), MomentumLearningRate(lr=0.1)]:
+            grad_desc = GradientDescent(func)
+            buffers = []
+            step = grad_desc._grad_descent_step
+            def recording_step():
+                step()
+                buffers.append((grad_desc.x, grad_desc.dx, grad_desc.grad))
+            grad_desc._grad_descent_step = recording_step
+            grad_desc.fit([10, 12], tol=1e-12, max_iters=5, lr=lr)
+            self.assertEqual(len(buffers), 5)
+            for x, dx, grad in buffers:
+                self.assertIs(x, buffers[0][0])
+                self.assertIs(dx, buffers[0][1])
+                self.assertIs(grad, buffers[0][2])
+
+    def test_float32(self):
+        func = lambda d_0, d_1: (d_0 - 2)**2 + (d_1 + 3)**2 + 8
+        for optimizer, make_lr in [(GradientDescent, lambda: MomentumLearningRate(lr=0.1)),
+                                   (LBFGS, lambda: 1.)]:
+            expected = optimizer(func)
+            expected.fit([10, 12], tol=1e-4, max_iters=20, lr=make_lr())
+            grad_desc = optimizer(func)
+            grad_desc.fit([10, 12], tol=1e-4, max_iters=20, lr=make_lr(), dtype=np.float32)
+            for array in [grad_desc.x, grad_desc.dx, grad_desc.grad, np.asarray(grad_desc.y)]:
+                self.assertEqual(np.float32, array.dtype)
+            np.testing.assert_allclose(expected.x, grad_desc.x, rtol=1e-4)
+            self.assertEqual(np.float32, grad_desc.lr.get_state().get('nu', grad_desc.x).dtype)
+        population = PopulationGradientDescent(func)
+        population.fit(np.zeros((3, 2), dtype=np.float32), max_iters=3)
+        self.assertEqual(np.float32, population.y.dtype)
+        self.assertEqual(np.float32, population.grad.dtype)
+
+
+class TestStochasticGradDescent(DualNumberTestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.targets = rng.normal(3, 0.1, 50)
+        self.func = lambda rows, d: fn.matmul(
+            np.ones(len(rows)) / len(rows), (d - self.targets[rows])**2)
+
+    def test_mean_estimate(self):
+        x, y, dy = stochastic_grad_descent(np.array([10.]), self.func, len(self.targets),
+                                           tol=1e-8, lr=0.3, batch_size=10, epochs=5, seed=1)
+        self.assertAlmostEqual(x.x[0], 3, places=1)
+
+    def test_epochs_bound_iterations(self):
+        grad_desc = StochasticGradientDescent(self.func, len(self.targets))
+        grad_desc.fit(np.array([10.]), tol=1e-12, batch_size=20, epochs=2, seed=1)
+        self.assertEqual(6, grad_desc.num_iter)
+        self.assertEqual(2, grad_desc.num_epoch)
+
+    def test_batches_cover_rows_each_epoch(self):
+        seen = []
+        func = lambda rows, d: seen.append(rows) or d**2
+        grad_desc = StochasticGradientDescent(func, 7)
+        grad_desc.fit(np.array([1.]), tol=1e-12, batch_size=3, epochs=2, seed=0)
+        self.assertEqual([3, 3, 1, 3, 3, 1], [len(rows) for rows in seen])
+        self.assertEqual(list(range(7)), sorted(np.concatenate(seen[:3])))
+        self.assertEqual(list(range(7)), sorted(np.concatenate(seen[3:])))
+
+    def test_seed_is_reproducible(self):
+        first = stochastic_grad_descent(np.array([10.]), self.func, 50, batch_size=8, seed=3)
+        second = stochastic_grad_descent(np.array([10.]), self.func, 50, batch_size=8, seed=3)
+        self.assertEqual(first[0], second[0])
+
+    def test_compiled_mode_rejected(self):
+        with self.assertRaises(DualNumberError):
+            stochastic_grad_descent(np.array([10.]), self.func, 50, mode="compiled")
+
+    def test_cache_rejected(self):
+        with self.assertRaises(DualNumberError):
+            stochastic_grad_descent(np.array([10.]), self.func, 50, cache=ResultCache())
+
+
+class TestPopulationGradDescent(DualNumberTestCase):
+
+    def setUp(self):
+        # double well with its global minimum near x_0 = -1.04
+        self.func = lambda d_0, d_1: (d_0**2 - 1)**2 + 0.3 * d_0 + d_1**2
+        self.initial_x = np.random.RandomState(0).uniform(-2, 2, (20, 2))
+
+    def test_finds_global_minimum(self):
+        x, y, dy, population, values = multi_start_grad_descent(
+            self.initial_x, self.func, tol=1e-6, max_iters=500, lr=0.05)
+        self.assertAlmostEqual(x.x[0], -1.04, places=2)
+        self.assertAlmostEqual(x.x[1], 0, places=3)
+        self.assertEqual((20, 2), population.x.shape)
+        self.assertEqual((20,), values.shape)
+        self.assertAlmostEqual(y, values.min())
+        # some members only reach the local minimum near x_0 = 0.96
+        self.assertTrue(np.any(population.x[:, 0] > 0))
+
+    def test_members_match_single_descent(self):
+        for lr in [0.05, MomentumLearningRate(lr=0.02)]:
+            population = PopulationGradientDescent(self.func)
+            population.fit(self.initial_x[:3], tol=1e-6, max_iters=50, lr=lr)
+            for i in range(3):
+                x, _, _ = grad_descent(self.initial_x[i], self.func, tol=1e-6, max_iters=50,
+                                       lr=lr)
+                np.testing.assert_almost_equal(x.x, population.x[i])
+
+    def test_converged_members_are_frozen(self):
+        evaluated = []
+        def func(d_0, d_1):
+            evaluated.append(len(d_0.x))
+            return self.func(d_0, d_1)
+        population = PopulationGradientDescent(func)
+        initial_x = np.array([[-1.0355787, 0.], [2., 1.]])
+        population.fit(initial_x, tol=1e-4, max_iters=20, lr=0.05)
+        self.assertEqual([True, False], list(population.converged))
+        self.assertEqual([2, 1], evaluated[:2])
+        self.assertEqual(len(evaluated) - 1, evaluated.count(1))
+
+    def test_unsupported_arguments_rejected(self):
+        for kwargs in [{'n_jobs': 2}, {'cache': ResultCache()}]:
+            with self.assertRaises(DualNumberError):
+                PopulationGradientDescent(self.func).fit(self.initial_x, **kwargs)
+
+
+def _bowl(d_0, d_1):
+    return (d_0 - 2)**2 + (d_1 + 3)**2 + 8
+
+
+class TestParallelGradDescent(DualNumberTestCase):
+
+    def test_n_jobs(self):
+        expected = grad_descent(np.array([10., 12.]), _bowl, max_iters=100, tol=1e-2, lr=0.6)
+        actual = grad_descent(np.array([10., 12.]), _bowl, max_iters=100, tol=1e-2, lr=0.6,
+                              n_jobs=2)
+        np.testing.assert_almost_equal(expected[0].x, actual[0].x)
+        self.assertAlmostEqual(expected[1], actual[1])
@@ -1,8 +1,9 @@
+import concurrent.futures
 import numpy as np
 
 from automatic_diff import gradients as grads
 from automatic_diff import functions as fn
-from automatic_diff.dual_number import DualNumber
+from automatic_diff.dual_number import DualNumber, DualNumberError
 from tests.utils import DualNumberTestCase
 
 
@@ -33,4 +34,188 @@ class TestGradientBivariateFunction(DualNumberTestCase):
         direction = [3/5, 4/5]
         actual = np.dot(np.array(grad), direction)
         expected = grads.directional_der(DualNumber(self.x, direction), self.func).dx
-        self.assertEqual(expected, actual)
\ No newline at end of file
+        self.assertEqual(expected, actual)
+
+
+class TestGradientSinglePass(DualNumberTestCase):
+
+    def test_gradient_evaluates_function_once(self):
+        calls = []
+
+        def func(*d):
+            calls.append(1)
+            return sum(component**2 for component in d)
+
+        y, grad = grads.gradient([1., 2., 3.], func)
+        self.assertEqual(1, len(calls))
+        self.assertAlmostEqual(14, y)
+        np.testing.assert_almost_equal([2, 4, 6], grad)
+
+
+class TestGradientBatch(DualNumberTestCase):
+
+    def setUp(self):
+        self.func = lambda d_0, d_1: d_0 * d_1 + fn.sin(d_0)
+        self.X = np.array([[np.pi/3, 7], [0.5, -2], [1.5, 0.25]])
+
+    def expected(self):
+        y = self.X[:, 0] * self.X[:, 1] + np.sin(self.X[:, 0])
+        grad = np.stack([self.X[:, 1] + np.cos(self.X[:, 0]), self.X[:, 0]], axis=-1)
+        return y, grad
+
+    def test_gradient_batch(self):
+        y, grad = grads.gradient_batch(self.X, self.func)
+        expected_y, expected_grad = self.expected()
+        np.testing.assert_almost_equal(expected_y, y)
+        np.testing.assert_almost_equal(expected_grad, grad)
+
+    def test_gradient_batch_reverse(self):
+        y, grad = grads.gradient_batch(self.X, self.func, mode="reverse")
+        expected_y, expected_grad = self.expected()
+        np.testing.assert_almost_equal(expected_y, y)
+        np.testing.assert_almost_equal(expected_grad, grad)
+
+    def test_matches_gradient(self):
+        _, grad = grads.gradient_batch(self.X, self.func)
+        for x, row in zip(self.X, grad):
+            np.testing.assert_almost_equal(grads.gradient(x, self.func)[1], row)
+
+    def test_gradient_batch_not_per_point(self):
+        for func in [lambda d_0, d_1: (d_0 * d_1).sum(), lambda d_0, d_1: 3.]:
+            for mode in ["forward", "reverse"]:
+                with self.assertRaises(DualNumberError):
+                    grads.gradient_batch(self.X, func, mode=mode)
+
+
+class TestJacobian(DualNumberTestCase):
+
+    def test_jacobian(self):
+        func = lambda d_0, d_1: [d_0 * d_1, fn.sin(d_0) + d_1**2, d_0 / d_1]
+        x_0, x_1 = 0.5, 2.
+        y, jac = grads.jacobian([x_0, x_1], func)
+        np.testing.assert_almost_equal([x_0 * x_1, np.sin(x_0) + x_1**2, x_0 / x_1], y)
+        np.testing.assert_almost_equal(
+            [[x_1, x_0], [np.cos(x_0), 2 * x_1], [1 / x_1, -x_0 / x_1**2]], jac)
+
+    def test_jacobian_of_scalar_function_is_gradient(self):
+        func = lambda d_0, d_1: d_0 * d_1 + fn.sin(d_0)
+        np.testing.assert_almost_equal(grads.gradient([1., 3.], func)[1],
+                                       grads.jacobian([1., 3.], func)[1])
+
+
+class TestHessian(DualNumberTestCase):
+
+    def setUp(self):
+        self.func = lambda d_0, d_1: d_0**2 * d_1 + fn.sin(d_0 * d_1) + fn.exp(d_1) / d_0
+        self.x = [0.7, 1.3]
+
+    def expected(self):
+        x_0, x_1 = self.x
+        value = x_0**2 * x_1 + np.sin(x_0 * x_1) + np.exp(x_1) / x_0
+        grad = [2 * x_0 * x_1 + x_1 * np.cos(x_0 * x_1) - np.exp(x_1) / x_0**2,
+                x_0**2 + x_0 * np.cos(x_0 * x_1) + np.exp(x_1) / x_0]
+        cross = 2 * x_0 + np.cos(x_0 * x_1) - x_0 * x_1 * np.sin(x_0 * x_1) - np.exp(x_1) / x_0**2
+        hess = [[2 * x_1 - x_1**2 * np.sin(x_0 * x_1) + 2 * np.exp(x_1) / x_0**3, cross],
+                [cross, -x_0**2 * np.sin(x_0 * x_1) + np.exp(x_1) / x_0]]
+        return value, grad, hess
+
+    def test_hessian(self):
+        value, grad, hess = grads.hessian(self.x, self.func)
+        expected_value, expected_grad, expected_hess = self.expected()
+        self.assertAlmostEqual(expected_value, value)
+        np.testing.assert_almost_equal(expected_grad, grad)
+        np.testing.assert_almost_equal(expected_hess, hess)
+
+    def test_sparsity_reduces_evaluations(self):
+        calls = []
+
+        def func(*d):
+            calls.append(1)
+            return sum(fn.sin(component) * component for component in d) + d[0] * d[1]
+
+        x = np.array([0.1, 0.2, 0.3, 0.4, 0.5])
+        sparsity = np.eye(5, dtype=bool)
+        sparsity[0, 1] = sparsity[1, 0] = True
+        _, _, hess = grads.hessian(x, func, sparsity=sparsity)
+        self.assertEqual(2, len(calls))
+        _, _, dense = grads.hessian(x, func)
+        np.testing.assert_almost_equal(dense, hess)
+        expected = np.diag(2 * np.cos(x) - x * np.sin(x))
+        expected[0, 1] = expected[1, 0] = 1
+        np.testing.assert_almost_equal(expected, hess)
+
+    def test_nested_abs(self):
+        _, grad, hess = grads.hessian([-2.], lambda d: abs(d)**3)
+        np.testing.assert_almost_equal([-12], grad)
+        np.testing.assert_almost_equal([[12]], hess)
+
+    def test_numpy_written_function(self):
+        func = lambda d_0, d_1: d_0**2 * d_1 + np.sin(d_0 * d_1) + np.exp(d_1) / d_0
+        value, grad, hess = grads.hessian(self.x, func)
+        expected_value, expected_grad, expected_hess = self.expected()
+        self.assertAlmostEqual(expected_value, value)
+        np.testing.assert_almost_equal(expected_grad, grad)
+        np.testing.assert_almost_equal(expected_hess, hess)
+        for mode in ["forward", "compiled"]:
+            value, grad = grads.gradient(self.x, func, mode=mode)
+            self.assertAlmostEqual(expected_value, value)
+            np.testing.assert_almost_equal(expected_grad, grad)
+
+
+def _quartic(*d):
+    return sum(component**4 for component in d) + d[0] * d[-1]
+
+
+class TestParallelGradient(DualNumberTestCase):
+
+    def setUp(self):
+        self.x = np.linspace(-1, 1, 7)
+
+    def test_thread_pool(self):
+        expected_y, expected_grad = grads.gradient(self.x, _quartic)
+        with concurrent.futures.ThreadPoolExecutor(3) as pool:
+            y, grad = grads.gradient(self.x, _quartic, executor=pool, n_jobs=3)
+        self.assertAlmostEqual(expected_y, y)
+        np.testing.assert_almost_equal(expected_grad, grad)
+
+    def test_process_pool(self):
+        expected_y, expected_grad = grads.gradient(self.x, _quartic)
+        y, grad = grads.gradient(self.x, _quartic, n_jobs=2)
+        self.assertAlmostEqual(expected_y, y)
+        np.testing.assert_almost_equal(expected_grad, grad)
+
+    def test_more_jobs_than_variables(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            _, grad = grads.gradient([1., 2.], _quartic, executor=pool, n_jobs=8)
+        np.testing.assert_almost_equal([4 + 2, 32 + 1], grad)
+
+    def test_executor_requires_forward_mode(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            with self.assertRaises(DualNumberError):
+                grads.gradient(self.x, _quartic, mode="reverse", executor=pool)
+
+
+class TestGradientDtype(DualNumberTestCase):
+
+    def func(self, d_0, d_1):
+        return fn.exp(d_0 * d_1) + 3 * d_1**2 - 1
+
+    def test_float32(self):
+        for mode in ["forward", "reverse", "compiled"]:
+            y, dy = grads.gradient([1, 2], self.func, mode=mode, dtype=np.float32)
+            self.assertEqual(np.float32, np.asarray(y).dtype, mode)
+            self.assertEqual(np.float32, np.asarray(dy).dtype, mode)
+            np.testing.assert_allclose(grads.gradient([1., 2.], self.func, mode=mode)[1], dy,
+                                       rtol=1e-6)
+        self.assertEqual(np.float32, grads.gradient_batch([[1, 2]], self.func,
+                                                          dtype=np.float32)[1].dtype)
+        self.assertEqual(np.float32, grads.jacobian([1, 2], self.func, dtype=np.float32)[1].dtype)
+        self.assertEqual(np.float32, grads.hessian([1, 2], self.func, dtype=np.float32)[2].dtype)
+        self.assertEqual(np.float32, grads.partial_der([1, 2], self.func, 0,
+                                                       dtype=np.float32).dx.dtype)
+
+    def test_input_dtype_kept(self):
+        _, dy = grads.gradient(np.array([1, 2], dtype=np.float32), self.func)
+        self.assertEqual(np.float32, np.asarray(dy).dtype)
+        _, dy = grads.gradient([1, 2], self.func)
+        self.assertEqual(np.float64, np.asarray(dy).dtype)
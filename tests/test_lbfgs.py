@@ -0,0 +1,95 @@
+import numpy as np
+
+from automatic_diff.dual_number import DualNumber, DualNumberError
+from automatic_diff.grad_descent import GradientDescent
+from automatic_diff.linear_regression import LinearRegression
+from automatic_diff.lbfgs import LBFGS, backtracking_line_search, lbfgs, wolfe_line_search
+from tests.utils import DualNumberTestCase
+
+
+def _rosenbrock(d_0, d_1):
+    return (1 - d_0)**2 + 100 * (d_1 - d_0**2)**2
+
+
+def _badly_scaled(*d):
+    return sum(10.**i * (component - 1)**2 for i, component in enumerate(d))
+
+
+class TestLineSearch(DualNumberTestCase):
+
+    def test_backtracking_sufficient_decrease(self):
+        phi = lambda alpha: (alpha - 0.1)**2
+        alpha, value = backtracking_line_search(phi, phi(0), -0.2)
+        self.assertLessEqual(value, phi(0) - 1e-4 * alpha * 0.2)
+        self.assertAlmostEqual(0.125, alpha)
+
+    def test_wolfe_conditions(self):
+        phi = lambda alpha: ((alpha - 3)**2, 2 * (alpha - 3))
+        alpha, (value, slope) = wolfe_line_search(phi, phi(0), -6.)
+        self.assertLessEqual(value, 9 - 1e-4 * alpha * 6)
+        self.assertLessEqual(abs(slope), 0.9 * 6)
+
+
+class TestLBFGS(DualNumberTestCase):
+
+    def test_rosenbrock(self):
+        for line_search in ["wolfe", "armijo"]:
+            x, y, dy = lbfgs([-1.2, 1.], _rosenbrock, tol=1e-8, max_iters=200,
+                             line_search=line_search)
+            np.testing.assert_almost_equal([1, 1], x.x)
+            self.assertAlmostEqual(0, y)
+            np.testing.assert_almost_equal([0, 0], dy, decimal=5)
+
+    def test_fewer_gradient_evaluations_than_grad_descent(self):
+        optimizer = LBFGS(_badly_scaled)
+        optimizer.fit(np.zeros(4), tol=1e-8, max_iters=100)
+        np.testing.assert_almost_equal(np.ones(4), optimizer.x)
+        grad_desc = GradientDescent(_badly_scaled)
+        grad_desc.fit(np.zeros(4), tol=1e-8, max_iters=1000, lr=1e-3)
+        self.assertEqual(grad_desc.num_iter, grad_desc.num_grad_evals)
+        self.assertLess(optimizer.num_grad_evals, grad_desc.num_grad_evals / 10)
+
+    def test_armijo_counts_function_evaluations(self):
+        optimizer = LBFGS(_rosenbrock)
+        optimizer.fit([-1.2, 1.], tol=1e-8, max_iters=200, line_search="armijo")
+        self.assertGreaterEqual(optimizer.num_func_evals, optimizer.num_iter)
+        self.assertEqual(optimizer.num_iter + 1, optimizer.num_grad_evals)
+
+    def test_modes_agree(self):
+        expected = lbfgs([-1.2, 1.], _rosenbrock, tol=1e-8, max_iters=200)[0].x
+        for mode in ["reverse", "compiled"]:
+            actual = lbfgs([-1.2, 1.], _rosenbrock, tol=1e-8, max_iters=200, mode=mode)[0].x
+            np.testing.assert_almost_equal(expected, actual)
+
+    def test_armijo_on_model_loss(self):
+        rng = np.random.RandomState(0)
+        X = rng.normal(size=(40, 2))
+        model = LinearRegression(X, X @ [2.5, -1.] + 4 + rng.normal(scale=0.1, size=40))
+        expected = model.fit(solver="qr").x
+        optimizer = LBFGS(model.loss_func)
+        optimizer.fit(np.zeros(3), tol=1e-8, max_iters=100, line_search="armijo")
+        np.testing.assert_almost_equal(expected, optimizer.x, decimal=5)
+        self.assertGreater(optimizer.num_func_evals, 0)
+
+    def test_stop_reasons(self):
+        optimizer = LBFGS(_rosenbrock)
+        optimizer.fit([-1.2, 1.], tol=1e-8, max_iters=3)
+        self.assertEqual("max_iters", optimizer.stop_reason)
+        optimizer.fit([-1.2, 1.], tol=1e-8, max_iters=200)
+        self.assertEqual("tol", optimizer.stop_reason)
+
+    def test_failed_line_search_stops(self):
+        def uphill(d_0, d_1):
+            # a bowl whose reported gradient points the wrong way, so no step decreases it
+            bowl = d_0**2 + d_1**2
+            return bowl.chain(bowl.x, -1) if isinstance(bowl, DualNumber) else bowl
+
+        optimizer = LBFGS(uphill)
+        optimizer.fit([1., 0.5], tol=1e-12, max_iters=100, line_search="armijo")
+        self.assertEqual("line_search", optimizer.stop_reason)
+        np.testing.assert_equal([0, 0], optimizer.dx)
+        self.assertLess(optimizer.num_iter, 100)
+
+    def test_bad_line_search_raises(self):
+        with self.assertRaises(DualNumberError):
+            lbfgs([0., 0.], _rosenbrock, line_search="exact")
@@ -0,0 +1,86 @@
+import types
+import numpy as np
+
+from automatic_diff.grad_descent import grad_descent
+import automatic_diff.learning_rates as learn_rates
+from tests.utils import DualNumberTestCase
+
+
+def _badly_scaled(d_0, d_1, d_2):
+    return (d_0 - 1)**2 + 100 * (d_1 + 1)**2 + 0.01 * (d_2 - 2)**2
+
+
+def _learning_rates():
+    return [
+        learn_rates.LearningRate(lr=0.1),
+        learn_rates.TimeDecayLearningRate(lr=0.1),
+        learn_rates.GradDecayLearningRate(lr=0.1),
+        learn_rates.MomentumLearningRate(lr=0.1),
+        learn_rates.NesterovLearningRate(lr=0.1),
+        learn_rates.AdagradLearningRate(lr=0.1),
+        learn_rates.RMSPropLearningRate(lr=0.1),
+        learn_rates.AdamLearningRate(lr=0.1),
+    ]
+
+
+def _steps(lr, grads, first_iter=0):
+    steps = []
+    for i, grad in enumerate(grads):
+        grad_descent_state = types.SimpleNamespace(
+            x=np.arange(3.) - i, grad=np.array(grad), num_iter=first_iter + i)
+        steps.append(np.array(lr.update(grad_descent_state, out=np.empty(3))))
+    return steps
+
+
+class TestCustomLearningRate(DualNumberTestCase):
+
+    def test_update_without_out(self):
+        class HalvingLearningRate(learn_rates.LearningRate):
+            def update(self, grad_descent):
+                self.lr /= 2
+                return np.array(grad_descent.dy) * self.lr
+
+        x, _, _ = grad_descent(np.array([1.]), lambda d: d**2, max_iters=3,
+                               lr=HalvingLearningRate(lr=0.4))
+        # steps of 2 x lr, for lr of 0.2, 0.1 and 0.05
+        np.testing.assert_almost_equal([1 * 0.6 * 0.8 * 0.9], x.x)
+
+
+class TestAdaptiveLearningRates(DualNumberTestCase):
+
+    def test_converge_on_badly_scaled_bowl(self):
+        for lr in [learn_rates.AdamLearningRate(lr=0.1),
+                   learn_rates.RMSPropLearningRate(lr=0.05),
+                   learn_rates.AdagradLearningRate(lr=0.5)]:
+            x, _, _ = grad_descent(np.zeros(3), _badly_scaled, tol=1e-5, max_iters=5000, lr=lr)
+            np.testing.assert_almost_equal([1, -1, 2], x.x, decimal=2, err_msg=type(lr).__name__)
+
+    def test_nesterov_converges(self):
+        bowl = lambda d_0, d_1, d_2: (d_0 - 1)**2 + 4 * (d_1 + 1)**2 + (d_2 - 2)**2
+        lr = learn_rates.NesterovLearningRate(lr=0.05, momentum_rate=0.9)
+        x, _, _ = grad_descent(np.zeros(3), bowl, tol=1e-6, max_iters=1000, lr=lr)
+        np.testing.assert_almost_equal([1, -1, 2], x.x, decimal=3)
+
+    def test_adam_first_step_is_lr_per_coordinate(self):
+        steps = _steps(learn_rates.AdamLearningRate(lr=0.1), [[3., -0.001, 200.]])
+        np.testing.assert_almost_equal([0.1, -0.1, 0.1], steps[0], decimal=4)
+
+    def test_state_round_trip_resumes_updates(self):
+        grads = np.random.RandomState(0).normal(size=(10, 3))
+        for expected_lr, first_lr, resumed_lr in zip(
+                _learning_rates(), _learning_rates(), _learning_rates()):
+            name = type(expected_lr).__name__
+            expected = _steps(expected_lr, grads)
+            _steps(first_lr, grads[:5])
+            state = first_lr.get_state()
+            resumed_lr.set_state(state)
+            actual = _steps(resumed_lr, grads[5:], first_iter=5)
+            np.testing.assert_almost_equal(expected[5:], actual, err_msg=name)
+
+    def test_state_is_a_copy(self):
+        lr = learn_rates.AdamLearningRate()
+        _steps(lr, [[1., 2., 3.]])
+        state = lr.get_state()
+        _steps(lr, [[1., 2., 3.]], first_iter=1)
+        self.assertEqual(1, state['num_updates'])
+        self.assertIsNot(state['mean'], lr.mean)
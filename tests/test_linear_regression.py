@@ -1,7 +1,11 @@
+import os
+import tempfile
 import numpy as np
 from sklearn import linear_model
 
-from automatic_diff.linear_regression import LinearRegression
+from automatic_diff import gradients as grads
+from automatic_diff.dual_number import DualNumberError
+from automatic_diff.linear_regression import LinearRegression, Model
 import automatic_diff.learning_rates as learn_rates
 from tests.utils import DualNumberTestCase
 
@@ -63,3 +67,163 @@ class TestLinearRegression(DualNumberTestCase):
         model = LinearRegression([[x] for x in self.X], self.y, init_params=None)
         self.assertEquals(2, len(model.init_params))
 
+
+class TestVectorizedLoss(DualNumberTestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.normal(size=(20, 3))
+        self.y = rng.normal(size=20)
+        self.params = [0.5, -1., 2., 0.25]
+
+    def reference_loss(self, *params):
+        return sum(
+            (sum(s * component for s, component in zip(params[1:], x)) + params[0] - y)**2
+            for x, y in zip(self.X, self.y)
+        )**0.5
+
+    def test_loss_matches_per_record_loss(self):
+        model = LinearRegression(self.X, self.y, init_params=self.params)
+        expected_y, expected_grad = grads.gradient(self.params, self.reference_loss)
+        actual_y, actual_grad = grads.gradient(self.params, model.loss_func)
+        self.assertAlmostEqual(expected_y, actual_y)
+        np.testing.assert_almost_equal(expected_grad, actual_grad)
+
+    def test_loss_plain_values(self):
+        model = LinearRegression(self.X, self.y, init_params=self.params)
+        self.assertAlmostEqual(self.reference_loss(*self.params), model.loss_func(*self.params))
+
+    def test_loss_reverse_mode(self):
+        model = LinearRegression(self.X, self.y, init_params=self.params)
+        expected_y, expected_grad = grads.gradient(self.params, self.reference_loss)
+        actual_y, actual_grad = grads.gradient(self.params, model.loss_func, mode="reverse")
+        self.assertAlmostEqual(expected_y, actual_y)
+        np.testing.assert_almost_equal(expected_grad, actual_grad)
+
+
+class TestMiniBatchLinearRegression(DualNumberTestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.uniform(-1, 1, size=(200, 2))
+        self.y = self.X @ np.array([2.5, -1.]) + 4
+
+    def fit(self, lr):
+        model = LinearRegression(self.X, self.y, init_params=[0, 0, 0])
+        return model.fit(batch_size=20, epochs=30, tol=1e-6, lr=lr, seed=0).x
+
+    def test_constant_lr(self):
+        np.testing.assert_allclose([4, 2.5, -1], self.fit(0.05), atol=0.15)
+
+    def test_unsupported_model(self):
+        class FullBatchModel(Model):
+            def loss_func(self, *params):
+                return sum(param**2 for param in params)
+
+        model = FullBatchModel(self.X, self.y, init_params=[1., 1.])
+        with self.assertRaises(DualNumberError):
+            model.fit(batch_size=20)
+        self.assertAlmostEqual(0., model.fit(max_iters=100, tol=1e-8, lr=0.2).x[0], places=3)
+
+    def test_learning_rate_subclasses(self):
+        for lr in [learn_rates.TimeDecayLearningRate(lr=0.5, decay_rate=0.05),
+                   learn_rates.GradDecayLearningRate(lr=0.1),
+                   learn_rates.MomentumLearningRate(lr=0.05, momentum_rate=0.5, decay_rate=1e-2)]:
+            np.testing.assert_allclose([4, 2.5, -1], self.fit(lr), atol=0.1,
+                                       err_msg=lr.__class__.__name__)
+
+
+class TestClosedFormLinearRegression(DualNumberTestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.normal(size=(103, 3))
+        self.y = self.X @ np.array([2.5, -1., 0.5]) + 4 + rng.normal(scale=0.1, size=103)
+        clf = linear_model.LinearRegression().fit(self.X, self.y)
+        self.expected = np.concatenate([[clf.intercept_], clf.coef_])
+
+    def test_solvers_match_sklearn(self):
+        model = LinearRegression(self.X, self.y)
+        for solver in ["qr", "cholesky"]:
+            np.testing.assert_almost_equal(self.expected, model.fit(solver=solver).x,
+                                           err_msg=solver)
+
+    def test_chunked_normal_equations(self):
+        model = LinearRegression(self.X, self.y)
+        for chunk_size in [1, 10, 103, 1000]:
+            np.testing.assert_almost_equal(
+                self.expected, model.fit(solver="cholesky", chunk_size=chunk_size).x)
+        equations = model.normal_equations(chunk_size=10)
+        self.assertEqual(103, equations.num_records)
+        expected_loss, _ = grads.gradient(self.expected, model.loss_func)
+        self.assertAlmostEqual(expected_loss, equations.loss(self.expected))
+
+    def test_collinear_features(self):
+        X = np.hstack([self.X, self.X[:, :1]])
+        model = LinearRegression(X, self.y)
+        with self.assertRaises(np.linalg.LinAlgError):
+            model.fit(solver="cholesky")
+
+    def test_invalid_arguments(self):
+        model = LinearRegression(self.X, self.y)
+        with self.assertRaises(DualNumberError):
+            model.fit(solver="svd")
+        with self.assertRaises(DualNumberError):
+            model.fit(solver="qr", max_iters=10)
+        for solver in ["grad_descent", "qr"]:
+            with self.assertRaises(DualNumberError):
+                model.fit(solver=solver, chunk_size=10)
+
+
+class TestOutOfCoreLinearRegression(DualNumberTestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.normal(size=(50, 2))
+        self.y = self.X @ np.array([2.5, -1.]) + 4 + rng.normal(scale=0.1, size=50)
+        self.params = [0.5, -1., 2.]
+        self.expected = LinearRegression(self.X, self.y).fit(solver="qr").x
+
+    def _chunks(self):
+        return ((self.X[i:i + 16], self.y[i:i + 16]) for i in range(0, 50, 16))
+
+    def test_memmap_not_copied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'X.npy')
+            np.save(path, self.X)
+            X = np.load(path, mmap_mode='r')
+            model = LinearRegression(X, self.y, init_params=[0, 0, 0], chunk_size=7)
+            self.assertTrue(np.shares_memory(X, model.X))
+            np.testing.assert_almost_equal(self.expected, model.fit(solver="cholesky").x)
+            params = model.fit(max_iters=1000, tol=1e-6,
+                               lr=learn_rates.GradDecayLearningRate(lr=0.1)).x
+            del X, model
+        np.testing.assert_allclose(self.expected, params, atol=1e-3)
+
+    def test_chunked_loss_matches_whole(self):
+        whole = LinearRegression(self.X, self.y)
+        expected_y, expected_grad = grads.gradient(self.params, whole.loss_func)
+        for model in [LinearRegression(self.X, self.y, chunk_size=7),
+                      LinearRegression(self._chunks),
+                      LinearRegression(self._chunks, chunk_size=5)]:
+            for mode in ["forward", "reverse"]:
+                actual_y, actual_grad = grads.gradient(self.params, model.loss_func, mode=mode)
+                self.assertAlmostEqual(expected_y, actual_y)
+                np.testing.assert_almost_equal(expected_grad, actual_grad)
+
+    def test_chunk_function(self):
+        model = LinearRegression(self._chunks, init_params=[0, 0, 0])
+        self.assertEqual(2, model.num_features)
+        np.testing.assert_almost_equal(self.expected, model.fit(solver="cholesky").x)
+        with self.assertRaises(DualNumberError):
+            model.fit(solver="qr")
+        with self.assertRaises(DualNumberError):
+            model.fit(batch_size=10)
+
+    def test_block_size_bounded(self):
+        sizes = []
+        model = LinearRegression(self.X, self.y, chunk_size=8)
+        for X, y in model.chunks():
+            sizes.append(len(X))
+            self.assertEqual(len(X), len(y))
+        self.assertEqual([8] * 6 + [2], sizes)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from automatic_diff import functions as fn
+from automatic_diff.dual_number import DualNumber
+from automatic_diff.gradients import gradient
+from automatic_diff.profiler import Profiler, ProfilerError
+from tests.utils import DualNumberTestCase
+
+
+class TestProfiler(DualNumberTestCase):
+
+    def test_counts_ops_and_kernels(self):
+        d = DualNumber(np.arange(4.), np.ones(4))
+        with Profiler() as profiler:
+            y = fn.exp(d * d) + 2 * d
+        stats = profiler.stats
+        self.assertEqual(1, stats['DualNumber.__mul__'].calls)
+        self.assertEqual(1, stats['DualNumber.__rmul__'].calls)
+        self.assertEqual(1, stats['DualNumber.__add__'].calls)
+        self.assertEqual(1, stats['functions.exp'].calls)
+        self.assertEqual(y, fn.exp(d * d) + 2 * d)
+
+    def test_allocations(self):
+        d = DualNumber(np.arange(4.), np.ones(4))
+        with Profiler() as profiler:
+            d * d
+            d += 1
+            d[1:]
+        mul = profiler.stats['DualNumber.__mul__']
+        self.assertEqual(2, mul.allocations)
+        self.assertEqual(2 * 4 * 8, mul.bytes)
+        self.assertEqual(0, profiler.stats['DualNumber.__iadd__'].allocations)
+        # the tangent of an index is a view
+        self.assertEqual(1, profiler.stats['DualNumber.__getitem__'].allocations)
+
+    def test_own_time_excludes_nested_ops(self):
+        with Profiler() as profiler:
+            gradient(np.array([1., 2.]), lambda a, b: fn.sech(a * b) + fn.tanh(a)**2)
+        for stats in profiler.stats.values():
+            self.assertLessEqual(stats.own_seconds, stats.seconds)
+        sech = profiler.stats['functions.sech']
+        self.assertLess(sech.own_seconds, sech.seconds)
+
+    def test_unpatched_on_exit(self):
+        add, exp, seed = DualNumber.__add__, fn.exp, vars(DualNumber)['create']
+        with self.assertRaises(ValueError):
+            with Profiler():
+                self.assertIsNot(add, DualNumber.__add__)
+                raise ValueError
+        self.assertIs(add, DualNumber.__add__)
+        self.assertIs(exp, fn.exp)
+        self.assertIs(seed, vars(DualNumber)['create'])
+        with Profiler() as profiler:
+            pass
+        self.assertEqual({}, profiler.stats)
+
+    def test_not_nested(self):
+        with Profiler():
+            with self.assertRaises(ProfilerError):
+                with Profiler():
+                    pass
+
+    def test_report(self):
+        d = DualNumber(np.arange(4.), np.ones(4))
+        with Profiler() as profiler:
+            fn.sin(d) * d
+        lines = profiler.report(sort='calls', limit=2).splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith('op'))
+        with self.assertRaises(ProfilerError):
+            profiler.report(sort='speed')
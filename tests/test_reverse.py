@@ -0,0 +1,135 @@
+import numpy as np
+import numpy.testing as npt
+
+from automatic_diff import functions as fn
+from automatic_diff import gradients as grads
+from automatic_diff.grad_descent import grad_descent
+from automatic_diff.linear_regression import LinearRegression
+from automatic_diff.dual_number import DualNumberError
+from automatic_diff.reverse import Tape
+from tests.utils import DualNumberTestCase
+
+
+class TestReverseNumberOps(DualNumberTestCase):
+
+    def setUp(self):
+        self.tape = Tape()
+        self.d_0 = self.tape.variable(4.)
+        self.d_1 = self.tape.variable(9.)
+
+    def backward(self, output):
+        self.tape.backward(output)
+        return self.d_0.grad, self.d_1.grad
+
+    def test_product_rule(self):
+        grad_0, grad_1 = self.backward(self.d_0 * self.d_1)
+        self.assertAlmostEqual(9, grad_0)
+        self.assertAlmostEqual(4, grad_1)
+
+    def test_quotient_rule(self):
+        grad_0, grad_1 = self.backward(self.d_0 / self.d_1)
+        self.assertAlmostEqual(1 / 9, grad_0)
+        self.assertAlmostEqual(-4 / 81, grad_1)
+
+    def test_constants(self):
+        output = 2 - 3 * self.d_0 + 1 / self.d_1 + abs(-self.d_0)**2
+        self.assertAlmostEqual(2 - 12 + 1 / 9 + 16, output.x)
+        grad_0, grad_1 = self.backward(output)
+        self.assertAlmostEqual(-3 + 8, grad_0)
+        self.assertAlmostEqual(-1 / 81, grad_1)
+
+    def test_reused_variable_accumulates(self):
+        grad_0, grad_1 = self.backward(self.d_0 * self.d_0 + self.d_0)
+        self.assertAlmostEqual(9, grad_0)
+        self.assertAlmostEqual(0, grad_1)
+
+    def test_matmul(self):
+        tape = Tape()
+        d = tape.variable([5., 7.])
+        matrix = np.array([[1, 2], [3, 4], [5, 6]])
+        output = fn.matmul(matrix, d)
+        npt.assert_equal(output.x, [19, 43, 67])
+        tape.backward(output)
+        npt.assert_equal(d.grad, [9, 12])
+
+    def test_concatenate(self):
+        tape = Tape()
+        d_0, d_1 = tape.variable([1., 2.]), tape.variable([3.])
+        output = fn.matmul(np.array([1., 2., 3.]), fn.concatenate([d_0, d_1]))
+        tape.backward(output)
+        npt.assert_equal(d_0.grad, [1, 2])
+        npt.assert_equal(d_1.grad, [3])
+
+    def test_reductions(self):
+        tape = Tape()
+        d = tape.variable([[1., 2.], [3., 4.]])
+        output = d.sum() + np.mean(d, axis=0).sum() + np.sum(d, axis=1, keepdims=True)[1, 0]
+        self.assertAlmostEqual(10 + 5 + 7, output.x)
+        tape.backward(output)
+        npt.assert_equal(d.grad, [[1.5, 1.5], [2.5, 2.5]])
+
+    def test_indexing_and_reshape(self):
+        tape = Tape()
+        d = tape.variable([1., 2., 3.])
+        output = d[0] * d[2] + d[[1, 1]].sum() + d.reshape(3, 1)[2, 0]
+        self.assertAlmostEqual(3 + 4 + 3, output.x)
+        tape.backward(output)
+        npt.assert_equal(d.grad, [3, 2, 2])
+
+    def test_ufuncs(self):
+        tape = Tape()
+        d = tape.variable([0.5, 2.])
+        output = np.sum(np.exp(d) + np.hypot(d, 1.) + np.array([2., 3.]) * d)
+        tape.backward(output)
+        npt.assert_almost_equal(d.grad, np.exp(d.x) + d.x / np.hypot(d.x, 1.) + [2, 3])
+        npt.assert_equal(d > 1, [False, True])
+
+    def test_matmul_of_reverse_numbers(self):
+        tape = Tape()
+        matrix, vector = tape.variable([[1., 2.], [3., 4.]]), tape.variable([5., 6.])
+        output = (vector @ (matrix @ vector)).sum()
+        self.assertAlmostEqual(5 * 17 + 6 * 39, output.x)
+        tape.backward(output)
+        npt.assert_equal(matrix.grad, np.outer(vector.x, vector.x))
+        npt.assert_equal(vector.grad, (matrix.x + matrix.x.T) @ vector.x)
+
+    def test_unsupported(self):
+        d = Tape().variable([1., 2.])
+        with self.assertRaises(DualNumberError):
+            np.bitwise_and(d, d)
+        with self.assertRaises(DualNumberError):
+            np.cumsum(d)
+        with self.assertRaises(DualNumberError):
+            np.exp(d, where=[True, False])
+
+
+class TestReverseGradient(DualNumberTestCase):
+
+    def test_matches_forward_mode(self):
+        func = lambda d_0, d_1, d_2: fn.tanh(d_0 * d_1) + fn.log(d_2) / fn.exp(d_0) + fn.sec(d_1)
+        x = [0.3, -1.2, 2.5]
+        y_forward, grad_forward = grads.gradient(x, func)
+        y_reverse, grad_reverse = grads.gradient(x, func, mode="reverse")
+        self.assertAlmostEqual(y_forward, y_reverse)
+        npt.assert_almost_equal(grad_forward, grad_reverse)
+
+    def test_unused_variable_has_zero_gradient(self):
+        y, grad = grads.gradient([2., 3.], lambda d_0, d_1: d_0**2, mode="reverse")
+        self.assertAlmostEqual(4, y)
+        npt.assert_almost_equal([4, 0], grad)
+
+    def test_grad_descent(self):
+        func = lambda d_0, d_1: (d_0 - 2)**2 + (d_1 + 3)**2 + 8
+        x, y, dy = grad_descent(np.array([10, 12]), func, max_iters=100, tol=1e-2, lr=0.6,
+                                mode="reverse")
+        self.assertAlmostEqual(x.x[0], 2, places=1)
+        self.assertAlmostEqual(x.x[1], -3, places=1)
+        self.assertAlmostEqual(y, 8, places=1)
+
+    def test_linear_regression(self):
+        X = [[x] for x in range(7)]
+        y = [2.5 * x[0] + 4 for x in X]
+        model = LinearRegression(X, y, init_params=[0, 1])
+        params = model.fit(max_iters=1000, tol=1e-3, lr=0.005, mode="reverse")
+        self.assertAlmostEqual(params.x[0], 4, places=1)
+        self.assertAlmostEqual(params.x[1], 2.5, places=1)
@@ -0,0 +1,98 @@
+import numpy as np
+
+from automatic_diff import functions as fn
+from automatic_diff import gradients as grads
+from automatic_diff.dual_number import DualNumberError
+from automatic_diff.sparse import SparseDualNumber, SparseTangent
+from tests.utils import DualNumberTestCase
+
+
+def chain(*d):
+    return sum(fn.sin(d_0) * d_1 + fn.exp(-d_1**2) for d_0, d_1 in zip(d[:-1], d[1:]))
+
+
+def local(*d):
+    return [d_0 * fn.sin(d_1) - d_1 / (1 + d_0**2) for d_0, d_1 in zip(d[:-1], d[1:])]
+
+
+class TestSparseTangent(DualNumberTestCase):
+
+    def setUp(self):
+        self.a = SparseTangent(np.array([[1., 2.], [3., 4.]]), np.array([0, 3]), 40)
+        self.b = SparseTangent(np.array([[5.], [6.]]), np.array([3]), 40)
+
+    def test_dense(self):
+        dense = np.asarray(self.a)
+        self.assertEqual((2, 40), dense.shape)
+        np.testing.assert_equal([[1, 0, 0, 2], [3, 0, 0, 4]], dense[:, :4])
+        self.assertEqual(4, self.a.nnz)
+
+    def test_arithmetic_matches_dense(self):
+        dense_a, dense_b = np.asarray(self.a), np.asarray(self.b)
+        factor = np.arange(40.)
+        for actual, expected in [(self.a + self.b, dense_a + dense_b),
+                                 (self.b - self.a, dense_b - dense_a),
+                                 (self.a * 2., dense_a * 2.),
+                                 (np.array([[2.], [3.]]) * self.a, dense_a * [[2.], [3.]]),
+                                 (self.a * factor, dense_a * factor),
+                                 (self.a / 4., dense_a / 4.),
+                                 (-self.a, -dense_a),
+                                 (self.a + dense_b, dense_a + dense_b)]:
+            np.testing.assert_equal(expected, np.asarray(actual))
+        self.assertIsInstance(self.a + self.b, SparseTangent)
+        self.assertIsInstance(self.a * factor, SparseTangent)
+        self.assertIs(self.a, self.a + 0)
+
+    def test_densifies(self):
+        many = SparseTangent(np.ones((2, 4)), np.array([4, 5, 6, 7]), 40)
+        self.assertIsInstance(self.a + many, np.ndarray)
+        np.testing.assert_equal(np.asarray(self.a) + np.asarray(many), self.a + many)
+        self.assertIsInstance(np.exp(self.a), np.ndarray)
+
+    def test_indexing(self):
+        self.assertIsInstance(self.a[1, :], SparseTangent)
+        np.testing.assert_equal(np.asarray(self.a)[1], np.asarray(self.a[1, :]))
+        np.testing.assert_equal(np.asarray(self.a)[:, 3], self.a[:, 3])
+        broadcast = self.b.broadcast_to((3, 2, 40))
+        np.testing.assert_equal(np.broadcast_to(np.asarray(self.b), (3, 2, 40)),
+                                np.asarray(broadcast))
+
+
+class TestSparseMode(DualNumberTestCase):
+
+    def setUp(self):
+        self.x = np.random.RandomState(0).uniform(-1, 1, 50)
+
+    def test_seed(self):
+        seeds = SparseDualNumber.seed(self.x)
+        self.assertIsInstance(seeds[1].dx, SparseTangent)
+        np.testing.assert_equal(np.eye(50)[1], np.asarray(seeds[1].dx))
+        product = seeds[0] * seeds[1] + seeds[1]
+        self.assertIsInstance(product.dx, SparseTangent)
+        np.testing.assert_equal([0, 1], product.dx.indices)
+
+    def test_gradient_matches_forward(self):
+        expected_y, expected_grad = grads.gradient(self.x, chain)
+        actual_y, actual_grad = grads.gradient(self.x, chain, mode="sparse")
+        self.assertAlmostEqual(expected_y, actual_y)
+        np.testing.assert_almost_equal(expected_grad, actual_grad)
+
+    def test_jacobian_matches_forward(self):
+        expected_y, expected_jac = grads.jacobian(self.x, local)
+        actual_y, actual_jac = grads.jacobian(self.x, local, mode="sparse")
+        np.testing.assert_almost_equal(expected_y, actual_y)
+        np.testing.assert_almost_equal(expected_jac, actual_jac)
+        with self.assertRaises(DualNumberError):
+            grads.jacobian(self.x, local, mode="reverse")
+
+    def test_numpy_function(self):
+        func = lambda *d: np.sum(np.exp(np.stack(d)) * np.arange(len(d)))
+        expected_y, expected_grad = grads.gradient(self.x[:5], func)
+        actual_y, actual_grad = grads.gradient(self.x[:5], func, mode="sparse")
+        self.assertAlmostEqual(expected_y, actual_y)
+        np.testing.assert_almost_equal(expected_grad, actual_grad)
+
+    def test_dtype(self):
+        y, grad = grads.gradient(self.x, chain, mode="sparse", dtype=np.float32)
+        self.assertEqual(np.float32, np.asarray(y).dtype)
+        self.assertEqual(np.float32, np.asarray(grad).dtype)
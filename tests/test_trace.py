@@ -0,0 +1,115 @@
+import gc
+import weakref
+import numpy as np
+import numpy.testing as npt
+
+from automatic_diff import functions as fn
+from automatic_diff import gradients as grads
+from automatic_diff.grad_descent import grad_descent
+from automatic_diff.linear_regression import LinearRegression
+from automatic_diff.trace import trace, TraceCache, TraceError, TRACE_CACHE
+from tests.utils import DualNumberTestCase
+
+
+class TestTrace(DualNumberTestCase):
+
+    def setUp(self):
+        self.func = lambda d_0, d_1: fn.tanh(d_0 * d_1) + fn.sec(d_1) / d_0 + abs(d_0 - 3)**1.5
+
+    def test_replay_matches_forward_mode(self):
+        program = trace(self.func, [1., 2.])
+        for x in ([1., 2.], [1.5, -0.5], [4., 0.3]):
+            y, grad = program.gradient(np.array(x))
+            expected_y, expected_grad = grads.gradient(x, self.func)
+            self.assertAlmostEqual(expected_y, y)
+            npt.assert_almost_equal(expected_grad, grad)
+
+    def test_replay_does_not_call_function(self):
+        calls = []
+
+        def func(d_0, d_1):
+            calls.append(1)
+            return self.func(d_0, d_1)
+
+        program = trace(func, [1., 2.])
+        program.gradient(np.array([3., 4.]))
+        program.gradient(np.array([5., 6.]))
+        self.assertEqual(1, len(calls))
+
+    def test_outputs_are_not_overwritten_by_later_replays(self):
+        program = trace(self.func, [1., 2.])
+        first = program.gradient(np.array([1., 2.]))
+        program.gradient(np.array([3., 4.]))
+        self.assertEqual(grads.gradient([1., 2.], self.func), first)
+
+    def test_linear_regression_loss(self):
+        rng = np.random.RandomState(0)
+        model = LinearRegression(rng.normal(size=(30, 2)), rng.normal(size=30))
+        params = np.array([0.5, -1., 2.])
+        program = trace(model.loss_func, params)
+        y, grad = program.gradient(params + 1)
+        expected_y, expected_grad = grads.gradient(params + 1, model.loss_func)
+        self.assertAlmostEqual(expected_y, y)
+        npt.assert_almost_equal(expected_grad, grad)
+
+    def test_value_dependent_control_flow_raises(self):
+        def func(d_0, d_1):
+            if d_0 > d_1:
+                return d_0
+            return d_1
+
+        with self.assertRaises(TraceError):
+            trace(func, [1., 2.])
+
+
+class Quadratic:
+
+    def __init__(self, targets):
+        self.targets = targets
+
+    def loss(self, *d):
+        return sum((component - target)**2 for component, target in zip(d, self.targets))
+
+
+class TestTraceCache(DualNumberTestCase):
+
+    def test_cache_keys_on_shape_and_dtype(self):
+        cache = TraceCache()
+        func = lambda *d: sum(component**2 for component in d)
+        first = cache.get(func, np.array([1., 2.]))
+        self.assertIs(first, cache.get(func, np.array([3., 4.])))
+        self.assertIsNot(first, cache.get(func, np.array([1, 2])))
+        self.assertIsNot(first, cache.get(func, np.array([1., 2., 3.])))
+        self.assertEqual(3, len(cache))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = TraceCache(max_size=2)
+        funcs = [lambda d: d**2, lambda d: d**3, lambda d: d**4]
+        first = cache.get(funcs[0], np.array([1.]))
+        cache.get(funcs[1], np.array([1.]))
+        cache.get(funcs[0], np.array([1.]))
+        cache.get(funcs[2], np.array([1.]))
+        self.assertEqual(2, len(cache))
+        self.assertIs(first, cache.get(funcs[0], np.array([1.])))
+
+    def test_cache_references_functions_weakly(self):
+        cache = TraceCache()
+        model = Quadratic(np.arange(3.))
+        cache.get(model.loss, np.zeros(3))
+        self.assertIs(cache.get(model.loss, np.ones(3)), cache.get(model.loss, np.zeros(3)))
+        self.assertEqual(1, len(cache))
+        reference = weakref.ref(model)
+        del model
+        gc.collect()
+        self.assertIsNone(reference())
+        self.assertEqual(0, len(cache))
+
+    def test_compiled_grad_descent(self):
+        TRACE_CACHE.clear()
+        func = lambda d_0, d_1: (d_0 - 2)**2 + (d_1 + 3)**2 + 8
+        initial_x = np.array([10., 12.])
+        expected = grad_descent(initial_x, func, max_iters=100, tol=1e-2, lr=0.6)
+        actual = grad_descent(initial_x, func, max_iters=100, tol=1e-2, lr=0.6, mode="compiled")
+        npt.assert_almost_equal(expected[0].x, actual[0].x)
+        self.assertAlmostEqual(expected[1], actual[1])
+        self.assertEqual(1, len(TRACE_CACHE))